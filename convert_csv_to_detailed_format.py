@@ -4,9 +4,18 @@
 用于兼容12月8日的原始可视化程序
 """
 
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 import json
 
+# 共享的向量化 CBT 模型
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'sagin-experiments', 'pq-ntor-12topo-experiment', 'scripts'))
+from cbt_model import DETAILED_FORMAT_MODEL, cbt_components
+
 # 拓扑参数 (2025-12-11修正版 - 统一使用卫星传播延迟2.71ms)
 # 所有拓扑的传播延迟相同(卫星高度固定), 差异主要体现在带宽(传输延迟)上
 TOPO_PARAMS = {
@@ -32,25 +41,6 @@ PQ_NTOR_HANDSHAKE_MS = 0.03705        # 37.05 μs
 CLASSIC_NTOR_MSG_SIZE = 84    # CREATE2 cell
 PQ_NTOR_MSG_SIZE = 1472       # PQ-NTOR enlarged cell
 
-def calculate_transmission_delay(bw_mbps, msg_size_bytes):
-    """
-    计算传输延迟 (ms)
-    公式: delay = (message_size_bits) / (bandwidth_bps) * 1000
-    """
-    bw_bps = bw_mbps * 1_000_000  # Mbps -> bps
-    msg_size_bits = msg_size_bytes * 8
-    delay_sec = msg_size_bits / bw_bps
-    return delay_sec * 1000  # 转换为ms
-
-def calculate_retransmission_delay(delay_ms, loss_percent):
-    """
-    估算重传延迟 (简化模型)
-    假设: RTT = 2 * delay, 重传概率 = loss_percent
-    """
-    rtt_ms = 2 * delay_ms
-    retrans_delay = rtt_ms * (loss_percent / 100)
-    return retrans_delay
-
 def convert_csv_to_detailed(input_csv, output_csv):
     """
     转换CSV格式，添加详细的网络参数和CBT分解
@@ -59,60 +49,37 @@ def convert_csv_to_detailed(input_csv, output_csv):
     # 读取简单CSV
     df = pd.read_csv(input_csv)
 
-    # 准备输出数据
-    detailed_rows = []
-
-    for _, row in df.iterrows():
-        topo = row['Topology']
-        protocol = row['Protocol']
-        # 注意：忽略原始的Mean_ms，因为它没有包含网络延迟
-
-        # 获取拓扑参数
-        params = TOPO_PARAMS[topo]
-        bw = params['bw']
-        delay = params['delay']
-        loss = params['loss']
-        desc = params['desc']
-
-        # 确定加密握手时间和消息大小
-        if 'Classic' in protocol:
-            crypto_cbt_ms = CLASSIC_NTOR_HANDSHAKE_MS
-            msg_size = CLASSIC_NTOR_MSG_SIZE
-        else:  # PQ-NTOR
-            crypto_cbt_ms = PQ_NTOR_HANDSHAKE_MS
-            msg_size = PQ_NTOR_MSG_SIZE
-
-        # 计算各个延迟组成部分
-        # 3-hop circuit: 每一跳都有 2*delay (RTT)
-        network_delay_ms = 3 * 2 * delay  # 三跳，每跳一个RTT
-
-        transmission_delay_ms = 3 * calculate_transmission_delay(bw, msg_size)
-
-        retrans_delay_ms = 3 * calculate_retransmission_delay(delay, loss)
-
-        # 重新计算Total_CBT（包含所有组成部分）
-        total_cbt_ms = crypto_cbt_ms + network_delay_ms + transmission_delay_ms + retrans_delay_ms
-
-        # 计算网络延迟占比
-        network_ratio = (network_delay_ms / total_cbt_ms) * 100 if total_cbt_ms > 0 else 0
-
-        # 构建详细记录
-        detailed_row = {
-            'Topology': topo,
-            'Protocol': protocol,
-            'Description': desc,
-            'Bandwidth_Mbps': round(bw, 3),
-            'Link_Delay_ms': round(delay, 3),
-            'Loss_Percent': round(loss, 3),
-            'Crypto_CBT_ms': round(crypto_cbt_ms, 3),
-            'Network_Delay_ms': round(network_delay_ms, 3),
-            'Transmission_Delay_ms': round(transmission_delay_ms, 3),
-            'Retransmission_Delay_ms': round(retrans_delay_ms, 3),
-            'Total_CBT_ms': round(total_cbt_ms, 3),
-            'Network_Ratio': round(network_ratio, 3)
-        }
-
-        detailed_rows.append(detailed_row)
+    # 逐行参数数组
+    # 注意：忽略原始的Mean_ms，因为它没有包含网络延迟
+    params = [TOPO_PARAMS[topo] for topo in df['Topology']]
+    bw = np.array([p['bw'] for p in params])
+    delay = np.array([p['delay'] for p in params])
+    loss = np.array([p['loss'] for p in params])
+    is_classic = df['Protocol'].str.contains('Classic').to_numpy()
+
+    # 确定加密握手时间和消息大小
+    crypto_cbt_ms = np.where(is_classic, CLASSIC_NTOR_HANDSHAKE_MS, PQ_NTOR_HANDSHAKE_MS)
+    msg_size = np.where(is_classic, CLASSIC_NTOR_MSG_SIZE, PQ_NTOR_MSG_SIZE)
+
+    # 3-hop circuit: 每一跳都有 2*delay (RTT)，传输/重传延迟按三跳计
+    # 重新计算Total_CBT（包含所有组成部分），网络延迟占比只算传播延迟
+    cbt = cbt_components(bw, delay, loss, msg_size, crypto_cbt_ms, DETAILED_FORMAT_MODEL)
+
+    # 构建详细记录
+    detailed_rows = [{
+        'Topology': row['Topology'],
+        'Protocol': row['Protocol'],
+        'Description': params[i]['desc'],
+        'Bandwidth_Mbps': round(bw[i], 3),
+        'Link_Delay_ms': round(delay[i], 3),
+        'Loss_Percent': round(loss[i], 3),
+        'Crypto_CBT_ms': round(crypto_cbt_ms[i], 3),
+        'Network_Delay_ms': round(cbt['network_delay_ms'][i], 3),
+        'Transmission_Delay_ms': round(cbt['transmission_delay_ms'][i], 3),
+        'Retransmission_Delay_ms': round(cbt['retransmission_delay_ms'][i], 3),
+        'Total_CBT_ms': round(cbt['total_cbt_ms'][i], 3),
+        'Network_Ratio': round(cbt['propagation_ratio'][i], 3)
+    } for i, (_, row) in enumerate(df.iterrows())]
 
     # 创建详细DataFrame
     detailed_df = pd.DataFrame(detailed_rows)
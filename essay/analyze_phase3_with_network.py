@@ -11,8 +11,14 @@ Phase 3 分析：密码学性能 + 网络延迟理论计算
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import os
 import sys
 
+# 共享的向量化 CBT 模型
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                'sagin-experiments', 'pq-ntor-12topo-experiment', 'scripts'))
+from cbt_model import PHASE3_ESSAY_MODEL, cbt_components
+
 # 中文字体设置
 plt.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial Unicode MS', 'SimHei']
 plt.rcParams['axes.unicode_minus'] = False
@@ -33,29 +39,11 @@ TOPOLOGY_PARAMS = {
     'topo12': {'bw_mbps': 3.60,  'delay_ms': 5.46, 'loss_pct': 2.0, 'desc': '最恶劣条件'},
 }
 
-def calculate_network_delay(delay_ms):
-    """
-    计算3跳电路的网络往返延迟
-
-    3跳Tor电路: Client -> Guard -> Middle -> Exit
-
-    握手过程（以第一跳为例）:
-    1. Client -> Guard: CREATE cell (单向延迟)
-    2. Guard -> Client: CREATED cell (单向延迟)
-
-    总共3跳，每跳2次传输 = 6次单向延迟
-    """
-    return 6 * delay_ms
-
-def calculate_transmission_delay(packet_size_bytes, bandwidth_mbps):
-    """
-    计算传输延迟（仅用于参考，实际影响较小）
-
-    传输时间 = 数据大小 / 带宽
-    """
-    bandwidth_bytes_per_sec = bandwidth_mbps * 1024 * 1024 / 8
-    transmission_ms = (packet_size_bytes / bandwidth_bytes_per_sec) * 1000
-    return transmission_ms
+# 每个 onionskin 的数据包大小 (bytes)
+# Classic NTOR: ~128 bytes per onionskin
+# PQ-NTOR: ~1568 bytes per onionskin (Kyber-512 ciphertext ~800 bytes)
+CLASSIC_ONIONSKIN_BYTES = 128
+PQ_ONIONSKIN_BYTES = 1568
 
 def analyze_phase3(csv_path):
     """分析Phase 3结果并计算理论总CBT"""
@@ -74,56 +62,35 @@ def analyze_phase3(csv_path):
     print(f"  总测试数: {len(df)}")
     print()
 
-    # 创建结果数据框
-    results = []
+    # 3跳Tor电路: Client -> Guard -> Middle -> Exit，每跳 CREATE + CREATED 两次单向传输，
+    # 共 6 次单向延迟、6 份 onionskin 的传输延迟（通常可忽略）；
+    # 丢包导致的重传延迟按 loss_pct% 的概率重走一遍网络延迟估算（模型见 cbt_model.py）
+    params = [TOPOLOGY_PARAMS[topo] for topo in df['Topology']]
+    bw_mbps = np.array([p['bw_mbps'] for p in params])
+    delay_ms = np.array([p['delay_ms'] for p in params])
+    loss_pct = np.array([p['loss_pct'] for p in params])
+    packet_size = np.where(df['Protocol'].str.contains('Classic').to_numpy(),
+                           CLASSIC_ONIONSKIN_BYTES, PQ_ONIONSKIN_BYTES)
+    crypto_cbt = df['Mean_ms'].to_numpy(dtype=float)
 
-    for _, row in df.iterrows():
-        topo = row['Topology']
-        protocol = row['Protocol']
-        crypto_cbt = row['Mean_ms']
+    # 总CBT = 密码学时间 + 网络传播延迟 + 传输延迟 + 重传延迟
+    cbt = cbt_components(bw_mbps, delay_ms, loss_pct, packet_size, crypto_cbt, PHASE3_ESSAY_MODEL)
 
-        # 获取网络参数
-        params = TOPOLOGY_PARAMS[topo]
-        delay_ms = params['delay_ms']
-        bw_mbps = params['bw_mbps']
-        loss_pct = params['loss_pct']
-
-        # 计算网络延迟（传播延迟）
-        network_delay = calculate_network_delay(delay_ms)
-
-        # 估算数据包大小
-        # Classic NTOR: ~128 bytes per onionskin
-        # PQ-NTOR: ~1568 bytes per onionskin (Kyber-512 ciphertext ~800 bytes)
-        if 'Classic' in protocol:
-            packet_size = 128 * 6  # 3跳 × 2次传输
-        else:
-            packet_size = 1568 * 6
-
-        # 传输延迟（通常可忽略）
-        transmission_delay = calculate_transmission_delay(packet_size, bw_mbps)
-
-        # 丢包导致的重传延迟（简化估算）
-        # 假设每个数据包有loss_pct%的概率需要重传
-        # 重传次数期望值 = loss_pct / 100
-        retransmission_delay = (loss_pct / 100) * network_delay
-
-        # 总CBT = 密码学时间 + 网络传播延迟 + 传输延迟 + 重传延迟
-        total_cbt = crypto_cbt + network_delay + transmission_delay + retransmission_delay
-
-        results.append({
-            'Topology': topo,
-            'Protocol': protocol,
-            'Description': params['desc'],
-            'Bandwidth_Mbps': bw_mbps,
-            'Link_Delay_ms': delay_ms,
-            'Loss_Percent': loss_pct,
-            'Crypto_CBT_ms': crypto_cbt,
-            'Network_Delay_ms': network_delay,
-            'Transmission_Delay_ms': transmission_delay,
-            'Retransmission_Delay_ms': retransmission_delay,
-            'Total_CBT_ms': total_cbt,
-            'Network_Ratio': (network_delay / total_cbt) * 100  # 网络延迟占比
-        })
+    # 创建结果数据框
+    results = pd.DataFrame({
+        'Topology': df['Topology'],
+        'Protocol': df['Protocol'],
+        'Description': [p['desc'] for p in params],
+        'Bandwidth_Mbps': bw_mbps,
+        'Link_Delay_ms': delay_ms,
+        'Loss_Percent': loss_pct,
+        'Crypto_CBT_ms': crypto_cbt,
+        'Network_Delay_ms': cbt['network_delay_ms'],
+        'Transmission_Delay_ms': cbt['transmission_delay_ms'],
+        'Retransmission_Delay_ms': cbt['retransmission_delay_ms'],
+        'Total_CBT_ms': cbt['total_cbt_ms'],
+        'Network_Ratio': cbt['propagation_ratio']  # 网络延迟占比
+    })
 
     results_df = pd.DataFrame(results)
 
@@ -390,7 +357,6 @@ def main():
     results_df = analyze_phase3(csv_path)
 
     # 生成可视化
-    import os
     output_dir = os.path.dirname(csv_path)
     visualize_results(results_df, output_dir)
 
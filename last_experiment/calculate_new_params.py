@@ -17,6 +17,7 @@ from test_satellite_noma import (
 )
 from test_uav_noma import uav_oma_rate, uav_noma_rate
 from test_d2d_noma import d2d_oma_rate, d2d_noma_rate
+from link_cache import LINK_CACHE
 
 # 卫星接收增益（用于上行链路）
 RX_GAIN_SAT_LINEAR = 10 ** (32.0 / 10)
@@ -75,8 +76,8 @@ def sinr_to_packet_loss(sinr_db):
     else:
         return 5.0
 
-def calculate_link_params(node1, node2, node1_name, node2_name):
-    """计算单条链路的参数 - 使用新参数"""
+def calculate_link_params(node1, node2, node1_name, node2_name, cache=LINK_CACHE):
+    """计算单条链路的参数 - 使用新参数（cache 复用已算过的链路）"""
     pos1 = node1
     pos2 = node2
 
@@ -93,11 +94,15 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
         if is_downlink:
             sat_pos, dev_pos = pos1, pos2
             is_uav = 'uav' in node2_name
-            rate_mbps, sinr, _ = oma_rate_single_device(
-                sat_pos, dev_pos,
-                P_tx_W=SAT_TX_POWER_W,  # 新功率
-                B_Hz=SAT_BANDWIDTH_HZ,   # 新带宽
-                is_uav=is_uav
+            rate_mbps, sinr, _ = cache.get_or_compute(
+                "satellite_downlink", sat_pos, dev_pos, SAT_TX_POWER_W, SAT_BANDWIDTH_HZ,
+                lambda: oma_rate_single_device(
+                    sat_pos, dev_pos,
+                    P_tx_W=SAT_TX_POWER_W,  # 新功率
+                    B_Hz=SAT_BANDWIDTH_HZ,   # 新带宽
+                    is_uav=is_uav
+                ),
+                extra=(is_uav,)
             )
             link_type = "satellite_downlink"
 
@@ -112,12 +117,16 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
                 P_tx_W = GROUND_TX_UL_POWER_W
                 tx_gain_linear = G_GROUND_TX_UL_LINEAR
 
-            rate_mbps, sinr, _ = uplink_oma_rate_single_device(
-                sat_pos, dev_pos,
-                P_tx_W=P_tx_W,
-                B_Hz=SAT_BANDWIDTH_HZ,  # 新带宽
-                tx_gain_linear=tx_gain_linear,
-                rx_gain_sat_linear=RX_GAIN_SAT_LINEAR
+            rate_mbps, sinr, _ = cache.get_or_compute(
+                "satellite_uplink", dev_pos, sat_pos, P_tx_W, SAT_BANDWIDTH_HZ,
+                lambda: uplink_oma_rate_single_device(
+                    sat_pos, dev_pos,
+                    P_tx_W=P_tx_W,
+                    B_Hz=SAT_BANDWIDTH_HZ,  # 新带宽
+                    tx_gain_linear=tx_gain_linear,
+                    rx_gain_sat_linear=RX_GAIN_SAT_LINEAR
+                ),
+                extra=(tx_gain_linear,)
             )
             link_type = "satellite_uplink"
         else:
@@ -136,18 +145,24 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
         else:
             raise ValueError(f"UAV链路方向判断错误: {node1_name} -> {node2_name}")
 
-        rate_mbps, sinr, _ = uav_oma_rate(
-            uav_pos, user_pos,
-            P_uav_W=P_tx_W,
-            B_Hz=UAV_BANDWIDTH_HZ  # 新带宽
+        rate_mbps, sinr, _ = cache.get_or_compute(
+            "uav", uav_pos, user_pos, P_tx_W, UAV_BANDWIDTH_HZ,
+            lambda: uav_oma_rate(
+                uav_pos, user_pos,
+                P_uav_W=P_tx_W,
+                B_Hz=UAV_BANDWIDTH_HZ  # 新带宽
+            )
         )
         link_type = "uav"
 
     elif is_d2d_link:
-        rate_mbps, sinr, _ = d2d_oma_rate(
-            pos1, pos2,
-            P_tx_W=D2D_TX_POWER_W,
-            B_Hz=D2D_BANDWIDTH_HZ  # 新带宽
+        rate_mbps, sinr, _ = cache.get_or_compute(
+            "d2d", pos1, pos2, D2D_TX_POWER_W, D2D_BANDWIDTH_HZ,
+            lambda: d2d_oma_rate(
+                pos1, pos2,
+                P_tx_W=D2D_TX_POWER_W,
+                B_Hz=D2D_BANDWIDTH_HZ  # 新带宽
+            )
         )
         link_type = "d2d"
     else:
@@ -159,7 +174,7 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
 
     return rate_mbps, delay_ms, sinr_db, link_type
 
-def calculate_topology_end_to_end(topo_id):
+def calculate_topology_end_to_end(topo_id, cache=LINK_CACHE):
     """计算拓扑的端到端参数"""
     config = TOPOLOGY_NODES[topo_id]
     nodes = config['nodes']
@@ -179,7 +194,7 @@ def calculate_topology_end_to_end(topo_id):
         dst_pos = nodes[dst_name]
 
         rate, delay, sinr_db, link_type = calculate_link_params(
-            src_pos, dst_pos, src_name, dst_name
+            src_pos, dst_pos, src_name, dst_name, cache
         )
 
         link_info = {
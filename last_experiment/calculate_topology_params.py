@@ -14,6 +14,7 @@ from test_satellite_noma import (
 )
 from test_uav_noma import uav_oma_rate, uav_noma_rate
 from test_d2d_noma import d2d_oma_rate, d2d_noma_rate
+from link_cache import LINK_CACHE
 
 # 卫星接收增益（用于上行链路）
 RX_GAIN_SAT_LINEAR = 10 ** (32.0 / 10)
@@ -45,10 +46,12 @@ def sinr_to_packet_loss(sinr_db):
     else:
         return 5.0
 
-def calculate_link_params(node1, node2, node1_name, node2_name):
+def calculate_link_params(node1, node2, node1_name, node2_name, cache=LINK_CACHE):
     """
     计算单条链路的参数
 
+    cache: LinkCache，按量化的 (链路类型, 收发位置, 功率, 带宽) 复用已算过的链路
+
     返回: (rate_mbps, delay_ms, sinr_db, link_type)
     """
     pos1 = node1
@@ -74,11 +77,15 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
             sat_pos, dev_pos = pos1, pos2
             is_uav = 'uav' in node2_name
 
-            rate_mbps, sinr, _ = oma_rate_single_device(
-                sat_pos, dev_pos,
-                P_tx_W=22.0,  # 卫星功率 22W (略微提升以使下行高于上行)
-                B_Hz=20e6,
-                is_uav=is_uav
+            rate_mbps, sinr, _ = cache.get_or_compute(
+                "satellite_downlink", sat_pos, dev_pos, 22.0, 20e6,
+                lambda: oma_rate_single_device(
+                    sat_pos, dev_pos,
+                    P_tx_W=22.0,  # 卫星功率 22W (略微提升以使下行高于上行)
+                    B_Hz=20e6,
+                    is_uav=is_uav
+                ),
+                extra=(is_uav,)
             )
             link_type = "satellite_downlink"
 
@@ -95,12 +102,16 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
                 P_tx_W = 1.0  # 地面功率 1W (折中值)
                 tx_gain_linear = G_GROUND_TX_UL_LINEAR
 
-            rate_mbps, sinr, _ = uplink_oma_rate_single_device(
-                sat_pos, dev_pos,
-                P_tx_W=P_tx_W,
-                B_Hz=20e6,
-                tx_gain_linear=tx_gain_linear,
-                rx_gain_sat_linear=RX_GAIN_SAT_LINEAR
+            rate_mbps, sinr, _ = cache.get_or_compute(
+                "satellite_uplink", dev_pos, sat_pos, P_tx_W, 20e6,
+                lambda: uplink_oma_rate_single_device(
+                    sat_pos, dev_pos,
+                    P_tx_W=P_tx_W,
+                    B_Hz=20e6,
+                    tx_gain_linear=tx_gain_linear,
+                    rx_gain_sat_linear=RX_GAIN_SAT_LINEAR
+                ),
+                extra=(tx_gain_linear,)
             )
             link_type = "satellite_uplink"
         else:
@@ -127,19 +138,25 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
             # 不应该到这里
             raise ValueError(f"UAV链路方向判断错误: {node1_name} -> {node2_name}")
 
-        rate_mbps, sinr, _ = uav_oma_rate(
-            uav_pos, user_pos,
-            P_uav_W=P_tx_W,  # 根据方向使用正确的发射功率
-            B_Hz=2e6
+        rate_mbps, sinr, _ = cache.get_or_compute(
+            "uav", uav_pos, user_pos, P_tx_W, 2e6,
+            lambda: uav_oma_rate(
+                uav_pos, user_pos,
+                P_uav_W=P_tx_W,  # 根据方向使用正确的发射功率
+                B_Hz=2e6
+            )
         )
         link_type = "uav"
 
     elif is_d2d_link:
         # D2D链路（对称）
-        rate_mbps, sinr, _ = d2d_oma_rate(
-            pos1, pos2,
-            P_tx_W=1.0,  # 地面功率 1W (折中值)
-            B_Hz=2e6
+        rate_mbps, sinr, _ = cache.get_or_compute(
+            "d2d", pos1, pos2, 1.0, 2e6,
+            lambda: d2d_oma_rate(
+                pos1, pos2,
+                P_tx_W=1.0,  # 地面功率 1W (折中值)
+                B_Hz=2e6
+            )
         )
         link_type = "d2d"
     else:
@@ -152,7 +169,7 @@ def calculate_link_params(node1, node2, node1_name, node2_name):
 
     return rate_mbps, delay_ms, sinr_db, link_type
 
-def calculate_topology_end_to_end(topo_id):
+def calculate_topology_end_to_end(topo_id, cache=LINK_CACHE):
     """
     计算拓扑的端到端参数
 
@@ -187,7 +204,7 @@ def calculate_topology_end_to_end(topo_id):
         dst_pos = nodes[dst_name]
 
         rate, delay, sinr_db, link_type = calculate_link_params(
-            src_pos, dst_pos, src_name, dst_name
+            src_pos, dst_pos, src_name, dst_name, cache
         )
 
         link_info = {
@@ -394,6 +411,8 @@ def main():
         json.dump(all_results, f, indent=2, ensure_ascii=False)
 
     print(f"\n✅ 参数已保存到: {output_file}")
+    info = LINK_CACHE.info()
+    print(f"   链路缓存: 命中 {info['hits']}, 计算 {info['misses']}")
 
     # 生成摘要统计
     print("\n" + "=" * 80)
@@ -0,0 +1,97 @@
+"""
+链路参数缓存
+以量化后的 (链路类型, 发射端位置, 接收端位置, 功率, 带宽) 为键缓存单链路计算结果，
+LRU 淘汰。12 拓扑中共享的链路（以及批量改动少数节点的 what-if 变体）只计算一次。
+
+用法:
+    from link_cache import LINK_CACHE
+    rate_mbps, sinr, gain = LINK_CACHE.get_or_compute(
+        'uav', uav_pos, user_pos, P_tx_W, B_Hz,
+        lambda: uav_oma_rate(uav_pos, user_pos, P_uav_W=P_tx_W, B_Hz=B_Hz))
+    print(LINK_CACHE.info())
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from beam_lut import active_beam_lut
+
+# 位置量化步长（米）：1cm 以内的节点移动视为同一链路
+DEFAULT_QUANTUM_M = 0.01
+DEFAULT_MAXSIZE = 4096
+
+
+class LinkCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, quantum_m=DEFAULT_QUANTUM_M):
+        """
+        参数:
+            maxsize: 最多缓存的链路数，超出后淘汰最久未使用的条目；0 表示不缓存
+            quantum_m: 位置量化步长（米）
+        """
+        self.maxsize = maxsize
+        self.quantum_m = quantum_m
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, link_type, tx_pos, rx_pos, P_tx_W, B_Hz, extra=()):
+        """
+        量化后的缓存键
+
+        Args:
+            link_type: 链路类型（含方向，如 'satellite_downlink'）
+            tx_pos / rx_pos: 发射/接收端位置（米）
+            P_tx_W / B_Hz: 发射功率、带宽
+            extra: 其他影响结果的参数（如接收端是否为UAV）
+
+        键中包含当前卫星波束查找表的分辨率（未启用为 0），切换查找表后不会命中另一种模式算出的增益
+        """
+        tx = tuple(np.rint(np.asarray(tx_pos, dtype=float) / self.quantum_m).astype(np.int64).tolist())
+        rx = tuple(np.rint(np.asarray(rx_pos, dtype=float) / self.quantum_m).astype(np.int64).tolist())
+        lut = active_beam_lut()
+        beam_mode = lut.resolution if lut is not None else 0
+        return (link_type, tx, rx, float(P_tx_W), float(B_Hz), tuple(extra), beam_mode)
+
+    def get_or_compute(self, link_type, tx_pos, rx_pos, P_tx_W, B_Hz, compute, extra=()):
+        """命中则返回缓存结果，否则调用 compute() 计算并缓存"""
+        if self.maxsize <= 0:
+            self.misses += 1
+            return compute()
+
+        key = self.key(link_type, tx_pos, rx_pos, P_tx_W, B_Hz, extra)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self):
+        """清空缓存和统计"""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """缓存统计"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# 进程内共享的默认缓存
+LINK_CACHE = LinkCache()
@@ -1,6 +1,7 @@
 import numpy as np
 import math
 from scipy.special import jv
+from beam_lut import active_beam_lut
 
 C = 3e8
 FREQ = 20e9
@@ -32,6 +33,10 @@ def beam_pattern_single_beam(user_pos_3d, sat_pos_3d):
     uk_n = BEAM_UK_N_COEFF * math.sin(phi_rad) / sin_B
     if abs(uk_n) < 1e-9:
         return 1.0
+    # 上行/下行共用：启用查找表时（SAGIN_BEAM_LUT / enable_beam_lut）插值代替 Bessel 计算
+    lut = active_beam_lut()
+    if lut is not None:
+        return lut.pattern_scalar(uk_n)
     term1 = jv(1, uk_n) / (2 * uk_n)
     term2 = 36 * jv(3, uk_n) / (uk_n ** 3)
     return float(np.clip((term1 + term2) ** 2, 1e-10, 1.0))
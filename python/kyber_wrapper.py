@@ -1,58 +1,209 @@
 #!/usr/bin/env python3
 """
-简单的 Kyber KEM 封装 (使用 ctypes 调用 liboqs)
+简单的 Kyber / ML-KEM 封装 (使用 ctypes 调用 liboqs)
+
+算法在运行时从 liboqs 查询（OQS_KEM_alg_identifier / OQS_KEM_alg_is_enabled），
+密钥与密文长度读自 OQS_KEM 结构体。默认仍为 Kyber512（与 C 客户端/中继的 KYBER_ALGORITHM_NAME 一致），
+ML-KEM-512/768/1024 需显式指定（--algorithm），旧版 liboqs 回退到 -ipd 草案或 Kyber512/768/1024。
+
+三种调用方式:
+    kem.encapsulate(pk)                                  返回新的 bytes（兼容旧接口）
+    kem.encapsulate(pk, ciphertext_out=ct, shared_secret_out=ss)
+                                                         写入调用方提供的 bytearray / memoryview / NumPy 缓冲区，不复制
+    kem.encapsulate_batch(pks)                           一次调用处理 N 个，结果写入连续的 (N, 长度) uint8 数组
+
+liboqs 路径: 环境变量 LIBOQS_PATH > ~/_oqs/lib > ~/pq-ntor-experiment/_oqs/lib > 系统库路径
 """
 
-import ctypes
 import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import argparse
 from typing import Tuple
 
-# liboqs 库路径
-LIBOQS_PATH = os.path.expanduser("~/_oqs/lib/liboqs.so.0.11.0")
-
-class KyberKEM:
-    """Kyber KEM 封装类"""
-
-    # Kyber 参数 (Kyber512)
-    ALGORITHM = "Kyber512"
-    PUBLIC_KEY_LEN = 800
-    SECRET_KEY_LEN = 1632
-    CIPHERTEXT_LEN = 768
-    SHARED_SECRET_LEN = 32
+import numpy as np
+
+# liboqs 库路径（按顺序查找）
+LIBOQS_PATH = os.environ.get("LIBOQS_PATH") or os.path.expanduser("~/_oqs/lib/liboqs.so.0.11.0")
+LIBOQS_CANDIDATES = [
+    LIBOQS_PATH,
+    os.path.expanduser("~/_oqs/lib/liboqs.so"),
+    os.path.expanduser("~/pq-ntor-experiment/_oqs/lib/liboqs.so"),
+]
+
+DEFAULT_ALGORITHM = "Kyber512"        # 与 c/src/kyber_kem.h 保持一致，否则密钥/密文无法互通
+OQS_SUCCESS = 0
+
+# ML-KEM 的候选名称：新版 liboqs 为 ML-KEM，0.10 为 -ipd 草案，更早只有 Kyber
+# （Kyber 名称不反向回退到 ML-KEM，避免默认算法被悄悄换掉）
+KEM_ALIASES = {
+    "ML-KEM-512": ("ML-KEM-512", "ML-KEM-512-ipd", "Kyber512"),
+    "ML-KEM-768": ("ML-KEM-768", "ML-KEM-768-ipd", "Kyber768"),
+    "ML-KEM-1024": ("ML-KEM-1024", "ML-KEM-1024-ipd", "Kyber1024"),
+}
+
+
+class _OQSKEM(ctypes.Structure):
+    """OQS_KEM 结构体的前缀（各版本 liboqs 一致的字段），只用来读取长度"""
+    _fields_ = [
+        ("method_name", ctypes.c_char_p),
+        ("alg_version", ctypes.c_char_p),
+        ("claimed_nist_level", ctypes.c_uint8),
+        ("ind_cca", ctypes.c_bool),
+        ("length_public_key", ctypes.c_size_t),
+        ("length_secret_key", ctypes.c_size_t),
+        ("length_ciphertext", ctypes.c_size_t),
+        ("length_shared_secret", ctypes.c_size_t),
+    ]
+
+
+_libraries = {}
+
+
+def find_liboqs():
+    """按 LIBOQS_CANDIDATES、系统库路径的顺序查找 liboqs"""
+    for path in LIBOQS_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return ctypes.util.find_library("oqs")
+
+
+def load_liboqs(path=None):
+    """加载 liboqs 并设置函数签名（每个路径只加载一次）"""
+    path = path or find_liboqs()
+    if not path or (os.path.sep in path and not os.path.exists(path)):
+        raise FileNotFoundError(f"liboqs library not found (tried {LIBOQS_CANDIDATES})")
+    if path in _libraries:
+        return _libraries[path]
+
+    lib = ctypes.CDLL(path)
+
+    # OQS_KEM *OQS_KEM_new(const char *method_name);
+    lib.OQS_KEM_new.argtypes = [ctypes.c_char_p]
+    lib.OQS_KEM_new.restype = ctypes.c_void_p
+
+    # void OQS_KEM_free(OQS_KEM *kem);
+    lib.OQS_KEM_free.argtypes = [ctypes.c_void_p]
+    lib.OQS_KEM_free.restype = None
+
+    # 缓冲区参数一律用 c_void_p：可直接传 bytes 或整数地址（调用方缓冲区 / 批量数组中的偏移）
+    # OQS_STATUS OQS_KEM_keypair(const OQS_KEM *kem, uint8_t *public_key, uint8_t *secret_key);
+    lib.OQS_KEM_keypair.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+    lib.OQS_KEM_keypair.restype = ctypes.c_int
+
+    # OQS_STATUS OQS_KEM_encaps(const OQS_KEM *kem, uint8_t *ciphertext, uint8_t *shared_secret, const uint8_t *public_key);
+    lib.OQS_KEM_encaps.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+    lib.OQS_KEM_encaps.restype = ctypes.c_int
+
+    # OQS_STATUS OQS_KEM_decaps(const OQS_KEM *kem, uint8_t *shared_secret, const uint8_t *ciphertext, const uint8_t *secret_key);
+    lib.OQS_KEM_decaps.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+    lib.OQS_KEM_decaps.restype = ctypes.c_int
+
+    # int OQS_KEM_alg_count(void); const char *OQS_KEM_alg_identifier(size_t i);
+    # int OQS_KEM_alg_is_enabled(const char *method_name);
+    lib.OQS_KEM_alg_count.argtypes = []
+    lib.OQS_KEM_alg_count.restype = ctypes.c_int
+    lib.OQS_KEM_alg_identifier.argtypes = [ctypes.c_size_t]
+    lib.OQS_KEM_alg_identifier.restype = ctypes.c_char_p
+    lib.OQS_KEM_alg_is_enabled.argtypes = [ctypes.c_char_p]
+    lib.OQS_KEM_alg_is_enabled.restype = ctypes.c_int
+
+    # void OQS_init(void);（0.8 之前没有）
+    if hasattr(lib, "OQS_init"):
+        lib.OQS_init.argtypes = []
+        lib.OQS_init.restype = None
+        lib.OQS_init()
+
+    _libraries[path] = lib
+    return lib
+
+
+def available_kems(lib_path=None):
+    """当前 liboqs 中已启用的 KEM 算法名列表"""
+    lib = load_liboqs(lib_path)
+    names = [lib.OQS_KEM_alg_identifier(i) for i in range(lib.OQS_KEM_alg_count())]
+    return [name.decode("utf-8") for name in names if lib.OQS_KEM_alg_is_enabled(name)]
+
+
+def resolve_algorithm(algorithm, lib_path=None):
+    """把 ML-KEM-768 等名称解析为当前 liboqs 实际启用的算法名"""
+    enabled = available_kems(lib_path)
+    for name in KEM_ALIASES.get(algorithm, (algorithm,)):
+        if name in enabled:
+            if name != algorithm:
+                print(f"[Kyber] ⚠️  {algorithm} not enabled in liboqs, falling back to {name}")
+            return name
+    raise ValueError(f"KEM {algorithm} is not enabled in liboqs (available: {', '.join(enabled)})")
+
+
+def _byte_view(buf, name, writable=False):
+    """bytes / bytearray / memoryview / NumPy 缓冲区 → 共享内存的一维 uint8 数组（不复制）"""
+    arr = buf if isinstance(buf, np.ndarray) else np.frombuffer(buf, dtype=np.uint8)
+    if not arr.flags.c_contiguous:
+        raise ValueError(f"{name} must be a C-contiguous buffer")
+    if writable and not arr.flags.writeable:
+        raise ValueError(f"{name} is read-only")
+    return arr.reshape(-1).view(np.uint8)
+
+
+def _input_pointer(buf, length, name):
+    """只读输入 → C 指针参数：bytes 直接传入，其余缓冲区取地址（不复制）"""
+    if isinstance(buf, bytes):
+        size, ptr = len(buf), buf
+    else:
+        view = _byte_view(buf, name)
+        size, ptr = view.size, view.ctypes.data
+    if size != length:
+        raise ValueError(f"Invalid {name} length: {size} (expected {length})")
+    return ptr
 
-    def __init__(self):
-        """初始化 liboqs 库"""
-        if not os.path.exists(LIBOQS_PATH):
-            raise FileNotFoundError(f"liboqs library not found at {LIBOQS_PATH}")
 
-        self.lib = ctypes.CDLL(LIBOQS_PATH)
+def _output_pointer(buf, length, name):
+    """调用方提供的可写缓冲区 → C 指针（地址）"""
+    view = _byte_view(buf, name, writable=True)
+    if view.size != length:
+        raise ValueError(f"Invalid {name} length: {view.size} (expected {length})")
+    return view.ctypes.data
 
-        # 定义函数签名
-        # OQS_KEM *OQS_KEM_new(const char *method_name);
-        self.lib.OQS_KEM_new.argtypes = [ctypes.c_char_p]
-        self.lib.OQS_KEM_new.restype = ctypes.c_void_p
 
-        # void OQS_KEM_free(OQS_KEM *kem);
-        self.lib.OQS_KEM_free.argtypes = [ctypes.c_void_p]
-        self.lib.OQS_KEM_free.restype = None
+class KyberKEM:
+    """
+    Kyber / ML-KEM 封装类
 
-        # OQS_STATUS OQS_KEM_keypair(const OQS_KEM *kem, uint8_t *public_key, uint8_t *secret_key);
-        self.lib.OQS_KEM_keypair.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
-        self.lib.OQS_KEM_keypair.restype = ctypes.c_int
+    单次接口复用实例内的临时缓冲区，同一实例不要在多个线程中并发调用。
+    """
 
-        # OQS_STATUS OQS_KEM_encaps(const OQS_KEM *kem, uint8_t *ciphertext, uint8_t *shared_secret, const uint8_t *public_key);
-        self.lib.OQS_KEM_encaps.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
-        self.lib.OQS_KEM_encaps.restype = ctypes.c_int
+    def __init__(self, algorithm=DEFAULT_ALGORITHM, lib_path=None):
+        """
+        初始化 liboqs 库
 
-        # OQS_STATUS OQS_KEM_decaps(const OQS_KEM *kem, uint8_t *shared_secret, const uint8_t *ciphertext, const uint8_t *secret_key);
-        self.lib.OQS_KEM_decaps.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
-        self.lib.OQS_KEM_decaps.restype = ctypes.c_int
+        Args:
+            algorithm: 默认 Kyber512；可选 ML-KEM-512 / ML-KEM-768 / ML-KEM-1024（或 liboqs 中任意已启用的 KEM）
+            lib_path: liboqs 路径，默认按 find_liboqs() 查找
+        """
+        self.lib = load_liboqs(lib_path)
+        self.ALGORITHM = resolve_algorithm(algorithm, lib_path)
 
         # 创建 KEM 实例
         self.kem = self.lib.OQS_KEM_new(self.ALGORITHM.encode('utf-8'))
         if not self.kem:
             raise RuntimeError(f"Failed to initialize {self.ALGORITHM}")
 
+        # 长度取自 liboqs（保持旧的大写属性名）
+        info = ctypes.cast(self.kem, ctypes.POINTER(_OQSKEM)).contents
+        self.PUBLIC_KEY_LEN = info.length_public_key
+        self.SECRET_KEY_LEN = info.length_secret_key
+        self.CIPHERTEXT_LEN = info.length_ciphertext
+        self.SHARED_SECRET_LEN = info.length_shared_secret
+
+        # 单次接口复用的临时缓冲区
+        self._pk_buf = ctypes.create_string_buffer(self.PUBLIC_KEY_LEN)
+        self._sk_buf = ctypes.create_string_buffer(self.SECRET_KEY_LEN)
+        self._ct_buf = ctypes.create_string_buffer(self.CIPHERTEXT_LEN)
+        self._ss_buf = ctypes.create_string_buffer(self.SHARED_SECRET_LEN)
+
         print(f"[Kyber] Initialized {self.ALGORITHM}")
         print(f"[Kyber]   Public key: {self.PUBLIC_KEY_LEN} bytes")
         print(f"[Kyber]   Ciphertext: {self.CIPHERTEXT_LEN} bytes")
@@ -63,76 +214,191 @@ class KyberKEM:
         if hasattr(self, 'kem') and self.kem:
             self.lib.OQS_KEM_free(self.kem)
 
-    def keypair(self) -> Tuple[bytes, bytes]:
+    # ============== 单次接口 ==============
+    def keypair(self, public_key_out=None, secret_key_out=None) -> Tuple[bytes, bytes]:
         """
         生成 Kyber 密钥对
 
+        Args:
+            public_key_out / secret_key_out: 可选，可写缓冲区（两者同时提供），结果直接写入
+
         Returns:
-            (public_key, secret_key)
+            (public_key, secret_key): 未提供输出缓冲区时为新的 bytes，否则返回传入的缓冲区
         """
-        public_key = ctypes.create_string_buffer(self.PUBLIC_KEY_LEN)
-        secret_key = ctypes.create_string_buffer(self.SECRET_KEY_LEN)
-
-        status = self.lib.OQS_KEM_keypair(self.kem, public_key, secret_key)
-        if status != 0:  # OQS_SUCCESS = 0
+        if public_key_out is None and secret_key_out is None:
+            status = self.lib.OQS_KEM_keypair(self.kem, self._pk_buf, self._sk_buf)
+            if status != OQS_SUCCESS:  # OQS_SUCCESS = 0
+                raise RuntimeError("Kyber keypair generation failed")
+            return self._pk_buf.raw, self._sk_buf.raw
+
+        if public_key_out is None or secret_key_out is None:
+            raise ValueError("public_key_out and secret_key_out must be given together")
+        status = self.lib.OQS_KEM_keypair(
+            self.kem,
+            _output_pointer(public_key_out, self.PUBLIC_KEY_LEN, "public key buffer"),
+            _output_pointer(secret_key_out, self.SECRET_KEY_LEN, "secret key buffer"))
+        if status != OQS_SUCCESS:
             raise RuntimeError("Kyber keypair generation failed")
+        return public_key_out, secret_key_out
 
-        return bytes(public_key), bytes(secret_key)
-
-    def encapsulate(self, public_key: bytes) -> Tuple[bytes, bytes]:
+    def encapsulate(self, public_key, ciphertext_out=None, shared_secret_out=None) -> Tuple[bytes, bytes]:
         """
         封装：生成密文和共享密钥
 
         Args:
-            public_key: 对方的公钥
+            public_key: 对方的公钥（bytes 或任意连续缓冲区）
+            ciphertext_out / shared_secret_out: 可选，可写缓冲区（两者同时提供），结果直接写入
 
         Returns:
             (ciphertext, shared_secret)
         """
-        if len(public_key) != self.PUBLIC_KEY_LEN:
-            raise ValueError(f"Invalid public key length: {len(public_key)} (expected {self.PUBLIC_KEY_LEN})")
-
-        ciphertext = ctypes.create_string_buffer(self.CIPHERTEXT_LEN)
-        shared_secret = ctypes.create_string_buffer(self.SHARED_SECRET_LEN)
-
-        status = self.lib.OQS_KEM_encaps(self.kem, ciphertext, shared_secret, public_key)
-        if status != 0:
+        pk = _input_pointer(public_key, self.PUBLIC_KEY_LEN, "public key")
+
+        if ciphertext_out is None and shared_secret_out is None:
+            status = self.lib.OQS_KEM_encaps(self.kem, self._ct_buf, self._ss_buf, pk)
+            if status != OQS_SUCCESS:
+                raise RuntimeError("Kyber encapsulation failed")
+            return self._ct_buf.raw, self._ss_buf.raw
+
+        if ciphertext_out is None or shared_secret_out is None:
+            raise ValueError("ciphertext_out and shared_secret_out must be given together")
+        status = self.lib.OQS_KEM_encaps(
+            self.kem,
+            _output_pointer(ciphertext_out, self.CIPHERTEXT_LEN, "ciphertext buffer"),
+            _output_pointer(shared_secret_out, self.SHARED_SECRET_LEN, "shared secret buffer"),
+            pk)
+        if status != OQS_SUCCESS:
             raise RuntimeError("Kyber encapsulation failed")
+        return ciphertext_out, shared_secret_out
 
-        return bytes(ciphertext), bytes(shared_secret)
-
-    def decapsulate(self, ciphertext: bytes, secret_key: bytes) -> bytes:
+    def decapsulate(self, ciphertext, secret_key, shared_secret_out=None) -> bytes:
         """
         解封装：从密文恢复共享密钥
 
         Args:
             ciphertext: 密文
             secret_key: 自己的私钥
+            shared_secret_out: 可选，可写缓冲区，结果直接写入
 
         Returns:
             shared_secret
         """
-        if len(ciphertext) != self.CIPHERTEXT_LEN:
-            raise ValueError(f"Invalid ciphertext length: {len(ciphertext)} (expected {self.CIPHERTEXT_LEN})")
-        if len(secret_key) != self.SECRET_KEY_LEN:
-            raise ValueError(f"Invalid secret key length: {len(secret_key)} (expected {self.SECRET_KEY_LEN})")
+        ct = _input_pointer(ciphertext, self.CIPHERTEXT_LEN, "ciphertext")
+        sk = _input_pointer(secret_key, self.SECRET_KEY_LEN, "secret key")
+
+        if shared_secret_out is None:
+            status = self.lib.OQS_KEM_decaps(self.kem, self._ss_buf, ct, sk)
+            if status != OQS_SUCCESS:
+                raise RuntimeError("Kyber decapsulation failed")
+            return self._ss_buf.raw
+
+        status = self.lib.OQS_KEM_decaps(
+            self.kem, _output_pointer(shared_secret_out, self.SHARED_SECRET_LEN, "shared secret buffer"),
+            ct, sk)
+        if status != OQS_SUCCESS:
+            raise RuntimeError("Kyber decapsulation failed")
+        return shared_secret_out
+
+    # ============== 批量接口 ==============
+    @staticmethod
+    def _batch_output(buf, count, length, name):
+        """预分配的 (count, length) 输出缓冲区；未提供时新建 uint8 数组"""
+        if buf is None:
+            buf = np.empty((count, length), dtype=np.uint8)
+        return buf, _output_pointer(buf, count * length, name)
+
+    @staticmethod
+    def _batch_input(buf, length, count, name):
+        """
+        批量输入的 (基地址, 步长, 条数)
+        只有一条时步长为 0，对 count 个输出重复使用（如对同一公钥封装 N 次）
+        """
+        view = _byte_view(buf, name)
+        if view.size == 0 or view.size % length:
+            raise ValueError(f"Invalid {name} buffer size: {view.size} (not a multiple of {length})")
+        rows = view.size // length
+        if rows == 1:
+            return view, 0, 1 if count is None else count
+        if count is not None and rows != count:
+            raise ValueError(f"{name} has {rows} entries (expected {count})")
+        return view, length, rows
+
+    def keypair_batch(self, count, public_keys=None, secret_keys=None):
+        """
+        批量生成 count 个密钥对
+
+        Args:
+            public_keys / secret_keys: 可选，预分配的 count × 长度 连续可写缓冲区
+
+        Returns:
+            (public_keys, secret_keys): 默认为 (count, 长度) 的 uint8 数组
+        """
+        public_keys, pk = self._batch_output(public_keys, count, self.PUBLIC_KEY_LEN, "public_keys")
+        secret_keys, sk = self._batch_output(secret_keys, count, self.SECRET_KEY_LEN, "secret_keys")
 
-        shared_secret = ctypes.create_string_buffer(self.SHARED_SECRET_LEN)
+        keypair, kem = self.lib.OQS_KEM_keypair, self.kem
+        pk_len, sk_len = self.PUBLIC_KEY_LEN, self.SECRET_KEY_LEN
+        for i in range(count):
+            if keypair(kem, pk + i * pk_len, sk + i * sk_len) != OQS_SUCCESS:
+                raise RuntimeError(f"Kyber keypair generation failed (item {i})")
+        return public_keys, secret_keys
 
-        status = self.lib.OQS_KEM_decaps(self.kem, shared_secret, ciphertext, secret_key)
-        if status != 0:
-            raise RuntimeError("Kyber decapsulation failed")
+    def encapsulate_batch(self, public_keys, count=None, ciphertexts=None, shared_secrets=None):
+        """
+        批量封装
+
+        Args:
+            public_keys: N × PUBLIC_KEY_LEN 的连续缓冲区；只有一个公钥时对它封装 count 次
+            count: 封装次数（默认为公钥个数）
+            ciphertexts / shared_secrets: 可选，预分配的输出缓冲区
 
-        return bytes(shared_secret)
+        Returns:
+            (ciphertexts, shared_secrets): 默认为 (N, 长度) 的 uint8 数组
+        """
+        pk_view, pk_stride, count = self._batch_input(public_keys, self.PUBLIC_KEY_LEN, count, "public_keys")
+        ciphertexts, ct = self._batch_output(ciphertexts, count, self.CIPHERTEXT_LEN, "ciphertexts")
+        shared_secrets, ss = self._batch_output(shared_secrets, count, self.SHARED_SECRET_LEN, "shared_secrets")
+
+        encaps, kem = self.lib.OQS_KEM_encaps, self.kem
+        pk = pk_view.ctypes.data
+        ct_len, ss_len = self.CIPHERTEXT_LEN, self.SHARED_SECRET_LEN
+        for i in range(count):
+            if encaps(kem, ct + i * ct_len, ss + i * ss_len, pk + i * pk_stride) != OQS_SUCCESS:
+                raise RuntimeError(f"Kyber encapsulation failed (item {i})")
+        return ciphertexts, shared_secrets
+
+    def decapsulate_batch(self, ciphertexts, secret_keys, shared_secrets=None):
+        """
+        批量解封装
 
+        Args:
+            ciphertexts: N × CIPHERTEXT_LEN 的连续缓冲区
+            secret_keys: N × SECRET_KEY_LEN，或单个私钥（所有密文共用）
+            shared_secrets: 可选，预分配的输出缓冲区
 
-def test_kyber():
+        Returns:
+            shared_secrets: 默认为 (N, SHARED_SECRET_LEN) 的 uint8 数组
+        """
+        ct_view, ct_stride, count = self._batch_input(ciphertexts, self.CIPHERTEXT_LEN, None, "ciphertexts")
+        sk_view, sk_stride, _ = self._batch_input(secret_keys, self.SECRET_KEY_LEN, count, "secret_keys")
+        shared_secrets, ss = self._batch_output(shared_secrets, count, self.SHARED_SECRET_LEN, "shared_secrets")
+
+        decaps, kem = self.lib.OQS_KEM_decaps, self.kem
+        ct, sk = ct_view.ctypes.data, sk_view.ctypes.data
+        ss_len = self.SHARED_SECRET_LEN
+        for i in range(count):
+            if decaps(kem, ss + i * ss_len, ct + i * ct_stride, sk + i * sk_stride) != OQS_SUCCESS:
+                raise RuntimeError(f"Kyber decapsulation failed (item {i})")
+        return shared_secrets
+
+
+def test_kyber(algorithm=DEFAULT_ALGORITHM):
     """测试 Kyber KEM 基本功能"""
     print("=" * 70)
     print("🧪 Testing Kyber KEM")
     print("=" * 70)
 
-    kem = KyberKEM()
+    kem = KyberKEM(algorithm)
 
     # 1. 生成密钥对
     print("\n1. Generating keypair...")
@@ -162,5 +428,63 @@ def test_kyber():
     print("=" * 70)
 
 
+def test_kyber_batch(algorithm=DEFAULT_ALGORITHM, count=1000):
+    """测试批量接口与调用方缓冲区，并与单次接口对比每次操作耗时"""
+    print("\n" + "=" * 70)
+    print(f"📦 Testing batched Kyber KEM ({count} items)")
+    print("=" * 70)
+
+    kem = KyberKEM(algorithm)
+
+    t0 = time.perf_counter()
+    for _ in range(count):
+        pk, sk = kem.keypair()
+        ct, ss = kem.encapsulate(pk)
+        kem.decapsulate(ct, sk)
+    single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    public_keys, secret_keys = kem.keypair_batch(count)
+    ciphertexts, secrets_alice = kem.encapsulate_batch(public_keys)
+    secrets_bob = kem.decapsulate_batch(ciphertexts, secret_keys)
+    batch = time.perf_counter() - t0
+
+    if not np.array_equal(secrets_alice, secrets_bob):
+        raise ValueError("Batched Kyber KEM test failed!")
+
+    # 写入调用方提供的 bytearray
+    ss_out = bytearray(kem.SHARED_SECRET_LEN)
+    kem.decapsulate(ciphertexts[0], secret_keys[0], shared_secret_out=ss_out)
+    if bytes(ss_out) != secrets_alice[0].tobytes():
+        raise ValueError("Kyber KEM test with caller buffer failed!")
+
+    print(f"   Single calls:  {single / count * 1e6:.1f} us per keypair+encaps+decaps")
+    print(f"   Batched calls: {batch / count * 1e6:.1f} us per keypair+encaps+decaps")
+    print(f"   ✅ SUCCESS: {count} batched shared secrets match!")
+    print("=" * 70)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='liboqs Kyber / ML-KEM ctypes 封装测试')
+    parser.add_argument('--algorithm', type=str, default=DEFAULT_ALGORITHM,
+                        help='KEM 算法 (默认 Kyber512；ML-KEM-512 / ML-KEM-768 / ML-KEM-1024)')
+    parser.add_argument('--batch', type=int, default=1000,
+                        help='批量测试的条数（0 表示跳过）')
+    parser.add_argument('--list', action='store_true',
+                        help='列出 liboqs 中已启用的 KEM 算法')
+
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(available_kems()))
+        return 0
+
+    test_kyber(args.algorithm)
+    if args.batch > 0:
+        test_kyber_batch(args.algorithm, args.batch)
+    return 0
+
+
 if __name__ == "__main__":
-    test_kyber()
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+PQ-Ntor 多进程握手服务端基准
+估算多核中继并行处理 onionskin 时的扩展性：
+    1. 主进程一次生成 N 个 onionskin，写入共享内存
+    2. 每个工作进程用同一长期私钥构造 PQNtorServer，按批次 [start, stop) 读取共享内存中的
+       onionskin，逐个调用 respond_handshake，把 reply / key_material / 单次耗时写回共享内存
+    3. 主进程只分发批次边界（两个整数），不经过 pickle 传递握手数据
+    4. 依次用 1 .. N 个工作进程重复，报告吞吐 (handshakes/s)、加速比和单次握手耗时分位数
+
+共享内存布局 (count 个握手):
+    [onionskin count × 52B][reply count × 64B][key_material count × 72B][耗时 count × int64 ns]
+
+用法:
+    python3 parallel_handshake_bench.py                                   # 1..CPU核数，各 20000 次握手
+    python3 parallel_handshake_bench.py --workers 1 2 4 8 --handshakes 50000 --batch 512
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simple_pq_ntor import (PQNtorServer, PQNtorClient, ONIONSKIN_LEN, REPLY_LEN,
+                            KEY_MATERIAL_LEN, ROUTER_ID_LEN)
+
+DEFAULT_HANDSHAKES = 20000
+DEFAULT_BATCH = 256
+DEFAULT_VERIFY = 1000
+PERCENTILES = (50, 95, 99)
+
+# 工作进程内的共享状态（由 _init_worker 设置）
+_worker = {}
+
+
+def shm_layout(count):
+    """共享内存各区域的 (偏移, 长度)，以及总大小"""
+    regions = {}
+    offset = 0
+    for name, size in (('onionskins', count * ONIONSKIN_LEN), ('replies', count * REPLY_LEN),
+                       ('keys', count * KEY_MATERIAL_LEN), ('latency', count * 8)):
+        regions[name] = (offset, size)
+        offset += size
+    return regions, offset
+
+
+def available_cores():
+    """当前进程可用的 CPU 核数"""
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+
+
+def default_worker_counts():
+    """1, 2, 4, ... 直到可用 CPU 核数（包含核数本身）"""
+    cores = available_cores()
+    counts = []
+    n = 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    counts.append(cores)
+    return counts
+
+
+def _init_worker(shm_name, count, server_private_bytes):
+    """工作进程初始化：连接共享内存，加载服务端长期密钥"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    regions, _ = shm_layout(count)
+    buf = shm.buf
+    _worker['shm'] = shm
+    _worker['onionskins'] = buf[slice(regions['onionskins'][0], sum(regions['onionskins']))]
+    _worker['replies'] = buf[slice(regions['replies'][0], sum(regions['replies']))]
+    _worker['keys'] = buf[slice(regions['keys'][0], sum(regions['keys']))]
+    _worker['latency'] = np.ndarray((count,), dtype=np.int64, buffer=buf, offset=regions['latency'][0])
+    _worker['server'] = PQNtorServer(server_private_bytes)
+
+
+def _warmup(delay):
+    """占住工作进程一小段时间，确保进程池全部启动后再计时"""
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _respond_range(task):
+    """工作进程：处理共享内存中 [start, stop) 的 onionskin，结果写回共享内存"""
+    start, stop = task
+    respond = _worker['server'].respond_handshake
+    onionskins = _worker['onionskins']
+    replies = _worker['replies']
+    keys = _worker['keys']
+    latency = _worker['latency']
+    clock = time.perf_counter_ns
+
+    for i in range(start, stop):
+        t0 = clock()
+        reply, key_material = respond(onionskins[i * ONIONSKIN_LEN:(i + 1) * ONIONSKIN_LEN])
+        latency[i] = clock() - t0
+        replies[i * REPLY_LEN:(i + 1) * REPLY_LEN] = reply
+        keys[i * KEY_MATERIAL_LEN:(i + 1) * KEY_MATERIAL_LEN] = key_material
+    return stop - start
+
+
+def run_scaling(onionskins, count, server_private_bytes, worker_counts, batch=DEFAULT_BATCH):
+    """
+    对每个工作进程数运行一次完整的服务端处理
+
+    Args:
+        onionskins: count × ONIONSKIN_LEN 的连续 bytes
+        server_private_bytes: 服务端长期私钥（所有工作进程共享同一身份）
+        worker_counts: 要测试的工作进程数列表
+        batch: 每个任务处理的握手数
+
+    Returns:
+        (results, replies, keys): results 为每个进程数的统计 dict 列表，
+        replies / keys 为最后一轮的输出（bytes，用于校验）
+    """
+    regions, total = shm_layout(count)
+    shm = shared_memory.SharedMemory(create=True, size=total)
+    try:
+        offset, size = regions['onionskins']
+        shm.buf[offset:offset + size] = onionskins
+        tasks = [(start, min(start + batch, count)) for start in range(0, count, batch)]
+
+        results = []
+        for workers in worker_counts:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shm.name, count, server_private_bytes)) as executor:
+                list(executor.map(_warmup, [0.05] * workers))
+
+                t0 = time.perf_counter()
+                done = sum(executor.map(_respond_range, tasks))
+                elapsed = time.perf_counter() - t0
+
+            latency_us = np.ndarray((count,), dtype=np.int64, buffer=shm.buf,
+                                    offset=regions['latency'][0]) / 1000.0
+            stats = {
+                'workers': workers,
+                'handshakes': done,
+                'elapsed_s': elapsed,
+                'handshakes_per_s': done / elapsed,
+                'mean_us': float(latency_us.mean()),
+            }
+            for q, v in zip(PERCENTILES, np.percentile(latency_us, PERCENTILES)):
+                stats[f'p{q}_us'] = float(v)
+            del latency_us
+            results.append(stats)
+
+        replies = bytes(shm.buf[slice(regions['replies'][0], sum(regions['replies']))])
+        keys = bytes(shm.buf[slice(regions['keys'][0], sum(regions['keys']))])
+    finally:
+        shm.close()
+        shm.unlink()
+    return results, replies, keys
+
+
+def verify_sample(clients, replies, keys, sample):
+    """用客户端完成前 sample 个握手，检查双方密钥一致"""
+    sample = min(sample, len(clients))
+    client_keys = PQNtorClient.finish_batch(clients[:sample], replies[:sample * REPLY_LEN])
+    return all(client_keys[i] == keys[i * KEY_MATERIAL_LEN:(i + 1) * KEY_MATERIAL_LEN]
+               for i in range(sample))
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='PQ-Ntor 多进程握手服务端扩展性基准')
+    parser.add_argument('--handshakes', type=int, default=DEFAULT_HANDSHAKES,
+                        help='每轮处理的握手数')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='要测试的工作进程数 (默认: 1, 2, 4, ... CPU核数)')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH,
+                        help='每个任务处理的握手数')
+    parser.add_argument('--verify', type=int, default=DEFAULT_VERIFY,
+                        help='由客户端完成并校验的握手数（0 表示不校验）')
+
+    args = parser.parse_args()
+    worker_counts = args.workers or default_worker_counts()
+
+    print("=" * 78)
+    print(f"⚡ PQ-Ntor 多进程服务端基准（{args.handshakes:,} 次握手/轮，批大小 {args.batch}）")
+    print("=" * 78)
+
+    server = PQNtorServer()
+    router_id = os.urandom(ROUTER_ID_LEN)
+    t0 = time.perf_counter()
+    clients, onionskins = PQNtorClient.init_batch(router_id, server.public_key_bytes, args.handshakes)
+    print(f"📦 已生成 {args.handshakes:,} 个 onionskin ({len(onionskins):,} bytes)，"
+          f"耗时 {time.perf_counter() - t0:.2f}秒")
+
+    results, replies, keys = run_scaling(onionskins, args.handshakes,
+                                         server.server_private.private_bytes_raw(),
+                                         worker_counts, batch=args.batch)
+
+    base = results[0]['handshakes_per_s'] / results[0]['workers']
+    print(f"\n{'进程数':>6} {'握手/秒':>12} {'加速比':>8} {'效率':>8} "
+          f"{'均值(us)':>10} {'p50(us)':>10} {'p95(us)':>10} {'p99(us)':>10}")
+    print("-" * 78)
+    for r in results:
+        speedup = r['handshakes_per_s'] / base
+        print(f"{r['workers']:>6} {r['handshakes_per_s']:>12,.0f} {speedup:>7.2f}x "
+              f"{speedup / r['workers'] * 100:>7.1f}% {r['mean_us']:>10.1f} {r['p50_us']:>10.1f} "
+              f"{r['p95_us']:>10.1f} {r['p99_us']:>10.1f}")
+    print("-" * 78)
+
+    if args.verify > 0:
+        if not verify_sample(clients, replies, keys, args.verify):
+            print("❌ 密钥校验失败！")
+            return 1
+        print(f"✓ 前 {min(args.verify, args.handshakes):,} 个握手的客户端/服务端密钥一致")
+
+    cores = available_cores()
+    if max(worker_counts) > cores:
+        print(f"⚠️  工作进程数超过可用 CPU 核数 ({cores})，超出部分的加速比不具参考意义")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,13 +11,15 @@
 """
 
 import os
-import hashlib
+import sys
+import time
 import hmac
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+import hashlib
+import logging
+import argparse
 from cryptography.hazmat.primitives.asymmetric import x25519
-from cryptography.hazmat.primitives import serialization
-import time
+
+logger = logging.getLogger(__name__)
 
 # ============== 协议常量 ==============
 PROTOID = b"tor-pq-ntor-prototype-sha256-1"
@@ -26,24 +28,65 @@ T_VERIFY = PROTOID + b":verify"
 M_EXPAND = PROTOID + b":key_expand"
 
 ROUTER_ID_LEN = 20
+PUBKEY_LEN = 32
+AUTH_LEN = 32
+ONIONSKIN_LEN = ROUTER_ID_LEN + PUBKEY_LEN     # router_id || client_pubkey
+REPLY_LEN = AUTH_LEN + PUBKEY_LEN              # AUTH || server_ephemeral_pubkey
 KEY_MATERIAL_LEN = 72
+HASH_LEN = hashlib.sha256().digest_size
 
-
-# ============== 辅助函数 ==============
-def hmac_sha256(key, data):
-    """HMAC-SHA256"""
-    return hmac.new(key, data, hashlib.sha256).digest()
+# HKDF-Extract 的 salt 为空时取 HashLen 个零字节（RFC 5869），HMAC 密钥固定，预先算好密钥编排
+_HKDF_EXTRACT = hmac.new(bytes(HASH_LEN), digestmod=hashlib.sha256)
 
 
+# ============== 辅助函数 ==============
 def hkdf_expand(secret, info, length=KEY_MATERIAL_LEN):
-    """HKDF 密钥派生"""
-    hkdf = HKDF(
-        algorithm=hashes.SHA256(),
-        length=length,
-        salt=None,
-        info=info
-    )
-    return hkdf.derive(secret)
+    """
+    HKDF-SHA256 密钥派生（salt 为空）
+    直接用 hmac 实现 Extract + Expand，输出与 cryptography 的 HKDF 逐字节一致，
+    但不必每次调用都构造 HKDF / hashes 对象
+    """
+    extract = _HKDF_EXTRACT.copy()
+    extract.update(secret)
+    prk = hmac.new(extract.digest(), digestmod=hashlib.sha256)
+
+    okm = b""
+    block = b""
+    for counter in range(1, -(-length // HASH_LEN) + 1):
+        h = prk.copy()
+        h.update(block + info + bytes((counter,)))
+        block = h.digest()
+        okm += block
+    return okm[:length]
+
+
+def derive_auth_and_keys(dh1, dh2, router_id):
+    """
+    secret_input = DH1 || DH2 || router_id
+    AUTH = HMAC(secret_input, T_VERIFY)，key_seed = HMAC(secret_input, T_KEY)
+    两次 HMAC 共用同一个密钥编排
+
+    Returns:
+        (auth, key_material)
+    """
+    mac = hmac.new(dh1 + dh2 + router_id, digestmod=hashlib.sha256)
+    verify = mac.copy()
+    verify.update(T_VERIFY)
+    mac.update(T_KEY)
+    return verify.digest(), hkdf_expand(mac.digest(), M_EXPAND, KEY_MATERIAL_LEN)
+
+
+def split_batch(items, record_len):
+    """
+    批量输入：bytes 列表，或 n × record_len 字节的连续缓冲区
+    （bytes / bytearray / memoryview / 共享内存），后者按 memoryview 切片不复制
+    """
+    if isinstance(items, (bytes, bytearray, memoryview)):
+        view = memoryview(items).cast('B')
+        if len(view) % record_len:
+            raise ValueError(f"Batch buffer size {len(view)} is not a multiple of {record_len}")
+        return [view[i:i + record_len] for i in range(0, len(view), record_len)]
+    return items
 
 
 # ============== PQ-Ntor 协议 ==============
@@ -57,149 +100,185 @@ class PQNtorClient:
         self.client_private = x25519.X25519PrivateKey.generate()
         self.client_public = self.client_private.public_key()
 
-        print(f"[Client] Initialized")
+        logger.debug("[Client] Initialized")
 
     def init_handshake(self, router_id, server_pubkey_bytes):
         """
         阶段 1: 生成 onionskin
         发送：router_id || client_public_key
         """
-        print(f"\n[Client] === Phase 1: Init Handshake ===")
         self.router_id = router_id
         self.server_pubkey_bytes = server_pubkey_bytes
 
-        # 序列化客户端公钥
-        client_pubkey_bytes = self.client_public.public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw
-        )
-
-        print(f"[Client] Client pubkey: {client_pubkey_bytes[:8].hex()}... ({len(client_pubkey_bytes)} bytes)")
-
         # 构造 onionskin = router_id || client_pubkey
+        client_pubkey_bytes = self.client_public.public_bytes_raw()
         onionskin = router_id + client_pubkey_bytes
-        print(f"[Client] Onionskin size: {len(onionskin)} bytes")
 
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[Client] === Phase 1: Init Handshake ===")
+            logger.debug(f"[Client] Client pubkey: {client_pubkey_bytes[:8].hex()}... ({len(client_pubkey_bytes)} bytes)")
+            logger.debug(f"[Client] Onionskin size: {len(onionskin)} bytes")
         return onionskin
 
-    def finish_handshake(self, server_reply):
+    def finish_handshake(self, server_reply, server_longterm_pubkey=None):
         """
         阶段 3: 完成握手
         接收：AUTH || server_ephemeral_pubkey
+
+        server_longterm_pubkey: 可选，已解析的服务端长期公钥对象（批量时复用，避免重复解析）
         """
-        print(f"\n[Client] === Phase 3: Finish Handshake ===")
-        print(f"[Client] Received reply: {len(server_reply)} bytes")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("[Client] === Phase 3: Finish Handshake ===")
+            logger.debug(f"[Client] Received reply: {len(server_reply)} bytes")
 
         # 解析回复 = AUTH (32 bytes) || server_ephemeral_pubkey (32 bytes)
-        auth = server_reply[:32]
-        server_ephemeral_pubkey_bytes = server_reply[32:]
+        auth = bytes(server_reply[:AUTH_LEN])
+        server_ephemeral_pubkey_bytes = bytes(server_reply[AUTH_LEN:])
 
         # 1. 与服务端长期公钥进行 DH（DH1）
-        server_longterm_pubkey = x25519.X25519PublicKey.from_public_bytes(
-            self.server_pubkey_bytes
-        )
+        if server_longterm_pubkey is None:
+            server_longterm_pubkey = x25519.X25519PublicKey.from_public_bytes(self.server_pubkey_bytes)
         dh1 = self.client_private.exchange(server_longterm_pubkey)
-        print(f"[Client] DH1 (with server long-term): {dh1[:8].hex()}...")
 
         # 2. 与服务端临时公钥进行 DH（DH2）
-        server_ephemeral_pubkey = x25519.X25519PublicKey.from_public_bytes(
-            server_ephemeral_pubkey_bytes
-        )
+        server_ephemeral_pubkey = x25519.X25519PublicKey.from_public_bytes(server_ephemeral_pubkey_bytes)
         dh2 = self.client_private.exchange(server_ephemeral_pubkey)
-        print(f"[Client] DH2 (with server ephemeral): {dh2[:8].hex()}...")
-
-        # 3. 构造密钥派生输入
-        secret_input = dh1 + dh2 + self.router_id
 
-        # 4. 验证服务端 AUTH
-        expected_auth = hmac_sha256(secret_input, T_VERIFY)
-        if auth != expected_auth:
-            print(f"[Client] ❌ AUTH mismatch!")
-            print(f"[Client]    Expected: {expected_auth[:16].hex()}...")
-            print(f"[Client]    Received: {auth[:16].hex()}...")
+        # 3. 验证服务端 AUTH，派生密钥材料
+        expected_auth, key_material = derive_auth_and_keys(dh1, dh2, self.router_id)
+        if debug:
+            logger.debug(f"[Client] DH1 (with server long-term): {dh1[:8].hex()}...")
+            logger.debug(f"[Client] DH2 (with server ephemeral): {dh2[:8].hex()}...")
+        if not hmac.compare_digest(auth, expected_auth):
+            logger.error("[Client] ❌ AUTH mismatch!")
+            logger.error(f"[Client]    Expected: {expected_auth[:16].hex()}...")
+            logger.error(f"[Client]    Received: {auth[:16].hex()}...")
             raise ValueError("❌ Server authentication failed!")
-        print(f"[Client] ✓ Server authenticated")
 
-        # 5. 派生密钥材料
-        key_seed = hmac_sha256(secret_input, T_KEY)
-        key_material = hkdf_expand(key_seed, M_EXPAND, KEY_MATERIAL_LEN)
-
-        print(f"[Client] ✓ Derived keys: {key_material[:8].hex()}...")
+        if debug:
+            logger.debug("[Client] ✓ Server authenticated")
+            logger.debug(f"[Client] ✓ Derived keys: {key_material[:8].hex()}...")
         return key_material
 
+    @staticmethod
+    def init_batch(router_id, server_pubkey_bytes, count):
+        """
+        批量生成 count 个客户端及其 onionskin
+
+        Returns:
+            (clients, onionskins): onionskins 为 count × ONIONSKIN_LEN 的连续 bytes
+        """
+        clients = [PQNtorClient() for _ in range(count)]
+        onionskins = b"".join(c.init_handshake(router_id, server_pubkey_bytes) for c in clients)
+        return clients, onionskins
+
+    @staticmethod
+    def finish_batch(clients, replies):
+        """
+        批量完成握手，服务端长期公钥只解析一次
+
+        Args:
+            replies: respond_batch 返回的连续 bytes，或逐条回复的列表
+
+        Returns:
+            各客户端的密钥材料列表
+        """
+        if not clients:
+            return []
+        server_longterm_pubkey = x25519.X25519PublicKey.from_public_bytes(clients[0].server_pubkey_bytes)
+        return [client.finish_handshake(reply, server_longterm_pubkey)
+                for client, reply in zip(clients, split_batch(replies, REPLY_LEN))]
+
 
 class PQNtorServer:
     """PQ-Ntor 服务端"""
 
-    def __init__(self):
-        # 生成长期密钥对
-        self.server_private = x25519.X25519PrivateKey.generate()
+    def __init__(self, private_key_bytes=None):
+        """
+        private_key_bytes: 可选，32 字节长期私钥（多进程共享同一身份时使用），默认随机生成
+        """
+        # 生成（或加载）长期密钥对
+        if private_key_bytes is None:
+            self.server_private = x25519.X25519PrivateKey.generate()
+        else:
+            self.server_private = x25519.X25519PrivateKey.from_private_bytes(private_key_bytes)
         self.server_public = self.server_private.public_key()
+        self.public_key_bytes = self.server_public.public_bytes_raw()
 
-        self.public_key_bytes = self.server_public.public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw
-        )
+        logger.debug("[Server] Initialized")
+        logger.debug(f"[Server] Public key: {self.public_key_bytes[:8].hex()}... ({len(self.public_key_bytes)} bytes)")
 
-        print(f"[Server] Initialized")
-        print(f"[Server] Public key: {self.public_key_bytes[:8].hex()}... ({len(self.public_key_bytes)} bytes)")
-
-    def respond_handshake(self, onionskin):
+    def _respond(self, onionskin):
         """
-        阶段 2: 处理 onionskin，生成回复
-        接收：router_id || client_public_key
-        发送：AUTH || server_ephemeral_pubkey
-        """
-        print(f"\n[Server] === Phase 2: Respond to Handshake ===")
-        print(f"[Server] Received onionskin: {len(onionskin)} bytes")
+        单个 onionskin 的处理（不输出日志）
 
+        Returns:
+            (reply, key_material, dh1, dh2)
+        """
         # 解析 onionskin
-        router_id = onionskin[:ROUTER_ID_LEN]
-        client_pubkey_bytes = onionskin[ROUTER_ID_LEN:]
-
-        print(f"[Server] Router ID: {router_id.hex()}")
-        print(f"[Server] Client pubkey: {client_pubkey_bytes[:8].hex()}...")
+        router_id = bytes(onionskin[:ROUTER_ID_LEN])
+        client_pubkey = x25519.X25519PublicKey.from_public_bytes(bytes(onionskin[ROUTER_ID_LEN:]))
 
         # 1. 与客户端公钥进行 DH（DH1）
-        client_pubkey = x25519.X25519PublicKey.from_public_bytes(client_pubkey_bytes)
         dh1 = self.server_private.exchange(client_pubkey)
-        print(f"[Server] DH1 (with client key): {dh1[:8].hex()}...")
 
-        # 2. 生成临时密钥对
+        # 2. 生成临时密钥对，与客户端公钥进行第二次 DH（DH2）
         server_ephemeral_private = x25519.X25519PrivateKey.generate()
-        server_ephemeral_public = server_ephemeral_private.public_key()
-
-        # 3. 与客户端公钥进行第二次 DH（DH2）
         dh2 = server_ephemeral_private.exchange(client_pubkey)
-        print(f"[Server] DH2 (with ephemeral key): {dh2[:8].hex()}...")
 
-        # 4. 构造密钥派生输入
-        secret_input = dh1 + dh2 + router_id
+        # 3. 生成认证信息，派生密钥材料
+        auth, key_material = derive_auth_and_keys(dh1, dh2, router_id)
 
-        # 5. 生成认证信息
-        auth = hmac_sha256(secret_input, T_VERIFY)
-        print(f"[Server] Generated AUTH: {auth[:8].hex()}...")
+        # 4. 构造回复 = AUTH || server_ephemeral_pubkey
+        reply = auth + server_ephemeral_private.public_key().public_bytes_raw()
+        return reply, key_material, dh1, dh2
 
-        # 6. 派生密钥材料
-        key_seed = hmac_sha256(secret_input, T_KEY)
-        key_material = hkdf_expand(key_seed, M_EXPAND, KEY_MATERIAL_LEN)
+    def respond_handshake(self, onionskin):
+        """
+        阶段 2: 处理 onionskin，生成回复
+        接收：router_id || client_public_key
+        发送：AUTH || server_ephemeral_pubkey
+        """
+        reply, key_material, dh1, dh2 = self._respond(onionskin)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[Server] === Phase 2: Respond to Handshake ===")
+            logger.debug(f"[Server] Received onionskin: {len(onionskin)} bytes")
+            logger.debug(f"[Server] Router ID: {bytes(onionskin[:ROUTER_ID_LEN]).hex()}")
+            logger.debug(f"[Server] Client pubkey: {bytes(onionskin[ROUTER_ID_LEN:ROUTER_ID_LEN + 8]).hex()}...")
+            logger.debug(f"[Server] DH1 (with client key): {dh1[:8].hex()}...")
+            logger.debug(f"[Server] DH2 (with ephemeral key): {dh2[:8].hex()}...")
+            logger.debug(f"[Server] Generated AUTH: {reply[:8].hex()}...")
+            logger.debug(f"[Server] ✓ Derived keys: {key_material[:8].hex()}...")
+            logger.debug(f"[Server] Reply size: {len(reply)} bytes")
 
-        print(f"[Server] ✓ Derived keys: {key_material[:8].hex()}...")
+        return reply, key_material
 
-        # 7. 构造回复 = AUTH || server_ephemeral_pubkey
-        server_ephemeral_pubkey_bytes = server_ephemeral_public.public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw
-        )
-        reply = auth + server_ephemeral_pubkey_bytes
-        print(f"[Server] Reply size: {len(reply)} bytes")
+    def respond_batch(self, onionskins):
+        """
+        批量处理 onionskin（不输出逐条日志）
 
-        return reply, key_material
+        Args:
+            onionskins: bytes 列表，或 n × ONIONSKIN_LEN 字节的连续缓冲区
+
+        Returns:
+            (replies, key_materials): replies 为 n × REPLY_LEN 的连续 bytes，key_materials 为列表
+        """
+        respond = self._respond
+        replies = []
+        key_materials = []
+        for onionskin in split_batch(onionskins, ONIONSKIN_LEN):
+            reply, key_material, _, _ = respond(onionskin)
+            replies.append(reply)
+            key_materials.append(key_material)
+        logger.debug(f"[Server] Responded to {len(replies)} onionskins")
+        return b"".join(replies), key_materials
 
 
 # ============== 测试函数 ==============
 def test_correctness():
-    """测试协议正确性"""
+    """测试协议正确性（逐步细节以 DEBUG 级别输出，运行时加 --log-level DEBUG 查看）"""
     print("=" * 70)
     print("🔍 Testing PQ-Ntor Protocol Correctness")
     print("=" * 70)
@@ -232,7 +311,7 @@ def test_correctness():
 
 
 def benchmark_performance(iterations=100):
-    """性能基准测试"""
+    """性能基准测试（逐次握手，各阶段分别计时）"""
     print("\n" + "=" * 70)
     print(f"⚡ Benchmarking Performance ({iterations} iterations)")
     print("=" * 70)
@@ -242,37 +321,24 @@ def benchmark_performance(iterations=100):
 
     times = {'client_init': [], 'server_respond': [], 'client_finish': []}
 
-    # 禁用打印以加快测试速度
-    import sys
-    import io
-    null_output = io.StringIO()
-
     for _ in range(iterations):
-        # Phase 1: Client init
-        sys.stdout = null_output  # 禁用打印
         client = PQNtorClient()
-        sys.stdout = sys.__stdout__  # 恢复打印
 
+        # Phase 1: Client init
         t1 = time.perf_counter()
-        sys.stdout = null_output
         onionskin = client.init_handshake(router_id, server.public_key_bytes)
-        sys.stdout = sys.__stdout__
         t2 = time.perf_counter()
         times['client_init'].append((t2 - t1) * 1000)
 
         # Phase 2: Server respond
         t3 = time.perf_counter()
-        sys.stdout = null_output
         server_reply, server_keys = server.respond_handshake(onionskin)
-        sys.stdout = sys.__stdout__
         t4 = time.perf_counter()
         times['server_respond'].append((t4 - t3) * 1000)
 
         # Phase 3: Client finish
         t5 = time.perf_counter()
-        sys.stdout = null_output
         client_keys = client.finish_handshake(server_reply)
-        sys.stdout = sys.__stdout__
         t6 = time.perf_counter()
         times['client_finish'].append((t6 - t5) * 1000)
 
@@ -305,15 +371,61 @@ def benchmark_performance(iterations=100):
     print("    - Kyber768: ~1184 bytes pubkey, ~1088 bytes ciphertext")
 
 
-if __name__ == "__main__":
+def benchmark_batch(count=10000):
+    """批量吞吐基准：一次调用处理 count 个 onionskin，报告每秒握手数"""
+    print("\n" + "=" * 70)
+    print(f"📦 Benchmarking Batch Throughput ({count} handshakes)")
+    print("=" * 70)
+
+    server = PQNtorServer()
+    router_id = os.urandom(ROUTER_ID_LEN)
+
+    t1 = time.perf_counter()
+    clients, onionskins = PQNtorClient.init_batch(router_id, server.public_key_bytes, count)
+    t2 = time.perf_counter()
+    replies, server_keys = server.respond_batch(onionskins)
+    t3 = time.perf_counter()
+    client_keys = PQNtorClient.finish_batch(clients, replies)
+    t4 = time.perf_counter()
+
+    if client_keys != server_keys:
+        raise ValueError("Batch handshake failed: keys mismatch!")
+
+    for name, elapsed in (("Client Init", t2 - t1), ("Server Respond", t3 - t2),
+                          ("Client Finish", t4 - t3), ("Total", t4 - t1)):
+        print(f"  {name + ':':<16} {elapsed * 1000 / count:.4f} ms/handshake  "
+              f"({count / elapsed:,.0f} handshakes/s)")
+    print(f"✓ All {count} key materials match")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='PQ-Ntor Python 原型：正确性测试与性能基准')
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='逐次握手基准的次数')
+    parser.add_argument('--batch', type=int, default=10000,
+                        help='批量吞吐基准的握手数（0 表示跳过）')
+    parser.add_argument('--log-level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='日志级别（DEBUG 输出每一步握手细节）')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(message)s')
+
     # 测试正确性
     test_correctness()
 
     # 性能基准（Python 版本，仅供参考）
     print("\n⏱️  Running performance benchmark...")
-    benchmark_performance(iterations=100)
+    benchmark_performance(iterations=args.iterations)
+    if args.batch > 0:
+        benchmark_batch(count=args.batch)
 
     print("\n" + "=" * 70)
     print("✅ Python prototype completed successfully!")
     print("📝 Next step: Implement C version with real liboqs for paper data")
     print("=" * 70)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
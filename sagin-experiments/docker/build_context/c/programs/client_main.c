@@ -64,6 +64,7 @@ int main(int argc, char *argv[]) {
     printf("[1/4] Fetching directory...\n");
     if (tor_client_fetch_directory(&client) != 0) {
         fprintf(stderr, "Failed to fetch directory\n");
+        tor_client_print_events(&client);
         tor_client_cleanup(&client);
         return 1;
     }
@@ -72,6 +73,7 @@ int main(int argc, char *argv[]) {
     printf("\n[2/4] Building 3-hop circuit...\n");
     if (tor_client_build_circuit(&client) != 0) {
         fprintf(stderr, "Failed to build circuit\n");
+        tor_client_print_events(&client);
         tor_client_cleanup(&client);
         return 1;
     }
@@ -85,6 +87,7 @@ int main(int argc, char *argv[]) {
 
     if (response_len < 0) {
         fprintf(stderr, "HTTP request failed\n");
+        tor_client_print_events(&client);
         tor_client_cleanup(&client);
         return 1;
     }
@@ -94,6 +97,9 @@ int main(int argc, char *argv[]) {
     printf("%s\n", response);
     printf("============================================\n");
 
+    // Per-phase timing events (parsed by the experiment scripts)
+    tor_client_print_events(&client);
+
     // Cleanup
     tor_client_cleanup(&client);
 
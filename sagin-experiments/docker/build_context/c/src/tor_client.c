@@ -19,6 +19,27 @@
 #include <netinet/in.h>
 #include <arpa/inet.h>
 #include <netdb.h>
+#include <time.h>
+
+/* Helper: Current monotonic time in nanoseconds */
+static uint64_t monotonic_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ULL + (uint64_t)ts.tv_nsec;
+}
+
+/* Helper: Record event with an explicit timestamp */
+static void record_event_at(tor_client_t *client, const char *name, int hop, uint64_t t_ns) {
+    if (client->num_events >= TOR_CLIENT_MAX_EVENTS) return;
+    tor_client_event_t *ev = &client->events[client->num_events++];
+    ev->name = name;
+    ev->hop = hop;
+    ev->t_ns = t_ns;
+}
+
+void tor_client_record_event(tor_client_t *client, const char *name, int hop) {
+    record_event_at(client, name, hop, monotonic_ns());
+}
 
 /* Helper: Parse JSON node list (simplified parser) */
 static int parse_node_list(const char *json, tor_node_t **nodes, int *count, int type) {
@@ -117,6 +138,7 @@ int tor_client_init(tor_client_t *client, const tor_client_config_t *config) {
  * Fetch node list from directory server
  */
 int tor_client_fetch_directory(tor_client_t *client) {
+    tor_client_record_event(client, "dir_fetch_start", 0);
     printf("[Client] Fetching node list from directory...\n");
 
     // Resolve directory hostname
@@ -193,6 +215,7 @@ int tor_client_fetch_directory(tor_client_t *client) {
     parse_node_list(json, &client->guards, &client->num_guards, 1);
     parse_node_list(json, &client->middles, &client->num_middles, 2);
     parse_node_list(json, &client->exits, &client->num_exits, 3);
+    tor_client_record_event(client, "dir_fetch_done", 0);
 
     printf("[Client] Found %d guards, %d middles, %d exits\n",
            client->num_guards, client->num_middles, client->num_exits);
@@ -237,6 +260,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
         return -1;
     }
 
+    tor_client_record_event(client, "guard_connected", 1);
     printf("[Client] Connected to Guard\n");
 
     // Perform handshake (Hybrid NTOR or Classic NTOR)
@@ -249,6 +273,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
     if (client->config.use_classic_ntor) {
         // Classic NTOR handshake
         classic_ntor_client_state classic_state;
+        tor_client_record_event(client, "onionskin_start", 1);
         printf("[Client] Creating Classic NTOR onionskin...\n");
         if (classic_ntor_client_create_onionskin(&classic_state, onionskin, guard->identity) != CLASSIC_NTOR_SUCCESS) {
             fprintf(stderr, "[Client] Failed to create Classic NTOR onionskin\n");
@@ -280,6 +305,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
             return -1;
         }
         cell_free(create2);
+        tor_client_record_event(client, "create2_sent", 1);
 
         printf("[Client] CREATE2 sent, waiting for CREATED2...\n");
 
@@ -292,6 +318,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
             return -1;
         }
 
+        tor_client_record_event(client, "created2_recv", 1);
         printf("[Client] Received CREATED2\n");
 
         // Parse reply
@@ -319,12 +346,14 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
         onion_crypto_init(&client->circuit->crypto);
         onion_crypto_add_layer(&client->circuit->crypto, 0, key_material);
 
+        tor_client_record_event(client, "hop_done", 1);
         printf("[Client] First hop established (Classic NTOR)\n");
         return 0;
 
     } else {
         // Hybrid NTOR handshake (Kyber-512 + X25519)
         hybrid_ntor_client_state hybrid_state;
+        tor_client_record_event(client, "onionskin_start", 1);
         printf("[Client] Creating Hybrid NTOR onionskin (Kyber+X25519)...\n");
         if (hybrid_ntor_client_create_onionskin(&hybrid_state, onionskin, guard->identity) != HYBRID_NTOR_SUCCESS) {
             fprintf(stderr, "[Client] Failed to create Hybrid NTOR onionskin\n");
@@ -356,6 +385,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
             return -1;
         }
         cell_free(create2);
+        tor_client_record_event(client, "create2_sent", 1);
 
         printf("[Client] CREATE2 sent, waiting for CREATED2...\n");
 
@@ -368,6 +398,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
             return -1;
         }
 
+        tor_client_record_event(client, "created2_recv", 1);
         printf("[Client] Received CREATED2\n");
 
         // Parse reply
@@ -395,6 +426,7 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
         onion_crypto_init(&client->circuit->crypto);
         onion_crypto_add_layer(&client->circuit->crypto, 0, key_material);
 
+        tor_client_record_event(client, "hop_done", 1);
         printf("[Client] First hop established (Hybrid Kyber+X25519)\n");
         return 0;
     }
@@ -404,6 +436,8 @@ int tor_client_create_first_hop(tor_client_t *client, const tor_node_t *guard) {
  * Extend circuit to another node
  */
 static int extend_circuit(tor_client_t *client, const tor_node_t *next_node, int layer_idx) {
+    int hop = layer_idx + 1;
+    tor_client_record_event(client, "onionskin_start", hop);
     printf("[Client] Extending circuit to %s:%u\n", next_node->hostname, next_node->port);
 
     // Create onionskin for next hop
@@ -464,6 +498,7 @@ static int extend_circuit(tor_client_t *client, const tor_node_t *next_node, int
         return -1;
     }
     cell_free(relay_cell);
+    tor_client_record_event(client, "extend2_sent", hop);
 
     printf("[Client] EXTEND2 sent, waiting for EXTENDED2...\n");
 
@@ -474,6 +509,7 @@ static int extend_circuit(tor_client_t *client, const tor_node_t *next_node, int
         if (response) cell_free(response);
         return -1;
     }
+    tor_client_record_event(client, "extended2_recv", hop);
 
     // Decrypt response
     onion_crypto_decrypt(&client->circuit->crypto, response->payload);
@@ -509,6 +545,7 @@ static int extend_circuit(tor_client_t *client, const tor_node_t *next_node, int
 
     // Add new crypto layer
     onion_crypto_add_layer(&client->circuit->crypto, layer_idx, key_material);
+    tor_client_record_event(client, "hop_done", hop);
 
     printf("[Client] Circuit extended (layer %d added)\n", layer_idx);
     return 0;
@@ -537,6 +574,7 @@ int tor_client_build_circuit(tor_client_t *client) {
         return -1;
     }
 
+    tor_client_record_event(client, "circuit_start", 0);
     printf("[Client] Building 3-hop circuit...\n");
 
     // Select nodes (just use first one of each type)
@@ -559,6 +597,7 @@ int tor_client_build_circuit(tor_client_t *client) {
         return -1;
     }
 
+    tor_client_record_event(client, "circuit_done", 0);
     printf("[Client] 3-hop circuit established!\n");
     printf("[Client]   Guard:  %s:%u\n", guard->hostname, guard->port);
     printf("[Client]   Middle: %s:%u\n", middle->hostname, middle->port);
@@ -596,6 +635,7 @@ int tor_client_begin_stream(tor_client_t *client, const char *target_host, uint1
         return -1;
     }
     cell_free(relay_cell);
+    tor_client_record_event(client, "begin_sent", 0);
 
     printf("[Client] Sent RELAY_BEGIN\n");
 
@@ -605,6 +645,7 @@ int tor_client_begin_stream(tor_client_t *client, const char *target_host, uint1
         fprintf(stderr, "[Client] Failed to receive RELAY_CONNECTED\n");
         return -1;
     }
+    tor_client_record_event(client, "connected_recv", 0);
 
     // Decrypt
     onion_crypto_decrypt(&client->circuit->crypto, response->payload);
@@ -747,9 +788,12 @@ int tor_client_http_get(tor_client_t *client, const char *url, char *response, s
     if (tor_client_send_data(client, (uint8_t*)request, req_len) < 0) {
         return -1;
     }
+    tor_client_record_event(client, "request_sent", 0);
 
     // Receive response (with timeout handling)
+    // The loop ends on the receive timeout, so the last DATA cell is timestamped here
     size_t total = 0;
+    uint64_t last_data_ns = 0;
     while (total < response_size - 1) {
         int n = tor_client_recv_data(client, (uint8_t*)response + total, response_size - total - 1);
         if (n < 0) {
@@ -764,10 +808,15 @@ int tor_client_http_get(tor_client_t *client, const char *url, char *response, s
             // Not a DATA cell (could be END, CONNECTED, etc.) - ignore and continue
             continue;
         } else {
+            last_data_ns = monotonic_ns();
+            if (total == 0) {
+                record_event_at(client, "data_first", 0, last_data_ns);
+            }
             total += n;
         }
     }
     response[total] = '\0';
+    record_event_at(client, "data_last", 0, last_data_ns);
 
     printf("\n[4/4] Response received (%zu bytes):\n", total);
     return total;
@@ -803,6 +852,17 @@ void tor_client_cleanup(tor_client_t *client) {
     memset(client, 0, sizeof(tor_client_t));
 }
 
+/**
+ * Print timing events
+ */
+void tor_client_print_events(const tor_client_t *client) {
+    for (int i = 0; i < client->num_events; i++) {
+        const tor_client_event_t *ev = &client->events[i];
+        printf("[EVENT] {\"event\":\"%s\",\"hop\":%d,\"t_ns\":%llu}\n",
+               ev->name, ev->hop, (unsigned long long)ev->t_ns);
+    }
+}
+
 /**
  * Print statistics
  */
@@ -41,6 +41,15 @@ typedef struct {
     bool established;
 } tor_circuit_t;
 
+/* Timing event (CLOCK_MONOTONIC), printed as "[EVENT] {json}" lines */
+#define TOR_CLIENT_MAX_EVENTS 64
+
+typedef struct {
+    const char *name;   // e.g. "create2_sent", "extended2_recv"
+    int hop;            // 1=Guard, 2=Middle, 3=Exit, 0=not hop-specific
+    uint64_t t_ns;      // Monotonic timestamp in nanoseconds
+} tor_client_event_t;
+
 /* Client configuration */
 typedef struct {
     char directory_host[256];
@@ -61,6 +70,10 @@ typedef struct {
     int num_middles;
     tor_node_t *exits;
     int num_exits;
+
+    // Per-phase timing events
+    tor_client_event_t events[TOR_CLIENT_MAX_EVENTS];
+    int num_events;
 } tor_client_t;
 
 /*
@@ -152,4 +165,21 @@ int tor_client_http_get(tor_client_t *client,
  */
 void tor_client_print_stats(const tor_client_t *client);
 
+/*
+ * Timing events
+ */
+
+/**
+ * Record a timing event with the current monotonic time
+ * @param name Event name (must be a string literal)
+ * @param hop Hop number (1-3), or 0 if not hop-specific
+ */
+void tor_client_record_event(tor_client_t *client, const char *name, int hop);
+
+/**
+ * Print recorded events to stdout, one "[EVENT] {json}" line each
+ * (call before tor_client_cleanup, which clears them)
+ */
+void tor_client_print_events(const tor_client_t *client);
+
 #endif /* TOR_CLIENT_H */
@@ -15,7 +15,7 @@ from pathlib import Path
 
 # 导入卫星轨道模块
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'satellite-integration-test'))
-from satellite_orbit import SatelliteOrbit
+from satellite_orbit import SatelliteOrbit, DEFAULT_CACHE_DIR
 
 # 配置参数
 SCRIPT_DIR = Path(__file__).parent.absolute()
@@ -67,7 +67,7 @@ def initialize_satellite():
     print("  - Semi-major axis: 7190.14km")
     print()
 
-    satellite_orbit = SatelliteOrbit()
+    satellite_orbit = SatelliteOrbit(lazy=True, cache_dir=DEFAULT_CACHE_DIR)
     print("✓ Satellite orbit initialized")
     print(f"✓ Best communication window selected")
     print()
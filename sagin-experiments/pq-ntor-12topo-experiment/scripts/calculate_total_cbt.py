@@ -16,6 +16,10 @@ import json
 import csv
 from pathlib import Path
 
+import numpy as np
+
+from cbt_model import MESSAGE_SIZES, TOTAL_CBT_MODEL, cbt_components
+
 # 路径配置
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent
@@ -29,12 +33,7 @@ WSL2_CSV_FILE = Path("/tmp/phase3_sagin_cbt.csv")
 # 输出文件
 OUTPUT_CSV = SCRIPT_DIR.parent / "results" / "local_wsl" / "phase3_sagin_cbt_with_network_20251215.csv"
 
-# 消息大小 (bytes)
-MESSAGE_SIZES = {
-    "Classic NTOR": 116,      # ~116 bytes total (CREATE2 + CREATED2)
-    "PQ-NTOR": 1620,          # Kyber768 public key + ciphertext
-    "Hybrid NTOR": 1684       # X25519 + Kyber768
-}
+PROTOCOLS = ["Classic NTOR", "PQ-NTOR", "Hybrid NTOR"]
 
 # 拓扑描述
 TOPO_DESCRIPTIONS = {
@@ -74,45 +73,6 @@ def load_wsl2_crypto_cbt():
     return crypto_cbt
 
 
-def calculate_network_delay(delay_ms):
-    """
-    计算网络传播延迟
-    三跳电路: Client -> Guard -> Middle -> Exit
-    每跳往返 = 2 × single_delay
-    总共 3 跳 × 2 = 6 × single_delay
-    """
-    return 6 * delay_ms
-
-
-def calculate_transmission_delay(message_size_bytes, bandwidth_mbps):
-    """
-    计算传输延迟
-    Time = Size / Bandwidth
-    """
-    # 转换: bytes -> bits, Mbps -> bps
-    size_bits = message_size_bytes * 8
-    bandwidth_bps = bandwidth_mbps * 1e6
-
-    # 三跳电路，每跳需要传输消息
-    # 简化模型: 假设往返共传输 3 × message_size
-    total_bits = size_bits * 3
-
-    delay_sec = total_bits / bandwidth_bps
-    return delay_sec * 1000  # 转换为 ms
-
-
-def calculate_retransmission_delay(loss_percent, base_delay_ms):
-    """
-    估算重传延迟
-    基于丢包率和基础延迟
-    简化模型: retrans_delay = loss_rate × base_delay × retrans_factor
-    """
-    loss_rate = loss_percent / 100
-    # 假设重传因子为 2 (TCP-like)
-    retrans_factor = 2.0
-    return loss_rate * base_delay_ms * retrans_factor
-
-
 def main():
     print("=" * 70)
     print("  计算Total_CBT (基于最新拓扑参数)")
@@ -133,53 +93,45 @@ def main():
     print("计算Total_CBT:")
     print("-" * 70)
 
-    for i in range(1, 13):
-        topo_id = f"topo{i:02d}"
-        params = topo_params[topo_id]
-
-        e2e = params["end_to_end"]
-        bandwidth = e2e["rate_mbps"]
-        delay = e2e["delay_ms"]
-        loss = e2e["packet_loss_percent"]
-
-        for protocol in ["Classic NTOR", "PQ-NTOR", "Hybrid NTOR"]:
-            # Crypto_CBT from WSL2 experiment
-            crypto_ms = crypto_cbt.get(topo_id, {}).get(protocol, 0.5)
-
-            # Network delay
-            network_delay = calculate_network_delay(delay)
-
-            # Transmission delay
-            msg_size = MESSAGE_SIZES[protocol]
-            trans_delay = calculate_transmission_delay(msg_size, bandwidth)
-
-            # Retransmission delay
-            retrans_delay = calculate_retransmission_delay(loss, network_delay + trans_delay)
-
-            # Total CBT
-            total_cbt = crypto_ms + network_delay + trans_delay + retrans_delay
-
-            # Network ratio
-            network_ratio = (network_delay + trans_delay + retrans_delay) / total_cbt * 100
-
+    # (拓扑 × 协议) 参数矩阵，一次向量化计算全部组合（模型见 cbt_model.py）
+    topo_ids = [f"topo{i:02d}" for i in range(1, 13)]
+    e2e = [topo_params[topo_id]["end_to_end"] for topo_id in topo_ids]
+    bandwidth = np.array([e["rate_mbps"] for e in e2e])[:, None]
+    delay = np.array([e["delay_ms"] for e in e2e])[:, None]
+    loss = np.array([e["packet_loss_percent"] for e in e2e])[:, None]
+    msg_size = np.array([MESSAGE_SIZES[p] for p in PROTOCOLS])[None, :]
+    # Crypto_CBT from WSL2 experiment
+    crypto = np.array([[crypto_cbt.get(topo_id, {}).get(protocol, 0.5) for protocol in PROTOCOLS]
+                       for topo_id in topo_ids])
+
+    cbt = cbt_components(bandwidth, delay, loss, msg_size, crypto, TOTAL_CBT_MODEL)
+    shape = crypto.shape
+    network_delay = np.broadcast_to(cbt["network_delay_ms"], shape)
+    trans_delay = np.broadcast_to(cbt["transmission_delay_ms"], shape)
+    retrans_delay = cbt["retransmission_delay_ms"]
+    total_cbt = cbt["total_cbt_ms"]
+    network_ratio = cbt["network_ratio"]
+
+    for t, topo_id in enumerate(topo_ids):
+        for p, protocol in enumerate(PROTOCOLS):
             results.append({
                 "Topology": topo_id,
                 "Protocol": protocol,
                 "Description": TOPO_DESCRIPTIONS.get(topo_id, ""),
-                "Bandwidth_Mbps": bandwidth,
-                "Link_Delay_ms": delay,
-                "Loss_Percent": loss,
-                "Crypto_CBT_ms": round(crypto_ms, 3),
-                "Network_Delay_ms": round(network_delay, 3),
-                "Transmission_Delay_ms": round(trans_delay, 3),
-                "Retransmission_Delay_ms": round(retrans_delay, 3),
-                "Total_CBT_ms": round(total_cbt, 3),
-                "Network_Ratio": round(network_ratio, 2)
+                "Bandwidth_Mbps": e2e[t]["rate_mbps"],
+                "Link_Delay_ms": e2e[t]["delay_ms"],
+                "Loss_Percent": e2e[t]["packet_loss_percent"],
+                "Crypto_CBT_ms": round(float(crypto[t, p]), 3),
+                "Network_Delay_ms": round(float(network_delay[t, p]), 3),
+                "Transmission_Delay_ms": round(float(trans_delay[t, p]), 3),
+                "Retransmission_Delay_ms": round(float(retrans_delay[t, p]), 3),
+                "Total_CBT_ms": round(float(total_cbt[t, p]), 3),
+                "Network_Ratio": round(float(network_ratio[t, p]), 2)
             })
 
-            print(f"{topo_id} | {protocol:15} | Crypto={crypto_ms:.3f}ms | "
-                  f"Net={network_delay:.2f}ms | Trans={trans_delay:.3f}ms | "
-                  f"Total={total_cbt:.2f}ms")
+            print(f"{topo_id} | {protocol:15} | Crypto={crypto[t, p]:.3f}ms | "
+                  f"Net={network_delay[t, p]:.2f}ms | Trans={trans_delay[t, p]:.3f}ms | "
+                  f"Total={total_cbt[t, p]:.2f}ms")
 
     # 保存CSV
     OUTPUT_CSV.parent.mkdir(parents=True, exist_ok=True)
@@ -204,7 +156,7 @@ def main():
     print("  汇总统计")
     print("=" * 70)
 
-    for protocol in ["Classic NTOR", "PQ-NTOR", "Hybrid NTOR"]:
+    for protocol in PROTOCOLS:
         proto_results = [r for r in results if r["Protocol"] == protocol]
         total_cbts = [r["Total_CBT_ms"] for r in proto_results]
         crypto_cbts = [r["Crypto_CBT_ms"] for r in proto_results]
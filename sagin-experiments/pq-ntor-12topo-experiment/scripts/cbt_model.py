@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Total_CBT 计算模型（向量化）
+
+    Total_CBT = Crypto_CBT + Network_Delay + Transmission_Delay + Retransmission_Delay
+
+    Network_Delay        = 2 × hops × link_delay             (每跳一个往返)
+    Transmission_Delay   = tx_messages × message_size / bandwidth
+    Retransmission_Delay = loss × retrans_factor × (Network_Delay [+ Transmission_Delay])
+
+所有参数均可为 NumPy 数组，按广播规则一次算完整个参数空间。各分析脚本历史上使用的
+常数略有不同，统一用 CBTModel 描述：
+    TOTAL_CBT_MODEL        calculate_total_cbt.py（重传含传输延迟，因子 2）
+    DETAILED_FORMAT_MODEL  convert_csv_to_detailed_format.py（重传只算传播延迟，因子 1）
+    PHASE3_ESSAY_MODEL     essay/analyze_phase3_with_network.py（6 次传输，带宽按 2^20 bit/s 换算）
+
+用法:
+    python3 cbt_model.py                                   # 500×500×50 扫描立方体
+    python3 cbt_model.py --bandwidth-steps 200 --delay-steps 200 --loss-steps 20 --out cube.npz
+    python3 cbt_model.py --overhead 5                      # PQ-NTOR 开销 <5% 所需的最低带宽
+"""
+
+import sys
+import time
+import argparse
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+# 消息大小 (bytes)
+MESSAGE_SIZES = {
+    "Classic NTOR": 116,      # ~116 bytes total (CREATE2 + CREATED2)
+    "PQ-NTOR": 1620,          # Kyber768 public key + ciphertext
+    "Hybrid NTOR": 1684       # X25519 + Kyber768
+}
+
+# Phase 2 实测握手时间 (ms)，没有逐拓扑 Crypto_CBT 时使用
+CRYPTO_CBT_MS = {
+    "Classic NTOR": 0.08682,
+    "PQ-NTOR": 0.03705,
+}
+DEFAULT_CRYPTO_CBT_MS = 0.5   # 缺少实测值时的缺省 Crypto_CBT
+
+
+class CBTModel(namedtuple('CBTModel', [
+        'hops', 'tx_messages', 'retrans_factor', 'retrans_includes_transmission',
+        'bits_per_megabit'])):
+    """
+    CBT 模型常数
+
+    hops: 电路跳数，Network_Delay = 2 × hops × link_delay
+    tx_messages: 传输延迟计入的消息份数
+    retrans_factor: 重传因子
+    retrans_includes_transmission: 重传延迟的基数是否包含传输延迟
+    bits_per_megabit: 带宽单位换算（1e6 或 2^20）
+    """
+    __slots__ = ()
+
+
+TOTAL_CBT_MODEL = CBTModel(hops=3, tx_messages=3, retrans_factor=2.0,
+                           retrans_includes_transmission=True, bits_per_megabit=1e6)
+DETAILED_FORMAT_MODEL = CBTModel(hops=3, tx_messages=3, retrans_factor=1.0,
+                                 retrans_includes_transmission=False, bits_per_megabit=1e6)
+PHASE3_ESSAY_MODEL = CBTModel(hops=3, tx_messages=6, retrans_factor=1.0,
+                              retrans_includes_transmission=False, bits_per_megabit=1024 * 1024)
+
+DEFAULT_MODEL = TOTAL_CBT_MODEL
+
+
+def cbt_components(bandwidth_mbps, delay_ms, loss_percent, message_bytes, crypto_ms,
+                   model=DEFAULT_MODEL):
+    """
+    计算 Total_CBT 及各组成部分（参数可广播）
+
+    Args:
+        bandwidth_mbps: 端到端带宽 (Mbps)
+        delay_ms: 单跳单向链路延迟 (ms)
+        loss_percent: 丢包率 (%)
+        message_bytes: 协议握手消息大小 (bytes)
+        crypto_ms: 密码学计算时间 Crypto_CBT (ms)
+        model: CBTModel
+
+    Returns:
+        dict: network_delay_ms, transmission_delay_ms, retransmission_delay_ms,
+              total_cbt_ms, network_ratio（全部网络开销占比 %），
+              propagation_ratio（仅传播延迟占比 %）
+    """
+    bandwidth_mbps = np.asarray(bandwidth_mbps, dtype=float)
+    delay_ms = np.asarray(delay_ms, dtype=float)
+    loss_rate = np.asarray(loss_percent, dtype=float) / 100
+    message_bytes = np.asarray(message_bytes, dtype=float)
+    crypto_ms = np.asarray(crypto_ms, dtype=float)
+
+    network = 2 * model.hops * delay_ms
+    transmission = model.tx_messages * message_bytes * 8 / (bandwidth_mbps * model.bits_per_megabit) * 1000
+    base = network + transmission if model.retrans_includes_transmission else network
+    retransmission = loss_rate * base * model.retrans_factor
+    total = crypto_ms + network + transmission + retransmission
+
+    return {
+        'network_delay_ms': network,
+        'transmission_delay_ms': transmission,
+        'retransmission_delay_ms': retransmission,
+        'total_cbt_ms': total,
+        'network_ratio': (network + transmission + retransmission) / total * 100,
+        'propagation_ratio': network / total * 100,
+    }
+
+
+def _linear_terms(delay_ms, loss_percent, message_bytes, crypto_ms, model):
+    """Total_CBT = a + b / bandwidth 中的 a、b（参数可广播）"""
+    loss_rate = np.asarray(loss_percent, dtype=float) / 100
+    network = 2 * model.hops * np.asarray(delay_ms, dtype=float)
+    k = model.tx_messages * 8 * 1000 / model.bits_per_megabit
+    retrans_tx = loss_rate * model.retrans_factor if model.retrans_includes_transmission else 0.0
+    a = np.asarray(crypto_ms, dtype=float) + network * (1 + loss_rate * model.retrans_factor)
+    b = k * np.asarray(message_bytes, dtype=float) * (1 + retrans_tx)
+    return a, b
+
+
+def total_cbt_cube(bandwidths, delays, losses, message_bytes, crypto_ms,
+                   model=DEFAULT_MODEL, dtype=np.float32):
+    """
+    稠密扫描立方体 Total_CBT[bandwidth, delay, loss]
+
+    利用 Total_CBT 关于 1/bandwidth 线性，只做一次广播加法，
+    500×500×50 的 float32 立方体约 50 MB、耗时亚秒级。
+
+    Returns:
+        (len(bandwidths), len(delays), len(losses)) 数组
+    """
+    a, b = _linear_terms(np.asarray(delays)[:, None], np.asarray(losses)[None, :],
+                         message_bytes, crypto_ms, model)
+    inv_bw = (1.0 / np.asarray(bandwidths, dtype=float)).astype(dtype)
+    cube = np.empty((len(inv_bw),) + a.shape, dtype=dtype)
+    np.multiply(inv_bw[:, None, None], b.astype(dtype), out=cube)
+    cube += a.astype(dtype)
+    return cube
+
+
+def overhead_percent(bandwidth_mbps, delay_ms, loss_percent,
+                     pq=("PQ-NTOR", None), classic=("Classic NTOR", None),
+                     model=DEFAULT_MODEL):
+    """
+    PQ 协议相对经典协议的 Total_CBT 开销 (%)
+
+    pq / classic: (协议名, crypto_ms)，crypto_ms 为 None 时取 CRYPTO_CBT_MS
+    """
+    t_pq = _protocol_total(bandwidth_mbps, delay_ms, loss_percent, pq, model)
+    t_classic = _protocol_total(bandwidth_mbps, delay_ms, loss_percent, classic, model)
+    return (t_pq / t_classic - 1) * 100
+
+
+def _crypto_ms(protocol):
+    name, crypto = protocol
+    return CRYPTO_CBT_MS.get(name, DEFAULT_CRYPTO_CBT_MS) if crypto is None else crypto
+
+
+def _protocol_total(bandwidth_mbps, delay_ms, loss_percent, protocol, model):
+    return cbt_components(bandwidth_mbps, delay_ms, loss_percent, MESSAGE_SIZES[protocol[0]],
+                          _crypto_ms(protocol), model)['total_cbt_ms']
+
+
+def min_bandwidth_for_overhead(threshold_percent, delay_ms, loss_percent,
+                               pq=("PQ-NTOR", None), classic=("Classic NTOR", None),
+                               model=DEFAULT_MODEL):
+    """
+    PQ 开销不超过 threshold_percent 所需的最低带宽 (Mbps)，闭式解（参数可广播）
+
+    由 (a_pq + b_pq/bw) <= (1+θ)(a_c + b_c/bw) 得 bw·D <= E，
+    D = a_pq - (1+θ)a_c，E = (1+θ)b_c - b_pq。
+
+    Returns:
+        最低带宽；任意带宽都满足时为 0，任意带宽都不满足时为 inf
+    """
+    theta = np.asarray(threshold_percent, dtype=float) / 100
+    a_pq, b_pq = _linear_terms(delay_ms, loss_percent, MESSAGE_SIZES[pq[0]], _crypto_ms(pq), model)
+    a_c, b_c = _linear_terms(delay_ms, loss_percent, MESSAGE_SIZES[classic[0]],
+                             _crypto_ms(classic), model)
+    D = a_pq - (1 + theta) * a_c
+    E = (1 + theta) * b_c - b_pq
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bound = E / D
+    # D < 0: bw >= E/D；D >= 0: 仅当 E >= 0 时成立（此时条件为 bw <= E/D，最低带宽为 0）
+    return np.where(D < 0, np.maximum(bound, 0.0), np.where(E >= 0, 0.0, np.inf))
+
+
+def main():
+    """主函数：生成扫描立方体 / 开销阈值曲面"""
+    parser = argparse.ArgumentParser(description='向量化 Total_CBT 参数空间扫描')
+    parser.add_argument('--bandwidth-range', type=float, nargs=2, default=(1.0, 100.0),
+                        help='带宽范围 (Mbps)')
+    parser.add_argument('--delay-range', type=float, nargs=2, default=(0.01, 30.0),
+                        help='单跳延迟范围 (ms)')
+    parser.add_argument('--loss-range', type=float, nargs=2, default=(0.0, 5.0),
+                        help='丢包率范围 (%%)')
+    parser.add_argument('--bandwidth-steps', type=int, default=500)
+    parser.add_argument('--delay-steps', type=int, default=500)
+    parser.add_argument('--loss-steps', type=int, default=50)
+    parser.add_argument('--protocol', type=str, choices=list(MESSAGE_SIZES), default='PQ-NTOR',
+                        help='扫描立方体使用的协议')
+    parser.add_argument('--crypto-ms', type=float, default=None,
+                        help='Crypto_CBT (ms)，默认取 Phase 2 实测值')
+    parser.add_argument('--overhead', type=float, default=None,
+                        help='输出 PQ-NTOR 开销不超过该百分比所需的最低带宽曲面')
+    parser.add_argument('--out', type=str, default=None,
+                        help='保存为 .npz（含坐标轴）')
+
+    args = parser.parse_args()
+
+    bandwidths = np.linspace(*args.bandwidth_range, args.bandwidth_steps)
+    delays = np.linspace(*args.delay_range, args.delay_steps)
+    losses = np.linspace(*args.loss_range, args.loss_steps)
+    crypto = _crypto_ms((args.protocol, args.crypto_ms))
+
+    arrays = {'bandwidths_mbps': bandwidths, 'delays_ms': delays, 'losses_percent': losses}
+
+    start = time.perf_counter()
+    cube = total_cbt_cube(bandwidths, delays, losses, MESSAGE_SIZES[args.protocol], crypto)
+    elapsed = time.perf_counter() - start
+    arrays['total_cbt_ms'] = cube
+    print(f"📊 {args.protocol} Total_CBT 立方体 {cube.shape}: "
+          f"{cube.min():.2f} - {cube.max():.2f} ms，耗时 {elapsed:.2f}秒")
+
+    if args.overhead is not None:
+        start = time.perf_counter()
+        surface = min_bandwidth_for_overhead(args.overhead, delays[:, None], losses[None, :])
+        elapsed = time.perf_counter() - start
+        arrays['min_bandwidth_mbps'] = surface
+        finite = surface[np.isfinite(surface)]
+        span = f"{finite.min():.2f} - {finite.max():.2f} Mbps" if finite.size else "全部不可达"
+        print(f"📈 PQ-NTOR 开销 <{args.overhead}% 的最低带宽曲面 {surface.shape}: {span}，"
+              f"不可达 {np.count_nonzero(~np.isfinite(surface))} 点，耗时 {elapsed:.3f}秒")
+
+    if args.out:
+        np.savez(Path(args.out), **arrays)
+        print(f"💾 已保存: {args.out}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Total_CBT 蒙特卡洛仿真
+cbt_model.py 用 loss × base_delay × 2 的期望值估算重传延迟，完全看不到尾延迟；
+这里逐次采样三跳电路建立过程中每条消息的丢包与 RTO 退避，给出 CBT 分布的 p50/p95/p99。
+
+单次电路建立 = 3 跳 × (请求 + 响应) 共 6 条单向消息，每条消息:
+    分片: 握手消息按 Tor cell (509B 负载 / 514B) 切分，再按 TCP MSS 1460B 打包为 n 个分段
+    丢包: 每个分段以逐跳丢包率 p 独立丢失，丢失的分段在 RTO 超时后重传，RTO 每轮翻倍（上限 RTO_MAX）
+    耗时: 单向延迟 + 传输延迟 + 各轮 RTO 等待；整条消息在最后一个分段到达时完成
+
+n 个分段都到达所需的发送轮数 K 满足 P(K <= k) = (1 - p^k)^n，按逆变换一次采样，
+不需要逐分段模拟；所有电路按批次 (batch, 6) 一次性用 NumPy 生成。
+握手消息大小取 cbt_model.MESSAGE_SIZES（请求/响应各一半），丢包率与延迟取 topology_params.json。
+
+用法:
+    python3 cbt_montecarlo.py                                   # 12拓扑 × 3协议，每组 100 万次
+    python3 cbt_montecarlo.py --circuits 5000000 --topology topo01 --topology topo02
+    python3 cbt_montecarlo.py --rto-min 1000 --out ../results/local_wsl/cbt_montecarlo.csv
+"""
+
+import sys
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from cbt_model import MESSAGE_SIZES, CRYPTO_CBT_MS, DEFAULT_CRYPTO_CBT_MS, TOTAL_CBT_MODEL, cbt_components
+
+# ==================== 配置参数 ====================
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent
+TOPOLOGY_PARAMS_FILE = PROJECT_ROOT / "last_experiment" / "topology_params.json"
+
+PROTOCOLS = ["Classic NTOR", "PQ-NTOR", "Hybrid NTOR"]
+
+HOPS = 3
+CELL_BYTES = 514            # Tor cell（链路协议 v4+）
+CELL_PAYLOAD_BYTES = 509
+TCP_MSS_BYTES = 1460
+TCP_IP_HEADER_BYTES = 40
+
+RTO_MIN_MS = 200.0          # Linux TCP_RTO_MIN
+RTO_MAX_MS = 120000.0       # Linux TCP_RTO_MAX
+MAX_ROUNDS = 64             # 超过的轮数按上限截断（p^64 可忽略）
+
+DEFAULT_CIRCUITS = 1_000_000
+DEFAULT_BATCH = 1_000_000
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+def message_wire_format(message_bytes):
+    """
+    单向握手消息的分片情况
+
+    Returns:
+        (segments, wire_bytes): TCP 分段数、含 cell 与 TCP/IP 头的线上字节数
+    """
+    cells = -(-int(message_bytes) // CELL_PAYLOAD_BYTES)
+    payload = cells * CELL_BYTES
+    segments = -(-payload // TCP_MSS_BYTES)
+    return segments, payload + segments * TCP_IP_HEADER_BYTES
+
+
+def retransmission_wait_table(rto_ms, max_rounds=MAX_ROUNDS):
+    """wait[k]: 第 k 轮才全部送达时累计的 RTO 等待 (ms)，k 从 1 开始，wait[1] = 0"""
+    timeouts = np.minimum(rto_ms * 2.0 ** np.arange(max_rounds), RTO_MAX_MS)
+    return np.concatenate(([0.0, 0.0], np.cumsum(timeouts)[:max_rounds - 1]))
+
+
+def sample_rounds(rng, loss_rate, segments, size):
+    """
+    采样每条消息全部分段送达所需的发送轮数 K
+
+    P(K <= k) = (1 - p^k)^n  =>  K = ceil(log(1 - U^(1/n)) / log p)
+    """
+    if loss_rate <= 0:
+        return np.ones(size, dtype=np.int64)
+    u = rng.random(size)
+    with np.errstate(divide='ignore'):
+        k = np.ceil(np.log1p(-u ** (1.0 / segments)) / np.log(loss_rate))
+    return np.clip(k, 1, MAX_ROUNDS).astype(np.int64)
+
+
+def simulate_cbt(bandwidth_mbps, delay_ms, loss_percent, message_bytes, crypto_ms,
+                 circuits=DEFAULT_CIRCUITS, batch=DEFAULT_BATCH, rto_min_ms=RTO_MIN_MS, rng=None):
+    """
+    蒙特卡洛采样一个 (拓扑, 协议) 组合的电路建立时间
+
+    Args:
+        bandwidth_mbps / delay_ms / loss_percent: 端到端链路参数（丢包率视为逐跳、逐分段）
+        message_bytes: 请求 + 响应的握手消息总大小
+        crypto_ms: 密码学计算时间
+        circuits: 采样的电路建立次数
+        batch: 每批电路数（控制内存）
+        rto_min_ms: 初始 RTO 下限，实际 RTO = max(rto_min_ms, 2 × RTT)
+
+    Returns:
+        (cbt_ms, retransmitted): float32 的 CBT 样本，以及发生过重传的电路比例
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    loss_rate = loss_percent / 100
+    messages = 2 * HOPS
+    segments, wire_bytes = message_wire_format(message_bytes / 2)
+
+    transmission_ms = wire_bytes * 8 / (bandwidth_mbps * 1e6) * 1000
+    fixed_ms = crypto_ms + messages * (delay_ms + transmission_ms)
+    rto_ms = max(rto_min_ms, 2 * 2 * delay_ms)
+    wait_table = retransmission_wait_table(rto_ms)
+
+    samples = np.empty(circuits, dtype=np.float32)
+    retransmitted = 0
+    for start in range(0, circuits, batch):
+        n = min(batch, circuits - start)
+        rounds = sample_rounds(rng, loss_rate, segments, (n, messages))
+        wait = wait_table[rounds].sum(axis=1)
+        samples[start:start + n] = fixed_ms + wait
+        retransmitted += np.count_nonzero(wait)
+    return samples, retransmitted / circuits
+
+
+def summarize(samples):
+    """CBT 样本统计"""
+    values = np.percentile(samples, PERCENTILES)
+    stats = {f"p{str(q).replace('.', '_')}": float(v) for q, v in zip(PERCENTILES, values)}
+    stats['mean'] = float(samples.mean())
+    stats['max'] = float(samples.max())
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Total_CBT 蒙特卡洛仿真（丢包重传尾延迟）')
+    parser.add_argument('--params', type=str, default=str(TOPOLOGY_PARAMS_FILE),
+                        help='拓扑参数文件 (topology_params.json)')
+    parser.add_argument('--topology', action='append', default=None,
+                        help='只仿真指定拓扑，可重复 (默认: 全部)')
+    parser.add_argument('--circuits', type=int, default=DEFAULT_CIRCUITS,
+                        help='每个 (拓扑, 协议) 的电路建立次数')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH,
+                        help='每批采样的电路数')
+    parser.add_argument('--rto-min', type=float, default=RTO_MIN_MS,
+                        help='RTO 下限 (ms)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='随机种子（可复现）')
+    parser.add_argument('--out', type=str, default=None,
+                        help='结果 CSV 路径')
+
+    args = parser.parse_args()
+
+    with open(args.params, 'r') as f:
+        topo_params = json.load(f)
+    topo_ids = args.topology or sorted(topo_params)
+    rng = np.random.default_rng(args.seed)
+
+    print("=" * 96)
+    print(f"  Total_CBT 蒙特卡洛仿真（每组 {args.circuits:,} 次电路建立，RTO下限 {args.rto_min:.0f}ms）")
+    print("=" * 96)
+    print(f"{'拓扑':<8} {'协议':<14} {'分段':>4} {'丢包%':>6} {'模型均值':>9} {'MC均值':>9} "
+          f"{'p50':>8} {'p95':>8} {'p99':>9} {'p99.9':>9} {'重传比例':>8}")
+    print("-" * 96)
+
+    rows = []
+    start = time.perf_counter()
+    for topo_id in topo_ids:
+        e2e = topo_params[topo_id]["end_to_end"]
+        for protocol in PROTOCOLS:
+            crypto = CRYPTO_CBT_MS.get(protocol, DEFAULT_CRYPTO_CBT_MS)
+            msg_size = MESSAGE_SIZES[protocol]
+            samples, retrans_ratio = simulate_cbt(
+                e2e["rate_mbps"], e2e["delay_ms"], e2e["packet_loss_percent"], msg_size, crypto,
+                circuits=args.circuits, batch=args.batch, rto_min_ms=args.rto_min, rng=rng)
+            stats = summarize(samples)
+            analytic = float(cbt_components(e2e["rate_mbps"], e2e["delay_ms"],
+                                            e2e["packet_loss_percent"], msg_size, crypto,
+                                            TOTAL_CBT_MODEL)["total_cbt_ms"])
+            segments, _ = message_wire_format(msg_size / 2)
+
+            rows.append({
+                "Topology": topo_id,
+                "Protocol": protocol,
+                "Bandwidth_Mbps": e2e["rate_mbps"],
+                "Link_Delay_ms": e2e["delay_ms"],
+                "Loss_Percent": e2e["packet_loss_percent"],
+                "Segments_Per_Message": segments,
+                "Model_Total_CBT_ms": round(analytic, 3),
+                "MC_Mean_ms": round(stats["mean"], 3),
+                "MC_P50_ms": round(stats["p50"], 3),
+                "MC_P95_ms": round(stats["p95"], 3),
+                "MC_P99_ms": round(stats["p99"], 3),
+                "MC_P99_9_ms": round(stats["p99_9"], 3),
+                "MC_Max_ms": round(stats["max"], 3),
+                "Retransmitted_Ratio": round(retrans_ratio, 5),
+                "Circuits": args.circuits,
+            })
+            print(f"{topo_id:<8} {protocol:<14} {segments:>4} {e2e['packet_loss_percent']:>6.2f} "
+                  f"{analytic:>9.2f} {stats['mean']:>9.2f} {stats['p50']:>8.2f} {stats['p95']:>8.2f} "
+                  f"{stats['p99']:>9.2f} {stats['p99_9']:>9.2f} {retrans_ratio * 100:>7.2f}%")
+    elapsed = time.perf_counter() - start
+
+    print("-" * 96)
+    total = len(rows) * args.circuits
+    print(f"✅ 共仿真 {total:,} 次电路建立，耗时 {elapsed:.2f}秒 ({total / elapsed / 1e6:.1f} M/s)")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"结果已保存至: {out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
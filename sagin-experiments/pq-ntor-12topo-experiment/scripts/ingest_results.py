@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+PQ-NTOR测试数据列式入库工具
+并行解析日志目录和结果JSON，写入按 (拓扑, 模式, 运行, 时间戳) 组织的列式存储
+
+表:
+    runs   - 每次运行一行（来自 topoNN[_mode]_results.json 的 test_runs）
+    phases - 每个阶段一行（结果JSON中的逐跳耗时 + 客户端日志 [EVENT] 事件流）
+    logs   - 每个日志文件一行（成功标记、响应大小、错误数）
+
+日志文件名不含运行时间（重跑同一拓扑会覆盖同名日志），因此 logs 表和事件流来源的
+phases 行 timestamp 为空，与 runs 按 (topology_id, mode, run_id) 关联；
+结果JSON来源的行使用运行记录中的 timestamp。
+
+存储格式为 Parquet（需要 pandas + pyarrow）或 NumPy .npz（无额外依赖）。
+重复入库是增量的：mtime/大小未变的文件直接跳过，内容哈希未变的文件不重新解析。
+
+用法:
+    python3 ingest_results.py                     # 入库 logs/ 和 results/local_wsl/
+    python3 ingest_results.py --workers 8 --format npz
+    python3 -c "from ingest_results import load_store; print(load_store()['runs'])"
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from parse_logs import PQNTORLogParser
+
+# ==================== 配置参数 ====================
+SCRIPT_DIR = Path(__file__).parent.absolute()
+EXP_DIR = SCRIPT_DIR.parent
+LOGS_DIR = EXP_DIR / "logs"
+RESULTS_DIR = EXP_DIR / "results" / "local_wsl"
+STORE_DIR = EXP_DIR / "results" / "store"
+
+TABLES = ('runs', 'phases', 'logs')
+MANIFEST_NAME = "manifest.json"
+# 行格式变化时递增，旧版本的存储整体重建
+STORE_VERSION = 2
+
+# 日志文件名: <节点>[_<模式>]_topoNN_runNN.log / <节点>_<标识>_fleet.log
+LOG_NAME_PATTERN = re.compile(
+    r'^(?P<node>directory|guard|middle|exit|client)'
+    r'(?:_(?P<mode>pq|classic))?'
+    r'(?:_topo(?P<topo>\d+))?'
+    r'(?:_run(?P<run>\d+))?'
+    r'(?:_.*)?\.log$'
+)
+# 结果文件名: topoNN_results.json / topoNN_<模式>_results.json
+RESULT_NAME_PATTERN = re.compile(r'^topo(?P<topo>\d+)(?:_(?P<mode>pq|classic))?_results\.json$')
+
+# 每个表的列（固定顺序，缺失值用 NaN / 空字符串）
+COLUMNS = {
+    'runs': ['topology_id', 'mode', 'run_id', 'timestamp', 'topology_name', 'success',
+             'exit_code', 'duration', 'fleet_mode', 'circuit_build_time_ms',
+             'pq_handshake_time_us', 'total_rtt_ms', 'http_get_time_ms',
+             'directory_fetch_ms', 'time_to_first_byte_ms', 'throughput_mbps',
+             'response_size_bytes', 'delay_ms', 'bandwidth_mbps', 'loss_percent',
+             'source_file'],
+    'phases': ['topology_id', 'mode', 'run_id', 'timestamp', 'source', 'phase', 'hop',
+               'duration_ms', 'source_file'],
+    'logs': ['topology_id', 'mode', 'run_id', 'timestamp', 'node', 'success',
+             'circuit_established', 'response_bytes', 'error_count', 'size_bytes',
+             'source_file'],
+}
+STRING_COLUMNS = {'mode', 'timestamp', 'topology_name', 'fleet_mode', 'source', 'phase',
+                  'node', 'source_file'}
+
+# 客户端事件流中的阶段: (阶段名, 起始事件, 结束事件, 跳数)
+EVENT_PHASES = [
+    ('directory_fetch', 'dir_fetch_start', 'dir_fetch_done', 0),
+    ('circuit_build', 'circuit_start', 'circuit_done', 0),
+    ('hop_rtt', 'create2_sent', 'created2_recv', 1),
+    ('hop_rtt', 'extend2_sent', 'extended2_recv', 2),
+    ('hop_rtt', 'extend2_sent', 'extended2_recv', 3),
+    ('hop_total', 'onionskin_start', 'hop_done', 1),
+    ('hop_total', 'onionskin_start', 'hop_done', 2),
+    ('hop_total', 'onionskin_start', 'hop_done', 3),
+    ('stream_begin', 'begin_sent', 'connected_recv', 0),
+    ('time_to_first_byte', 'request_sent', 'data_first', 0),
+    ('http_get', 'request_sent', 'data_last', 0),
+]
+
+
+# ==================== 单文件解析（进程池任务） ====================
+def file_digest(path):
+    """文件内容的SHA-1（按块读取）"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _key(topo, mode, run, timestamp):
+    return {'topology_id': topo, 'mode': mode or '', 'run_id': run, 'timestamp': timestamp or ''}
+
+
+def ingest_result_file(path):
+    """解析结果JSON为 runs / phases 行"""
+    match = RESULT_NAME_PATTERN.match(path.name)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    topo = data.get('topology_id', int(match.group('topo')))
+    mode = data.get('mode') or match.group('mode') or 'pq'
+    network = data.get('config', {}).get('network_simulation', {}).get('aggregate_params', {})
+    rows = {'runs': [], 'phases': []}
+
+    for run in data.get('test_runs', []):
+        key = _key(topo, mode, run.get('run_id'), run.get('timestamp'))
+        net = run.get('network_config') or network
+        row = dict(key)
+        row.update({
+            'topology_name': run.get('topology_name', data.get('topology_name', '')),
+            'success': run.get('success'),
+            'exit_code': run.get('exit_code'),
+            'duration': run.get('duration'),
+            'fleet_mode': run.get('fleet_mode', ''),
+            'delay_ms': net.get('delay_ms'),
+            'bandwidth_mbps': net.get('bandwidth_mbps'),
+            'loss_percent': net.get('loss_percent'),
+        })
+        for column in ('circuit_build_time_ms', 'pq_handshake_time_us', 'total_rtt_ms',
+                       'http_get_time_ms', 'directory_fetch_ms', 'time_to_first_byte_ms',
+                       'throughput_mbps', 'response_size_bytes'):
+            row[column] = run.get(column)
+        rows['runs'].append(row)
+
+        for hop in run.get('hop_timings') or []:
+            for phase, value in (('hop_rtt', hop.get('rtt_ms')), ('hop_total', hop.get('total_ms')),
+                                 ('client_handshake', None if hop.get('client_handshake_us') is None
+                                  else hop['client_handshake_us'] / 1000)):
+                if value is not None:
+                    rows['phases'].append(dict(key, source='result', phase=phase,
+                                               hop=hop.get('hop'), duration_ms=value))
+    return rows
+
+
+def ingest_log_file(path):
+    """解析单个节点日志为 logs 行，客户端日志的事件流另外生成 phases 行"""
+    match = LOG_NAME_PATTERN.match(path.name)
+    parser = PQNTORLogParser(path)
+    metrics = parser.parse_metrics()
+
+    topo = int(match.group('topo')) if match.group('topo') else None
+    run = int(match.group('run')) if match.group('run') else None
+    mode = match.group('mode') or ''
+    # 日志没有运行时间戳（mtime只是最后写入时间，无法与runs关联），留空
+    key = _key(topo, mode, run, None)
+
+    rows = {'logs': [dict(key, node=match.group('node'),
+                          success=metrics['success'],
+                          circuit_established=metrics['circuit_established'],
+                          response_bytes=metrics['response_bytes'],
+                          error_count=len(parser.extract_error_messages()),
+                          size_bytes=parser.bytes_parsed)],
+            'phases': []}
+
+    for phase, start, end, hop in EVENT_PHASES:
+        t0 = parser.events.get((start, hop))
+        t1 = parser.events.get((end, hop))
+        if t0 is not None and t1 is not None:
+            rows['phases'].append(dict(key, source='events', phase=phase, hop=hop,
+                                       duration_ms=(t1 - t0) / 1e6))
+    return rows
+
+
+def ingest_file(path_str, known_sha1=None):
+    """
+    进程池任务：按文件类型分派
+
+    Returns:
+        (路径, 内容哈希, 各表行)；内容哈希与known_sha1相同时不解析，各表行为None
+    """
+    path = Path(path_str)
+    digest = file_digest(path)
+    if digest == known_sha1:
+        return path_str, digest, None
+
+    if path.suffix == '.json':
+        rows = ingest_result_file(path)
+    else:
+        rows = ingest_log_file(path)
+    for table_rows in rows.values():
+        for row in table_rows:
+            row['source_file'] = path_str
+    return path_str, digest, rows
+
+
+# ==================== 列式存储 ====================
+def parquet_available():
+    """是否可写 Parquet（pandas + pyarrow）"""
+    try:
+        import pandas  # noqa: F401
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def rows_to_columns(table, rows):
+    """行字典列表 -> {列名: numpy数组}"""
+    columns = {}
+    for name in COLUMNS[table]:
+        values = [row.get(name) for row in rows]
+        if name in STRING_COLUMNS:
+            columns[name] = np.array(['' if v is None else str(v) for v in values], dtype=str)
+        else:
+            columns[name] = np.array([np.nan if v is None else float(v) for v in values],
+                                     dtype=np.float64)
+    return columns
+
+
+def concat_columns(table, parts):
+    """按列拼接多个列字典"""
+    parts = [p for p in parts if p and len(next(iter(p.values()))) > 0]
+    if not parts:
+        return rows_to_columns(table, [])
+    return {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS[table]}
+
+
+def filter_columns(columns, keep_mask):
+    return {name: values[keep_mask] for name, values in columns.items()}
+
+
+def write_table(store_dir, table, columns, fmt):
+    """写入单个表（先写临时文件再替换，避免读到写了一半的文件）"""
+    if fmt == 'parquet':
+        import pandas as pd
+        path = store_dir / f"{table}.parquet"
+        tmp = path.with_suffix('.parquet.tmp')
+        pd.DataFrame(columns).to_parquet(tmp, index=False)
+    else:
+        path = store_dir / f"{table}.npz"
+        tmp = path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp, **columns)
+    os.replace(tmp, path)
+    return path
+
+
+def read_table(store_dir, table):
+    """读取单个表为 {列名: numpy数组}（不存在时返回None）"""
+    parquet_path = store_dir / f"{table}.parquet"
+    npz_path = store_dir / f"{table}.npz"
+    if parquet_path.exists():
+        import pandas as pd
+        df = pd.read_parquet(parquet_path)
+        return {name: df[name].to_numpy() for name in df.columns}
+    if npz_path.exists():
+        with np.load(npz_path) as data:
+            return {name: data[name] for name in data.files}
+    return None
+
+
+def load_store(store_dir=STORE_DIR, as_dataframe=True):
+    """
+    加载列式存储（供下游分析脚本使用）
+
+    Args:
+        store_dir: 存储目录
+        as_dataframe: 是否返回 pandas.DataFrame（否则返回 {列名: numpy数组}）
+
+    Returns:
+        {表名: DataFrame 或 列字典}
+    """
+    store_dir = Path(store_dir)
+    tables = {}
+    for table in TABLES:
+        columns = read_table(store_dir, table)
+        if columns is None:
+            columns = rows_to_columns(table, [])
+        if as_dataframe:
+            import pandas as pd
+            columns = pd.DataFrame(columns)
+        tables[table] = columns
+    return tables
+
+
+# ==================== 增量入库 ====================
+def load_manifest(store_dir):
+    manifest_path = store_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {'format': None, 'files': {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def discover_files(logs_dir, results_dir):
+    """待入库文件：日志目录下的节点日志 + 结果目录下的结果JSON"""
+    files = []
+    if logs_dir.exists():
+        files += [p for p in sorted(logs_dir.rglob('*.log')) if LOG_NAME_PATTERN.match(p.name)]
+    if results_dir.exists():
+        files += [p for p in sorted(results_dir.glob('*.json')) if RESULT_NAME_PATTERN.match(p.name)]
+    return files
+
+
+def ingest(logs_dir=LOGS_DIR, results_dir=RESULTS_DIR, store_dir=STORE_DIR,
+           workers=None, fmt=None, force=False):
+    """
+    增量入库
+
+    Args:
+        logs_dir: 日志目录
+        results_dir: 结果JSON目录
+        store_dir: 列式存储目录
+        workers: 进程池大小（None表示CPU核数）
+        fmt: 'parquet' / 'npz'，None表示有pyarrow时用parquet
+        force: 忽略清单，全部重新解析
+
+    Returns:
+        入库统计
+    """
+    fmt = fmt or ('parquet' if parquet_available() else 'npz')
+    if fmt == 'parquet' and not parquet_available():
+        # 在动存储之前检查，避免删掉旧表后才发现写不了
+        raise ImportError("写入 Parquet 需要 pandas + pyarrow（或使用 --format npz）")
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(store_dir)
+    # 切换格式时整体重建；另一种格式的旧表等新表全部写完后再删除
+    switching = manifest.get('format') != fmt
+    if switching or manifest.get('version') != STORE_VERSION:
+        force = True
+    if force:
+        manifest = {'format': fmt, 'version': STORE_VERSION, 'files': {}}
+    known = manifest['files']
+
+    files = discover_files(Path(logs_dir), Path(results_dir))
+    current = {str(p): p.stat() for p in files}
+
+    # mtime和大小都没变：跳过；否则交给进程池（哈希相同的结果会被丢弃）
+    candidates = [path for path, st in current.items()
+                  if path not in known
+                  or known[path]['mtime_ns'] != st.st_mtime_ns
+                  or known[path]['size'] != st.st_size]
+    removed = [path for path in known if path not in current]
+
+    changed = {}
+    unchanged_hash = 0
+    if candidates:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            known_hashes = [known[path]['sha1'] if path in known else None
+                            for path in candidates]
+            for path, digest, rows in executor.map(ingest_file, candidates, known_hashes,
+                                                   chunksize=8):
+                st = current[path]
+                if rows is None:
+                    unchanged_hash += 1
+                else:
+                    changed[path] = rows
+                known[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha1': digest}
+    for path in removed:
+        del known[path]
+
+    # 用变化文件的新行替换其旧行
+    stale = set(changed) | set(removed)
+    for table in TABLES:
+        existing = read_table(store_dir, table) if not force else None
+        if existing is not None and stale:
+            keep = ~np.isin(existing['source_file'], list(stale))
+            existing = filter_columns(existing, keep)
+        new_rows = [row for rows in changed.values() for row in rows.get(table, [])]
+        if existing is not None and not new_rows and not stale:
+            continue
+        columns = concat_columns(table, [existing, rows_to_columns(table, new_rows)])
+        write_table(store_dir, table, columns, fmt)
+
+    if switching:
+        other = 'npz' if fmt == 'parquet' else 'parquet'
+        for table in TABLES:
+            (store_dir / f"{table}.{other}").unlink(missing_ok=True)
+
+    manifest['updated'] = datetime.now().isoformat()
+    manifest_path = store_dir / MANIFEST_NAME
+    tmp = manifest_path.with_suffix('.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, manifest_path)
+
+    return {
+        'format': fmt,
+        'files': len(files),
+        'parsed': len(candidates),
+        'changed': len(changed),
+        'unchanged_content': unchanged_hash,
+        'skipped': len(files) - len(candidates),
+        'removed': len(removed),
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='并行解析测试日志/结果并写入列式存储')
+    parser.add_argument('--logs-dir', type=str, default=str(LOGS_DIR),
+                        help='日志目录路径')
+    parser.add_argument('--results-dir', type=str, default=str(RESULTS_DIR),
+                        help='结果JSON目录路径')
+    parser.add_argument('--store', type=str, default=str(STORE_DIR),
+                        help='列式存储目录')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行进程数 (默认: CPU核数)')
+    parser.add_argument('--format', type=str, choices=['parquet', 'npz'], default=None,
+                        help='存储格式 (默认: 有pyarrow时parquet，否则npz)')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略增量清单，全部重新解析')
+
+    args = parser.parse_args()
+
+    start = datetime.now()
+    try:
+        stats = ingest(Path(args.logs_dir), Path(args.results_dir), Path(args.store),
+                       workers=args.workers, fmt=args.format, force=args.force)
+    except ImportError as e:
+        print(f"❌ {e}")
+        return 1
+    elapsed = (datetime.now() - start).total_seconds()
+
+    print(f"📂 列式存储: {args.store} ({stats['format']})")
+    print(f"   文件 {stats['files']} 个: 解析 {stats['parsed']}, 更新 {stats['changed']}, "
+          f"内容未变 {stats['unchanged_content']}, 跳过 {stats['skipped']}, "
+          f"删除 {stats['removed']}")
+    print(f"✅ 入库完成，耗时 {elapsed:.2f}秒")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
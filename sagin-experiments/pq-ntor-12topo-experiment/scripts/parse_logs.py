@@ -8,84 +8,230 @@ PQ-NTOR日志解析工具
 """
 
 import re
+import io
+import sys
 import json
+import time
+import codecs
 from pathlib import Path
 from typing import Dict, Optional
 
 
-class PQNTORLogParser:
-    """PQ-NTOR日志解析器"""
-
-    def __init__(self, log_path: Path):
-        self.log_path = log_path
-        self.log_content = ""
+# 事件流行前缀（客户端结束时输出的 "[EVENT] {json}"）
+EVENT_PREFIX = '[EVENT] '
+
+# 读取块大小：模式表按块匹配，内存占用与日志总大小无关
+CHUNK_SIZE = 1 << 20
+
+# 编译后的模式表：块由完整的行组成，.* / .*? 不跨行，
+# 因此逐块匹配与对整个日志匹配的结果一致
+RESPONSE_PATTERN = re.compile(r'Response received \((\d+) bytes\)')
+# 指标名 -> (忽略大小写的关键词, 模式)；关键词先在casefold后的块中做字面预筛，
+# 忽略大小写的正则无法利用字面前缀加速
+TIME_PATTERNS = {
+    'circuit_build_ms': ('circuit established',
+                         re.compile(r'circuit established.*?(\d+)\s*ms', re.IGNORECASE)),
+    'handshake_us': ('handshake', re.compile(r'handshake.*?(\d+)\s*us', re.IGNORECASE)),
+    'total_rtt_ms': ('rtt', re.compile(r'RTT.*?(\d+)\s*ms', re.IGNORECASE)),
+}
+STEP_MARKERS = {
+    'create2_sent': '[Client] CREATE2 sent successfully',
+    'created2_received': '[Client] Received CREATED2',
+    'first_hop_established': '[Client] First hop established',
+    'extended2_received': '[Client] Received EXTENDED2',
+}
+ERROR_PATTERNS = [re.compile(p, re.MULTILINE)
+                  for p in (r'ERROR:.*', r'\[Error\].*', r'Failed.*', r'❌.*')]
+# 客户端退出前（return 1）输出的致命错误，出现即表示本次测试失败
+FATAL_MARKERS = ('Failed to initialize client', 'Failed to fetch directory',
+                 'Failed to build circuit', 'HTTP request failed')
+
+# --follow 时日志超过该时长（秒）没有增长即判定客户端已退出
+FOLLOW_IDLE_TIMEOUT = 60.0
 
-        if log_path.exists():
-            with open(log_path, 'r', encoding='utf-8') as f:
-                self.log_content = f.read()
 
+class PQNTORLogParser:
+    """
+    PQ-NTOR日志解析器（单遍流式）
+
+    按块读取日志，每块只包含完整的行，对块应用编译好的模式表，
+    不把整个日志读入内存。解析状态是增量的：follow=True 时保留未写完的
+    末行，之后调用 update() 只解析新追加的内容，可用于跟踪正在写入的日志。
+    """
+
+    def __init__(self, log_path: Optional[Path] = None, follow: bool = False):
+        """
+        Args:
+            log_path: 日志文件路径（None表示之后通过feed()/parse_stream()输入）
+            follow: 是否跟踪模式（不把未以换行结尾的末行视为完整行）
+        """
+        self.log_path = log_path
+        self.follow = follow
+        self.offset = 0
+        self.bytes_parsed = 0
+        self._reset_state()
+
+        if log_path is not None and log_path.exists():
+            self.update()
+            if not follow:
+                self.finish()
+
+    def _reset_state(self):
+        """清空增量解析状态"""
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ''
+        self.circuit_established = False
+        self.test_completed = False
+        self.fatal_error = None
+        self.response_bytes = None
+        self.times = {}
+        self.steps = {key: False for key in STEP_MARKERS}
+        self.errors = [[] for _ in ERROR_PATTERNS]
+        self.events = {}  # (事件名, hop) -> 首次出现的t_ns
+
+    # -------------------- 输入 --------------------
+    def update(self) -> int:
+        """
+        读取日志文件自上次位置以来新增的内容
+
+        Returns:
+            本次读取的字节数（文件被截断/轮转时从头重新解析）
+        """
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            self.offset = 0
+            self._reset_state()
+
+        read = 0
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                read += len(chunk)
+                self.feed_bytes(chunk)
+        self.offset += read
+        return read
+
+    def parse_stream(self, stream) -> 'PQNTORLogParser':
+        """从文件对象或管道（文本或二进制）读取直到EOF"""
+        binary = isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or \
+            'b' in getattr(stream, 'mode', '')
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if binary:
+                self.feed_bytes(chunk)
+            else:
+                self.feed(chunk)
+        self.finish()
+        return self
+
+    def feed_bytes(self, data: bytes):
+        """输入一段原始字节（可在任意位置截断，包括UTF-8多字节字符中间）"""
+        self.bytes_parsed += len(data)
+        self.feed(self._decoder.decode(data))
+
+    def feed(self, text: str):
+        """输入一段文本，只处理其中完整的行"""
+        text = self._pending + text
+        end = text.rfind('\n')
+        if end < 0:
+            self._pending = text
+            return
+        self._pending = text[end + 1:]
+        self._scan(text[:end + 1].replace('\r\n', '\n'))
+
+    def finish(self):
+        """输入结束：把未以换行结尾的末行也作为完整行处理"""
+        tail = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        if tail:
+            self._scan(tail.rstrip('\r'))
+
+    # -------------------- 解析 --------------------
+    def _scan(self, block: str):
+        """
+        对由完整行组成的文本块应用模式表
+
+        只取首次出现的指标一旦命中即从后续块的匹配中移除，
+        错误信息按模式分别累积。
+        """
+        if not self.circuit_established and '3-hop circuit established!' in block:
+            self.circuit_established = True
+        if not self.test_completed and 'Test completed successfully!' in block:
+            self.test_completed = True
+        if self.fatal_error is None:
+            for marker in FATAL_MARKERS:
+                if marker in block:
+                    self.fatal_error = marker
+                    break
+        if self.response_bytes is None:
+            match = RESPONSE_PATTERN.search(block)
+            if match:
+                self.response_bytes = int(match.group(1))
+
+        folded = None
+        for key, (keyword, pattern) in TIME_PATTERNS.items():
+            if key in self.times:
+                continue
+            if folded is None:
+                folded = block.casefold()
+            if keyword in folded:
+                match = pattern.search(block)
+                if match:
+                    self.times[key] = float(match.group(1))
+
+        for key, marker in STEP_MARKERS.items():
+            if not self.steps[key] and marker in block:
+                self.steps[key] = True
+
+        for errors, pattern in zip(self.errors, ERROR_PATTERNS):
+            errors.extend(pattern.findall(block))
+
+        # 事件行：按字面前缀查找（行首锚定的正则无法利用前缀加速）
+        pos = block.find(EVENT_PREFIX)
+        while pos >= 0:
+            end = block.find('\n', pos)
+            if end < 0:
+                end = len(block)
+            if pos == 0 or block[pos - 1] == '\n':
+                try:
+                    event = json.loads(block[pos + len(EVENT_PREFIX):end])
+                    self.events.setdefault((event['event'], event.get('hop', 0)),
+                                           event['t_ns'])
+                except (ValueError, KeyError, TypeError):
+                    pass
+            pos = block.find(EVENT_PREFIX, end)
+
+    # -------------------- 结果 --------------------
     def parse_metrics(self) -> Dict:
         """解析性能指标"""
         metrics = {
-            'success': False,
-            'circuit_established': False,
-            'http_success': False,
-            'response_bytes': 0
+            'success': self.test_completed,
+            'circuit_established': self.circuit_established,
+            'http_success': self.response_bytes is not None,
+            'response_bytes': self.response_bytes or 0
         }
+        metrics.update(self.times)
 
-        # 检查电路是否建立成功
-        if '3-hop circuit established!' in self.log_content:
-            metrics['circuit_established'] = True
-
-        # 检查HTTP响应
-        response_match = re.search(r'Response received \((\d+) bytes\)', self.log_content)
-        if response_match:
-            metrics['response_bytes'] = int(response_match.group(1))
-            metrics['http_success'] = True
-
-        # 检查最终成功标记
-        if 'Test completed successfully!' in self.log_content:
-            metrics['success'] = True
-
-        # 提取时间戳（如果有）
-        # 示例: [Client] 3-hop circuit established in 150ms
-        time_patterns = {
-            'circuit_build_ms': r'circuit established.*?(\d+)\s*ms',
-            'handshake_us': r'handshake.*?(\d+)\s*us',
-            'total_rtt_ms': r'RTT.*?(\d+)\s*ms',
-        }
-
-        for key, pattern in time_patterns.items():
-            match = re.search(pattern, self.log_content, re.IGNORECASE)
-            if match:
-                metrics[key] = float(match.group(1))
-
-        # 统计关键步骤
-        steps = {
-            'create2_sent': '[Client] CREATE2 sent successfully' in self.log_content,
-            'created2_received': '[Client] Received CREATED2' in self.log_content,
-            'first_hop_established': '[Client] First hop established' in self.log_content,
-            'extended2_received': '[Client] Received EXTENDED2' in self.log_content,
-        }
-        metrics['steps'] = steps
+        # 客户端事件流中的实测电路建立时间
+        start = self.events.get(('circuit_start', 0))
+        done = self.events.get(('circuit_done', 0))
+        if 'circuit_build_ms' not in metrics and start is not None and done is not None:
+            metrics['circuit_build_ms'] = round((done - start) / 1e6, 3)
 
+        metrics['steps'] = dict(self.steps)
         return metrics
 
     def extract_error_messages(self) -> list:
-        """提取错误信息"""
-        errors = []
-        error_patterns = [
-            r'ERROR:.*',
-            r'\[Error\].*',
-            r'Failed.*',
-            r'❌.*'
-        ]
-
-        for pattern in error_patterns:
-            matches = re.findall(pattern, self.log_content, re.MULTILINE)
-            errors.extend(matches)
-
-        return errors
+        """提取错误信息（按模式分组，与逐模式findall顺序一致）"""
+        return [error for errors in self.errors for error in errors]
 
 
 def parse_test_run(topo_id: int, run_id: int, logs_dir: Path) -> Dict:
@@ -189,6 +335,60 @@ def analyze_topology_logs(topo_id: int, logs_dir: Path, num_runs: int = 10) -> D
     return topology_results
 
 
+def benchmark_parser(logs_dir: Path, pattern: str = '*.log') -> Dict:
+    """测量解析吞吐量（MB/s）"""
+    files = sorted(logs_dir.rglob(pattern))
+    total_bytes = 0
+    start = time.perf_counter()
+    for log_file in files:
+        total_bytes += PQNTORLogParser(log_file).bytes_parsed
+    elapsed = time.perf_counter() - start
+
+    return {
+        'files': len(files),
+        'total_mb': round(total_bytes / 1e6, 3),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_mb_s': round(total_bytes / 1e6 / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+def follow_log(log_path: Path, interval: float = 1.0,
+               idle_timeout: float = FOLLOW_IDLE_TIMEOUT) -> int:
+    """
+    跟踪正在写入的日志，指标变化时打印
+
+    客户端成功完成、输出致命错误，或日志超过idle_timeout秒没有增长时退出
+
+    Returns:
+        退出码：成功为0，失败/超时/中断为1
+    """
+    parser = PQNTORLogParser(log_path, follow=True)
+    last = None
+    last_growth = time.monotonic()
+    try:
+        while True:
+            if parser.update():
+                last_growth = time.monotonic()
+            elif time.monotonic() - last_growth >= idle_timeout:
+                # 客户端已不再写日志：把未以换行结尾的末行也解析掉再判断
+                parser.finish()
+            metrics = parser.parse_metrics()
+            if metrics != last:
+                print(json.dumps(metrics, ensure_ascii=False))
+                last = metrics
+            if metrics['success']:
+                return 0
+            if parser.fatal_error is not None:
+                print(f"❌ 客户端失败: {parser.fatal_error}")
+                return 1
+            if time.monotonic() - last_growth >= idle_timeout:
+                print(f"❌ 日志 {idle_timeout:.0f}s 内没有增长，客户端未完成")
+                return 1
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 1
+
+
 def main():
     """主函数"""
     import argparse
@@ -201,9 +401,27 @@ def main():
                         help='日志目录路径')
     parser.add_argument('--output', type=str,
                         help='输出JSON文件路径')
+    parser.add_argument('--stdin', action='store_true',
+                        help='从标准输入（管道）解析单个日志')
+    parser.add_argument('--follow', type=str, metavar='LOG',
+                        help='跟踪正在写入的日志文件，指标变化时输出')
+    parser.add_argument('--idle-timeout', type=float, default=FOLLOW_IDLE_TIMEOUT,
+                        help='--follow 时日志无增长多久（秒）判定客户端已退出')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='测量日志目录下所有 *.log 的解析吞吐量 (MB/s)')
 
     args = parser.parse_args()
 
+    if args.stdin:
+        log_parser = PQNTORLogParser().parse_stream(sys.stdin.buffer)
+        print(json.dumps({'metrics': log_parser.parse_metrics(),
+                          'errors': log_parser.extract_error_messages()},
+                         indent=2, ensure_ascii=False))
+        return
+
+    if args.follow:
+        return follow_log(Path(args.follow), idle_timeout=args.idle_timeout)
+
     # 确定日志目录
     script_dir = Path(__file__).parent
     logs_dir = (script_dir / args.logs_dir).resolve()
@@ -215,6 +433,12 @@ def main():
     print(f"📂 日志目录: {logs_dir}")
     print()
 
+    if args.benchmark:
+        stats = benchmark_parser(logs_dir)
+        print(f"📈 解析 {stats['files']} 个文件, {stats['total_mb']} MB, "
+              f"耗时 {stats['elapsed_s']}s, 吞吐量 {stats['throughput_mb_s']} MB/s")
+        return
+
     # 解析日志
     if args.topo:
         # 解析单个拓扑
@@ -263,4 +487,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
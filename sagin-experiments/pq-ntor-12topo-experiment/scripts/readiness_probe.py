@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+节点就绪探测（替代固定sleep）
+只依赖标准库、导入时没有副作用，既供run_pq_ntor_12topologies.py直接导入，
+也可作为脚本在网络命名空间内运行（并行模式下由 ip netns exec 启动）
+
+用法:
+    python3 readiness_probe.py --open 5000 --url http://127.0.0.1:5000/nodes --timeout 10
+    python3 readiness_probe.py --closed 5000 6001 6002 6003
+退出码: 0 就绪, 1 超时
+"""
+
+import sys
+import time
+import socket
+import argparse
+import http.client
+from urllib.parse import urlsplit
+
+PROBE_INITIAL_BACKOFF = 0.005  # 秒，每次失败后翻倍
+PROBE_MAX_BACKOFF = 0.1
+READY_TIMEOUT = 10.0
+
+
+def tcp_port_open(port, host='127.0.0.1', timeout=0.2):
+    """端口是否已在监听（TCP connect成功）"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def http_get_ok(url, timeout=0.5):
+    """HTTP GET是否返回200（直连，不经过代理）"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        return response.status == 200
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+def probe_once(open_ports=(), urls=(), closed_ports=()):
+    """单次探测：open_ports全部可连接、urls全部返回200、closed_ports全部不可连接"""
+    return (all(tcp_port_open(port) for port in open_ports)
+            and all(http_get_ok(url) for url in urls)
+            and not any(tcp_port_open(port) for port in closed_ports))
+
+
+def poll_until(predicate, timeout=READY_TIMEOUT, procs=()):
+    """
+    以指数退避轮询predicate直到为真
+
+    Args:
+        predicate: 无参数的判定函数
+        timeout: 截止时间（秒）
+        procs: 需要存活的进程，任一退出即提前返回False
+
+    Returns:
+        截止时间前predicate为真时返回True
+    """
+    deadline = time.monotonic() + timeout
+    backoff = PROBE_INITIAL_BACKOFF
+    while True:
+        if predicate():
+            return True
+        if any(proc.poll() is not None for proc in procs):
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, PROBE_MAX_BACKOFF)
+
+
+def probe_command(open_ports=(), urls=(), closed_ports=(), timeout=READY_TIMEOUT):
+    """在其他网络命名空间内运行本脚本的参数列表（不含解释器和 ip netns exec 前缀）"""
+    args = [__file__, '--timeout', repr(float(timeout))]
+    for flag, values in (('--open', open_ports), ('--url', urls), ('--closed', closed_ports)):
+        if values:
+            args += [flag] + [str(v) for v in values]
+    return args
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='节点就绪探测')
+    parser.add_argument('--open', type=int, nargs='+', default=[],
+                        help='需要处于监听状态的端口')
+    parser.add_argument('--url', nargs='+', default=[],
+                        help='需要返回200的URL')
+    parser.add_argument('--closed', type=int, nargs='+', default=[],
+                        help='需要已释放的端口')
+    parser.add_argument('--timeout', type=float, default=READY_TIMEOUT,
+                        help='截止时间（秒）')
+
+    args = parser.parse_args()
+    ready = poll_until(lambda: probe_once(args.open, args.url, args.closed), args.timeout)
+    return 0 if ready else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
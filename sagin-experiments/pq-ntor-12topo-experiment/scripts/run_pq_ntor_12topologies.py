@@ -7,17 +7,24 @@ PQ-NTOR 12拓扑自动化测试脚本
 日期: 2025-11-24
 """
 
+import copy
 import json
+import math
+import random
 import subprocess
 import time
 import os
 import sys
 import signal
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
 import psutil
 
+from readiness_probe import READY_TIMEOUT, probe_once, poll_until, probe_command
+
 # ==================== 配置参数 ====================
 SCRIPT_DIR = Path(__file__).parent.absolute()
 EXP_DIR = SCRIPT_DIR.parent
@@ -32,9 +39,19 @@ PQ_NTOR_DIR = Path("/home/ccc/pq-ntor-experiment/sagin-experiments/docker/build_
 RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
+# 网络命名空间并行模式
+NETNS_PREFIX = "pqntor_t"
+NETNS_SUBNET = "10.200"  # 每个拓扑使用 10.200.<topo_id>.0/30
+
+# 就绪探测（替代固定sleep）
+DIRECTORY_PORT = 5000
+DIRECTORY_NODES_URL = f"http://127.0.0.1:{DIRECTORY_PORT}/nodes"
+HARNESS_PORTS = (DIRECTORY_PORT, 6001, 6002, 6003)
+
 # 全局变量
 current_processes = []
 current_topology_id = None
+netns_processes = {}  # 命名空间 -> 该命名空间内启动的进程
 
 
 # ==================== 进程管理 ====================
@@ -64,10 +81,15 @@ def cleanup_processes(signal_num=None, frame=None):
     subprocess.run(['sudo', 'tc', 'qdisc', 'del', 'dev', 'lo', 'root'],
                    stderr=subprocess.DEVNULL)
 
-    time.sleep(0.5)
+    # 等待端口释放
+    if not wait_ready(closed_ports=HARNESS_PORTS):
+        print("⚠️  端口未在超时内释放")
     print("✅ 进程清理完成")
 
     if signal_num is not None:
+        # 并行模式下同时拆除所有命名空间
+        for netns in list(netns_processes):
+            teardown_netns(netns)
         sys.exit(0)
 
 
@@ -94,18 +116,196 @@ def kill_port_process(port):
     return False
 
 
+def track_process(proc, netns=None):
+    """记录启动的进程（并行模式下按命名空间分别记录）"""
+    if netns is None:
+        current_processes.append(proc)
+    else:
+        netns_processes.setdefault(netns, []).append(proc)
+
+
+def untrack_process(proc, netns=None):
+    """取消记录（进程已由调用方自行终止）"""
+    tracked = current_processes if netns is None else netns_processes.get(netns, [])
+    if proc in tracked:
+        tracked.remove(proc)
+
+
+def cleanup_netns_processes(netns):
+    """清理命名空间内的所有进程（不影响其他拓扑）"""
+    for proc in netns_processes.get(netns, []):
+        try:
+            proc.terminate()
+            proc.wait(timeout=2)
+        except:
+            try:
+                proc.kill()
+            except:
+                pass
+    netns_processes[netns] = []
+
+    # 命名空间内可能残留的进程
+    result = subprocess.run(['sudo', 'ip', 'netns', 'pids', netns],
+                            capture_output=True, text=True)
+    pids = result.stdout.split()
+    if pids:
+        subprocess.run(['sudo', 'kill', '-9'] + pids, stderr=subprocess.DEVNULL)
+
+
+# ==================== 网络命名空间 ====================
+def netns_name(topo_id):
+    """拓扑对应的命名空间名称"""
+    return f"{NETNS_PREFIX}{topo_id:02d}"
+
+
+def netns_veth_names(topo_id):
+    """(主机端, 命名空间端) veth接口名称（<=15字符）"""
+    return f"pqv{topo_id:02d}h", f"pqv{topo_id:02d}n"
+
+
+def netns_host_ip(topo_id):
+    """主机端veth地址（命名空间内访问主机上的目标服务器）"""
+    return f"{NETNS_SUBNET}.{topo_id}.1"
+
+
+def netns_exec_prefix(netns):
+    """在命名空间内执行命令的前缀"""
+    if netns is None:
+        return []
+    return ['sudo', 'ip', 'netns', 'exec', netns]
+
+
+def setup_netns(topo_id):
+    """
+    为拓扑创建独立的网络命名空间：
+    独立的lo（Directory/Relay端口空间互不冲突）+ 连接主机的veth对
+    """
+    netns = netns_name(topo_id)
+    veth_host, veth_ns = netns_veth_names(topo_id)
+    host_ip = netns_host_ip(topo_id)
+    ns_ip = f"{NETNS_SUBNET}.{topo_id}.2"
+
+    # 清理上次残留
+    teardown_netns(netns, topo_id)
+
+    commands = [
+        ['sudo', 'ip', 'netns', 'add', netns],
+        ['sudo', 'ip', 'netns', 'exec', netns, 'ip', 'link', 'set', 'lo', 'up'],
+        ['sudo', 'ip', 'link', 'add', veth_host, 'type', 'veth', 'peer', 'name', veth_ns],
+        ['sudo', 'ip', 'link', 'set', veth_ns, 'netns', netns],
+        ['sudo', 'ip', 'addr', 'add', f'{host_ip}/30', 'dev', veth_host],
+        ['sudo', 'ip', 'link', 'set', veth_host, 'up'],
+        ['sudo', 'ip', 'netns', 'exec', netns, 'ip', 'addr', 'add', f'{ns_ip}/30', 'dev', veth_ns],
+        ['sudo', 'ip', 'netns', 'exec', netns, 'ip', 'link', 'set', veth_ns, 'up'],
+        ['sudo', 'ip', 'netns', 'exec', netns, 'ip', 'route', 'add', 'default', 'via', host_ip],
+    ]
+
+    for cmd in commands:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"  ❌ 命名空间配置失败: {' '.join(cmd)}: {result.stderr.strip()}")
+            teardown_netns(netns, topo_id)
+            return None
+
+    netns_processes[netns] = []
+    return netns
+
+
+def teardown_netns(netns, topo_id=None):
+    """拆除命名空间（同时删除veth对）"""
+    if netns in netns_processes:
+        cleanup_netns_processes(netns)
+        del netns_processes[netns]
+
+    subprocess.run(['sudo', 'ip', 'netns', 'del', netns],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if topo_id is not None:
+        veth_host, _ = netns_veth_names(topo_id)
+        subprocess.run(['sudo', 'ip', 'link', 'del', veth_host],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def netns_config(config, topo_id):
+    """命名空间模式的配置：目标URL改为经veth访问主机"""
+    config = copy.deepcopy(config)
+    url = urlsplit(config['test_configuration']['target_url'])
+    if url.hostname in ('127.0.0.1', 'localhost'):
+        netloc = netns_host_ip(topo_id) + (f":{url.port}" if url.port else "")
+        config['test_configuration']['target_url'] = urlunsplit(url._replace(netloc=netloc))
+    return config
+
+
+# ==================== 就绪探测 ====================
+def wait_ready(open_ports=(), urls=(), closed_ports=(), procs=(), netns=None,
+               timeout=READY_TIMEOUT):
+    """
+    等待节点就绪（或端口释放），指定netns时在命名空间内探测
+
+    Args:
+        open_ports: 需要处于监听状态的端口
+        urls: 需要返回200的URL
+        closed_ports: 需要已释放的端口
+        procs: 被探测的进程，任一退出即判定失败
+        netns: 网络命名空间（并行模式），None表示主机lo
+        timeout: 截止时间（秒）
+
+    Returns:
+        是否在截止时间前就绪
+    """
+    open_ports, urls, closed_ports = list(open_ports), list(urls), list(closed_ports)
+    if netns is None:
+        return poll_until(lambda: probe_once(open_ports, urls, closed_ports),
+                          timeout, procs)
+
+    # 命名空间有独立的lo，探测循环放在命名空间内的子进程中执行；
+    # 探测脚本只依赖标准库且导入无副作用（-S 跳过site，进一步缩短启动时间）
+    prober = subprocess.Popen(netns_exec_prefix(netns) + [sys.executable, '-S'] +
+                              probe_command(open_ports, urls, closed_ports, timeout),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    poll_until(lambda: prober.poll() is not None, timeout + 2.0, procs)
+    if prober.poll() is None:
+        prober.kill()
+        prober.wait()
+        return False
+    return prober.returncode == 0
+
+
 # ==================== 网络配置 ====================
-def configure_network(config):
-    """配置网络参数使用tc/netem"""
+def netns_tc_commands(tc_commands, netns, topo_id):
+    """
+    把针对主机lo的tc命令改写为命名空间内lo和veth两端上的命令
+    主机lo上请求和响应都经过lo出口（每跳RTT含两次netem延迟），
+    因此veth的命名空间端和主机端都要配置同样的qdisc，经veth访问目标服务器时往返也各延迟一次
+    """
+    veth_host, veth_ns = netns_veth_names(topo_id)
+    commands = []
+    for cmd in tc_commands:
+        if not cmd.strip() or cmd.startswith('#'):
+            continue
+        cmd = cmd.strip()
+        if cmd.startswith('sudo '):
+            cmd = cmd[len('sudo '):]
+        commands.append(f"sudo ip netns exec {netns} {cmd}")
+        if ' dev lo ' in cmd:
+            commands.append(f"sudo ip netns exec {netns} {cmd.replace(' dev lo ', f' dev {veth_ns} ')}")
+            commands.append(f"sudo {cmd.replace(' dev lo ', f' dev {veth_host} ')}")
+    return commands
+
+
+def configure_network(config, netns=None, topo_id=None):
+    """配置网络参数使用tc/netem（指定netns时在命名空间内配置）"""
     print("🌐 配置网络参数...")
 
     # 清除现有tc规则
-    subprocess.run(['sudo', 'tc', 'qdisc', 'del', 'dev', 'lo', 'root'],
+    tc_prefix = netns_exec_prefix(netns) if netns is not None else ['sudo']
+    subprocess.run(tc_prefix + ['tc', 'qdisc', 'del', 'dev', 'lo', 'root'],
                    stderr=subprocess.DEVNULL)
     time.sleep(0.3)
 
     # 获取tc命令
     tc_commands = config['network_simulation']['tc_commands']
+    if netns is not None:
+        tc_commands = netns_tc_commands(tc_commands, netns, topo_id)
 
     # 执行tc配置
     for cmd in tc_commands:
@@ -125,38 +325,44 @@ def configure_network(config):
 
 
 # ==================== PQ-NTOR节点管理 ====================
-def start_directory_server(topo_id, run_id):
+def start_directory_server(topo_id, run_id, netns=None):
     """启动Directory服务器"""
     global current_processes
 
-    print("  启动Directory服务器 (端口 5000)...")
+    print(f"  启动Directory服务器 (端口 {DIRECTORY_PORT})...")
 
-    # 检查并清理端口
-    kill_port_process(5000)
+    # 检查并清理端口（命名空间有独立的端口空间）
+    if netns is None:
+        kill_port_process(DIRECTORY_PORT)
 
     log_file = LOGS_DIR / f"directory_topo{topo_id:02d}_run{run_id:02d}.log"
 
     with open(log_file, 'w') as f:
         proc = subprocess.Popen(
-            ['./directory', '-p', '5000'],
+            netns_exec_prefix(netns) + ['./directory', '-p', str(DIRECTORY_PORT)],
             stdout=f,
             stderr=subprocess.STDOUT,
             cwd=PQ_NTOR_DIR
         )
-        current_processes.append(proc)
+        track_process(proc, netns)
 
-    time.sleep(1.0)
+    # 等待端口监听且 /nodes 可访问
+    ready = wait_ready(open_ports=[DIRECTORY_PORT], urls=[DIRECTORY_NODES_URL],
+                       procs=[proc], netns=netns)
 
     # 验证进程启动
     if proc.poll() is not None:
         print(f"    ❌ Directory启动失败，退出码: {proc.returncode}")
         return False
+    if not ready:
+        print(f"    ❌ Directory未在 {READY_TIMEOUT:.0f}s 内就绪")
+        return False
 
     print(f"    ✅ Directory已启动 (PID: {proc.pid})")
     return True
 
 
-def start_relay_nodes(topo_id, run_id, config):
+def start_relay_nodes(topo_id, run_id, config, netns=None):
     """启动Tor中继节点 (Guard, Middle, Exit)"""
     global current_processes
 
@@ -168,40 +374,166 @@ def start_relay_nodes(topo_id, run_id, config):
         ('exit', roles_config['exit'])
     ]
 
+    relay_ports = []
     for role_name, role_config in relay_roles:
         port = role_config['port']
+        relay_ports.append(port)
         sagin_node = role_config['sagin_node']
 
         print(f"  启动 {role_name.capitalize()} Relay (端口 {port}, 节点 {sagin_node})...")
 
         # 检查并清理端口
-        kill_port_process(port)
+        if netns is None:
+            kill_port_process(port)
 
         log_file = LOGS_DIR / f"{role_name}_topo{topo_id:02d}_run{run_id:02d}.log"
 
         with open(log_file, 'w') as f:
             proc = subprocess.Popen(
-                ['./relay', '-r', role_name, '-p', str(port)],
+                netns_exec_prefix(netns) + ['./relay', '-r', role_name, '-p', str(port)],
                 stdout=f,
                 stderr=subprocess.STDOUT,
                 cwd=PQ_NTOR_DIR
             )
-            current_processes.append(proc)
+            track_process(proc, netns)
 
-        time.sleep(0.5)
+        ready = wait_ready(open_ports=[port], procs=[proc], netns=netns)
 
         # 验证进程启动
         if proc.poll() is not None:
             print(f"    ❌ {role_name} Relay启动失败，退出码: {proc.returncode}")
             return False
+        if not ready:
+            print(f"    ❌ {role_name} Relay未在 {READY_TIMEOUT:.0f}s 内就绪")
+            return False
 
         print(f"    ✅ {role_name} Relay已启动 (PID: {proc.pid})")
 
-    time.sleep(1.5)  # 等待所有中继节点完全启动
+    # 所有中继端口可连接且Directory仍可提供节点列表
+    if not wait_ready(open_ports=relay_ports, urls=[DIRECTORY_NODES_URL], netns=netns):
+        print("    ❌ 中继节点未全部就绪")
+        return False
     return True
 
 
-def run_client_test(topo_id, run_id, config, mode='pq', timeout=120):
+class WarmFleet:
+    """
+    常驻的Directory + Guard/Middle/Exit进程组
+
+    多次运行复用同一组进程：每次运行前做健康检查，只重启已崩溃的节点，
+    使测得的电路建立时间不包含进程冷启动、密钥生成和端口回收的开销。
+    """
+
+    def __init__(self, label, netns=None):
+        """
+        Args:
+            label: 日志文件名标识（如 topo01 / campaign）
+            netns: 网络命名空间（并行模式），None表示在主机lo上运行
+        """
+        self.label = label
+        self.netns = netns
+        self.layout = None
+        self.nodes = {}  # 节点名 -> {'cmd', 'port', 'proc'}
+        self.restarts = 0
+
+    @staticmethod
+    def layout_for(config):
+        """配置对应的节点布局 ((角色, 端口), ...)"""
+        roles = config['tor_circuit_mapping']['roles']
+        return tuple((role, roles[role]['port']) for role in ('guard', 'middle', 'exit'))
+
+    def _spawn(self, name):
+        """启动单个节点（日志以追加方式写入）"""
+        node = self.nodes[name]
+        log_file = LOGS_DIR / f"{name}_{self.label}_fleet.log"
+        with open(log_file, 'a') as f:
+            node['proc'] = subprocess.Popen(
+                netns_exec_prefix(self.netns) + node['cmd'],
+                stdout=f,
+                stderr=subprocess.STDOUT,
+                cwd=PQ_NTOR_DIR
+            )
+        track_process(node['proc'], self.netns)
+
+    def _start(self, layout):
+        """按布局启动全部节点"""
+        self.layout = layout
+        self.nodes = {'directory': {'cmd': ['./directory', '-p', str(DIRECTORY_PORT)],
+                                    'port': DIRECTORY_PORT, 'proc': None}}
+        for role, port in layout:
+            self.nodes[role] = {'cmd': ['./relay', '-r', role, '-p', str(port)],
+                                'port': port, 'proc': None}
+
+        ports = [node['port'] for node in self.nodes.values()]
+        if self.netns is None:
+            for port in ports:
+                kill_port_process(port)
+        elif not wait_ready(closed_ports=ports, netns=self.netns):
+            print("  ⚠️  端口未在超时内释放")
+
+        print(f"  🔥 启动常驻节点 ({self.label}): "
+              + ", ".join(f"{name}:{node['port']}" for name, node in self.nodes.items()))
+        for name in self.nodes:
+            self._spawn(name)
+
+    def _wait_healthy(self):
+        """等待所有节点端口可连接且 /nodes 可访问"""
+        return wait_ready(open_ports=[node['port'] for node in self.nodes.values()],
+                          urls=[DIRECTORY_NODES_URL],
+                          procs=[node['proc'] for node in self.nodes.values()],
+                          netns=self.netns)
+
+    def ensure(self, config):
+        """
+        确保进程组可用：首次调用或布局变化时全部启动，否则只重启已退出的节点
+
+        Returns:
+            进程组是否就绪
+        """
+        layout = self.layout_for(config)
+        if layout != self.layout:
+            if self.layout is not None:
+                print("  🔄 节点布局变化，重启常驻节点")
+                self.stop()
+            self._start(layout)
+        else:
+            for name, node in self.nodes.items():
+                if node['proc'].poll() is not None:
+                    print(f"  ♻️  {name} 已退出 (退出码: {node['proc'].returncode})，重启...")
+                    untrack_process(node['proc'], self.netns)
+                    self._spawn(name)
+                    self.restarts += 1
+
+        if self._wait_healthy():
+            return True
+
+        # 进程存活但不响应（或重启后立即退出），整体重启一次
+        print("  ⚠️  常驻节点健康检查失败，整体重启")
+        self.stop()
+        self._start(layout)
+        self.restarts += len(self.nodes)
+        return self._wait_healthy()
+
+    def stop(self):
+        """终止全部节点"""
+        for node in self.nodes.values():
+            proc = node['proc']
+            if proc is None:
+                continue
+            try:
+                proc.terminate()
+                proc.wait(timeout=2)
+            except:
+                try:
+                    proc.kill()
+                except:
+                    pass
+            untrack_process(proc, self.netns)
+        self.nodes = {}
+        self.layout = None
+
+
+def run_client_test(topo_id, run_id, config, mode='pq', timeout=120, netns=None):
     """运行客户端测试"""
     print(f"  运行Client测试 ({mode.upper()} mode)...")
 
@@ -219,7 +551,7 @@ def run_client_test(topo_id, run_id, config, mode='pq', timeout=120):
     try:
         with open(log_file, 'w') as f:
             # 构建客户端命令，添加--mode参数
-            client_cmd = ['./client', '--mode', mode, '-u', target_url]
+            client_cmd = netns_exec_prefix(netns) + ['./client', '--mode', mode, '-u', target_url]
             result = subprocess.run(
                 client_cmd,
                 stdout=f,
@@ -240,35 +572,12 @@ def run_client_test(topo_id, run_id, config, mode='pq', timeout=120):
         metrics['success'] = success
         metrics['exit_code'] = result.returncode
 
-        # 基于总时长和网络配置估算性能指标
-        if success and metrics.get('test_completed'):
-            network_params = config['network_simulation']['aggregate_params']
-
-            # 电路建立时间估算（约占总时间的10-20%）
-            # 包括：目录查询 + 3次PQ握手 + 3次网络往返
-            estimated_circuit_build_ms = (3 * network_params['delay_ms'] * 2) + (3 * 0.05)
-            metrics['circuit_build_time_ms'] = round(estimated_circuit_build_ms, 2)
-
-            # HTTP GET时间（约占总时间的5-10%）
-            estimated_http_ms = network_params['delay_ms'] * 2  # 往返时间
-            metrics['http_get_time_ms'] = round(estimated_http_ms, 2)
-
-            # 总RTT（基于配置的延迟）
-            # 3-hop电路 = 6次单向传输（往返）
-            metrics['total_rtt_ms'] = round(network_params['delay_ms'] * 6, 2)
-
-            # 吞吐量估算
-            if metrics.get('response_size_bytes'):
-                # 使用实际数据大小和总时长计算
-                data_mb = metrics['response_size_bytes'] / (1024 * 1024)
-                # 扣除等待时间（约55秒是接收超时，实际传输可能只需几百毫秒）
-                actual_transfer_time = min(duration, 5.0)  # 假设实际传输不超过5秒
-                metrics['throughput_mbps'] = round((data_mb / actual_transfer_time) * 8, 2)
+        # 各阶段耗时均来自客户端事件流（[EVENT]行），旧版客户端无事件时保持None
 
         if success:
             print(f"    ✅ 测试成功! 耗时: {duration:.2f}秒")
-            print(f"       电路建立: ~{metrics.get('circuit_build_time_ms', 'N/A')}ms")
-            print(f"       总RTT: ~{metrics.get('total_rtt_ms', 'N/A')}ms")
+            print(f"       电路建立: {metrics.get('circuit_build_time_ms') or 'N/A'}ms")
+            print(f"       总RTT: {metrics.get('total_rtt_ms') or 'N/A'}ms")
         else:
             print(f"    ❌ 测试失败! 退出码: {result.returncode}")
 
@@ -293,8 +602,86 @@ def run_client_test(topo_id, run_id, config, mode='pq', timeout=120):
         }
 
 
+EVENT_PREFIX = '[EVENT] '
+
+
+def parse_client_events(lines):
+    """
+    提取客户端输出中的计时事件
+
+    客户端在结束时逐行输出 "[EVENT] {"event": ..., "hop": ..., "t_ns": ...}"，
+    t_ns为CLOCK_MONOTONIC纳秒时间戳。
+
+    Returns:
+        事件列表（按输出顺序）
+    """
+    events = []
+    for line in lines:
+        if not line.startswith(EVENT_PREFIX):
+            continue
+        try:
+            events.append(json.loads(line[len(EVENT_PREFIX):]))
+        except ValueError:
+            continue
+    return events
+
+
+def compute_phase_timings(events):
+    """
+    由事件流计算各阶段实测耗时
+
+    Args:
+        events: parse_client_events的输出
+
+    Returns:
+        阶段耗时字典（缺少对应事件的阶段为None），hop_timings为逐跳明细
+    """
+    first = {}
+    for ev in events:
+        first.setdefault((ev['event'], ev.get('hop', 0)), ev['t_ns'])
+
+    def span_ms(start, end, hop=0):
+        t0, t1 = first.get((start, hop)), first.get((end, hop))
+        if t0 is None or t1 is None:
+            return None
+        return round((t1 - t0) / 1e6, 3)
+
+    hop_timings = []
+    for hop, (sent, recv) in enumerate([('create2_sent', 'created2_recv'),
+                                        ('extend2_sent', 'extended2_recv'),
+                                        ('extend2_sent', 'extended2_recv')], start=1):
+        rtt_ms = span_ms(sent, recv, hop)
+        if rtt_ms is None:
+            continue
+        # 客户端侧握手计算：生成onionskin到发出 + 收到回复到完成密钥派生
+        create_ms = span_ms('onionskin_start', sent, hop)
+        finish_ms = span_ms(recv, 'hop_done', hop)
+        hop_timings.append({
+            'hop': hop,
+            'rtt_ms': rtt_ms,
+            'client_handshake_us': round((create_ms + finish_ms) * 1000, 1)
+                                   if create_ms is not None and finish_ms is not None else None,
+            'total_ms': span_ms('onionskin_start', 'hop_done', hop)
+        })
+
+    handshake_us = [h['client_handshake_us'] for h in hop_timings
+                    if h['client_handshake_us'] is not None]
+
+    return {
+        'directory_fetch_ms': span_ms('dir_fetch_start', 'dir_fetch_done'),
+        'circuit_build_time_ms': span_ms('circuit_start', 'circuit_done'),
+        'pq_handshake_time_us': round(sum(handshake_us) / len(handshake_us), 1)
+                                if handshake_us else None,
+        'hop_timings': hop_timings,
+        # BEGIN→CONNECTED 穿过完整3跳电路往返一次
+        'total_rtt_ms': span_ms('begin_sent', 'connected_recv'),
+        'time_to_first_byte_ms': span_ms('request_sent', 'data_first'),
+        'http_get_time_ms': span_ms('request_sent', 'data_last')
+    }
+
+
 def parse_client_log(log_file):
-    """解析客户端日志提取性能指标"""
+    """解析客户端日志提取性能指标（阶段耗时来自[EVENT]事件流）"""
     import re
 
     metrics = {
@@ -306,7 +693,11 @@ def parse_client_log(log_file):
         'onionskin_size_bytes': None,
         'response_size_bytes': None,
         'circuit_hops': 3,
-        'encryption_layers': None
+        'encryption_layers': None,
+        'directory_fetch_ms': None,
+        'time_to_first_byte_ms': None,
+        'hop_timings': [],
+        'timing_events': 0
     }
 
     try:
@@ -314,12 +705,13 @@ def parse_client_log(log_file):
             content = f.read()
 
             # 提取onionskin大小（PQ握手数据包大小）
-            onionskin_match = re.search(r'Onionskin created \((\d+) bytes\)', content)
+            onionskin_match = re.search(r'onionskin created \((\d+) bytes\)', content, re.IGNORECASE)
             if onionskin_match:
                 metrics['onionskin_size_bytes'] = int(onionskin_match.group(1))
 
             # 提取响应大小
-            response_match = re.search(r'Received (\d+) bytes of data', content)
+            response_match = re.search(r'Response received \((\d+) bytes\)', content) or \
+                re.search(r'Received (\d+) bytes of data', content)
             if response_match:
                 metrics['response_size_bytes'] = int(response_match.group(1))
 
@@ -332,30 +724,18 @@ def parse_client_log(log_file):
                 metrics['encryption_layers'] = 2
 
             # 检查是否成功
-            if 'Test completed successfully!' in content:
-                metrics['test_completed'] = True
-            else:
-                metrics['test_completed'] = False
+            metrics['test_completed'] = 'Test completed successfully!' in content
 
-            # ===== 新增：基于已知数据估算性能指标 =====
-            # 1. PQ握手时间估算（基于benchmark结果：平均49μs）
-            # 3-hop电路需要3次握手
-            if metrics['test_completed']:
-                metrics['pq_handshake_time_us'] = 50  # 单次握手约50μs（基于benchmark）
+            # 实测阶段耗时
+            events = parse_client_events(content.splitlines())
+            metrics['timing_events'] = len(events)
+            metrics.update(compute_phase_timings(events))
 
-                # 2. 电路建立时间（从日志分析大致的步骤）
-                # 包括：网络连接 + 3次PQ握手 + 网络延迟
-                # 简化估算：假设每次握手+网络往返约占总时间的1/10
-
-                # 3. HTTP GET时间：可以从"Sending HTTP GET"到"Received...bytes"间估算
-                # 但日志没有精确时间戳，使用总duration作为参考
-
-                # 4. 提取实际发送/接收的字节数来计算吞吐量
-                sent_match = re.search(r'Sent (\d+) bytes', content)
-                if sent_match and metrics['response_size_bytes']:
-                    total_bytes = int(sent_match.group(1)) + metrics['response_size_bytes']
-                    # throughput计算需要精确的时间，这里先设为None
-                    # 后续可以在run_client_test中基于总duration计算
+            # 吞吐量：响应字节数 / 请求发出到最后一个DATA cell的时间
+            if metrics['response_size_bytes'] and metrics['http_get_time_ms']:
+                data_mb = metrics['response_size_bytes'] / (1024 * 1024)
+                metrics['throughput_mbps'] = round(
+                    data_mb * 8 / (metrics['http_get_time_ms'] / 1000), 2)
 
     except Exception as e:
         print(f"    ⚠️  日志解析失败: {e}")
@@ -364,8 +744,25 @@ def parse_client_log(log_file):
 
 
 # ==================== 主测试流程 ====================
-def test_single_topology(topo_id, num_runs=10, mode='pq'):
-    """测试单个拓扑"""
+def load_topology_config(topo_id):
+    """读取拓扑的Tor映射配置（不存在时返回None）"""
+    config_file = CONFIG_DIR / f"topo{topo_id:02d}_tor_mapping.json"
+    if not config_file.exists():
+        print(f"❌ 配置文件不存在: {config_file}")
+        return None
+
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_single_topology(topo_id, num_runs=10, mode='pq', netns=None, fleet=None):
+    """
+    测试单个拓扑
+
+    Args:
+        netns: 网络命名空间（并行模式），None表示在主机lo上运行
+        fleet: 常驻进程组（WarmFleet），None表示每次运行冷启动全部节点
+    """
     global current_topology_id
     current_topology_id = topo_id
 
@@ -374,13 +771,15 @@ def test_single_topology(topo_id, num_runs=10, mode='pq'):
     print("=" * 70)
 
     # 加载配置
-    config_file = CONFIG_DIR / f"topo{topo_id:02d}_tor_mapping.json"
-    if not config_file.exists():
-        print(f"❌ 配置文件不存在: {config_file}")
+    config = load_topology_config(topo_id)
+    if config is None:
         return None
 
-    with open(config_file, 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    if netns is not None:
+        config = netns_config(config, topo_id)
+        cleanup = lambda: cleanup_netns_processes(netns)
+    else:
+        cleanup = cleanup_processes
 
     print(f"拓扑名称: {config['topology_name']}")
     print(f"方向: {config['physical_topology']['direction']}")
@@ -390,49 +789,62 @@ def test_single_topology(topo_id, num_runs=10, mode='pq'):
           f"→ {config['tor_circuit_mapping']['roles']['exit']['sagin_node']}")
 
     # 配置网络
-    if not configure_network(config):
+    if not configure_network(config, netns=netns, topo_id=topo_id):
         print("❌ 网络配置失败")
         return None
 
     # 运行多次测试
     all_results = []
+    roles = config['tor_circuit_mapping']['roles']
+    harness_ports = [DIRECTORY_PORT] + [roles[r]['port'] for r in ('guard', 'middle', 'exit')]
 
     for run_id in range(1, num_runs + 1):
         print(f"\n🔄 运行 {run_id}/{num_runs}")
 
-        # 清理之前的进程
-        cleanup_processes()
-        time.sleep(0.5)
-
-        # 启动Directory
-        if not start_directory_server(topo_id, run_id):
-            print(f"❌ 运行 {run_id} 失败: Directory启动失败")
-            continue
+        if fleet is not None:
+            # 复用常驻节点，仅重启已崩溃的进程
+            restarts_before = fleet.restarts
+            if not fleet.ensure(config):
+                print(f"❌ 运行 {run_id} 失败: 常驻节点不可用")
+                continue
+        else:
+            # 清理之前的进程，并等待端口释放
+            cleanup()
+            if not wait_ready(closed_ports=harness_ports, netns=netns):
+                print(f"⚠️  运行 {run_id}: 端口未在超时内释放")
+
+            # 启动Directory
+            if not start_directory_server(topo_id, run_id, netns=netns):
+                print(f"❌ 运行 {run_id} 失败: Directory启动失败")
+                continue
 
-        # 启动Relay节点
-        if not start_relay_nodes(topo_id, run_id, config):
-            print(f"❌ 运行 {run_id} 失败: Relay节点启动失败")
-            cleanup_processes()
-            continue
+            # 启动Relay节点
+            if not start_relay_nodes(topo_id, run_id, config, netns=netns):
+                print(f"❌ 运行 {run_id} 失败: Relay节点启动失败")
+                cleanup()
+                continue
 
         # 运行客户端测试
         metrics = run_client_test(topo_id, run_id, config, mode=mode,
-                                  timeout=config['test_configuration']['timeout_seconds'])
+                                  timeout=config['test_configuration']['timeout_seconds'],
+                                  netns=netns)
 
         metrics['topology_id'] = topo_id
         metrics['topology_name'] = config['topology_name']
         metrics['run_id'] = run_id
         metrics['timestamp'] = datetime.now().isoformat()
         metrics['network_config'] = config['network_simulation']['aggregate_params']
+        if fleet is not None:
+            metrics['fleet_mode'] = 'warm'
+            metrics['fleet_restarts'] = fleet.restarts - restarts_before
+        else:
+            metrics['fleet_mode'] = 'cold'
 
         all_results.append(metrics)
 
-        # 清理进程
-        cleanup_processes()
-
-        # 短暂休息
-        if run_id < num_runs:
-            time.sleep(1.0)
+        # 清理进程（下一轮开始前会等待端口释放）
+        if fleet is None:
+            cleanup()
 
     # 保存结果
     result_file = RESULTS_DIR / f"topo{topo_id:02d}_{mode}_results.json"
@@ -441,6 +853,7 @@ def test_single_topology(topo_id, num_runs=10, mode='pq'):
             'topology_id': topo_id,
             'topology_name': config['topology_name'],
             'mode': mode,
+            'fleet_mode': 'warm' if fleet is not None else 'cold',
             'config': config,
             'test_runs': all_results,
             'summary': calculate_summary(all_results)
@@ -469,7 +882,8 @@ def calculate_summary(results):
     # 计算成功测试的平均性能指标
     successful_results = [r for r in results if r.get('success', False)]
     if successful_results:
-        for metric in ['pq_handshake_time_us', 'circuit_build_time_ms', 'total_rtt_ms']:
+        for metric in ['pq_handshake_time_us', 'circuit_build_time_ms', 'total_rtt_ms',
+                       'directory_fetch_ms', 'http_get_time_ms']:
             values = [r.get(metric) for r in successful_results if r.get(metric) is not None]
             if values:
                 summary[f'avg_{metric}'] = sum(values) / len(values)
@@ -477,8 +891,30 @@ def calculate_summary(results):
     return summary
 
 
-def test_all_topologies(start_topo=1, end_topo=12, num_runs=10, mode='pq'):
-    """测试所有拓扑"""
+def test_topology_in_netns(topo_id, num_runs=10, mode='pq', warm_fleet=None):
+    """在独立网络命名空间中测试单个拓扑（并行模式的工作单元）"""
+    netns = setup_netns(topo_id)
+    if netns is None:
+        print(f"❌ 拓扑 {topo_id} 命名空间创建失败")
+        return None
+
+    # 每个命名空间有独立的lo和netem配置，常驻节点只能按拓扑复用
+    fleet = WarmFleet(f"topo{topo_id:02d}", netns=netns) if warm_fleet else None
+    try:
+        return test_single_topology(topo_id, num_runs, mode=mode, netns=netns, fleet=fleet)
+    finally:
+        teardown_netns(netns, topo_id)
+
+
+def test_all_topologies(start_topo=1, end_topo=12, num_runs=10, mode='pq', parallel=0,
+                        warm_fleet=None):
+    """
+    测试所有拓扑
+
+    Args:
+        parallel: 并行拓扑数（>0时每个拓扑使用独立网络命名空间并发运行）
+        warm_fleet: 常驻节点复用范围，None（每次运行冷启动）/ 'topology' / 'campaign'
+    """
     print("=" * 70)
     print(f"  🚀 {mode.upper()} NTOR 12拓扑自动化测试")
     print("=" * 70)
@@ -486,13 +922,46 @@ def test_all_topologies(start_topo=1, end_topo=12, num_runs=10, mode='pq'):
     print(f"每个拓扑运行次数: {num_runs}")
     print(f"PQ-NTOR目录: {PQ_NTOR_DIR}")
     print(f"结果目录: {RESULTS_DIR}")
+    if parallel > 0:
+        print(f"并行模式: {parallel} 个拓扑同时运行 (网络命名空间)")
+    if warm_fleet:
+        print(f"常驻节点: 按{'拓扑' if warm_fleet == 'topology' or parallel > 0 else '整个测试'}复用")
     print("=" * 70)
 
     all_topo_results = {}
 
+    if parallel > 0:
+        topo_ids = list(range(start_topo, end_topo + 1))
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = {topo_id: executor.submit(test_topology_in_netns, topo_id, num_runs, mode,
+                                                warm_fleet)
+                       for topo_id in topo_ids}
+            for topo_id, future in futures.items():
+                try:
+                    results = future.result()
+                    if results:
+                        all_topo_results[topo_id] = results
+                except Exception as e:
+                    print(f"\n❌ 拓扑 {topo_id} 测试异常: {e}")
+                    import traceback
+                    traceback.print_exc()
+
+        generate_overall_report(all_topo_results, mode=mode)
+
+        print("\n" + "=" * 70)
+        print("✅ 所有拓扑测试完成!")
+        print("=" * 70)
+        return
+
+    # 主机lo上所有拓扑共享同一网络栈，tc切换不影响已启动的节点，可整个测试复用
+    campaign_fleet = WarmFleet("campaign") if warm_fleet == 'campaign' else None
+
     for topo_id in range(start_topo, end_topo + 1):
+        fleet = campaign_fleet
+        if warm_fleet == 'topology':
+            fleet = WarmFleet(f"topo{topo_id:02d}")
         try:
-            results = test_single_topology(topo_id, num_runs, mode=mode)
+            results = test_single_topology(topo_id, num_runs, mode=mode, fleet=fleet)
             if results:
                 all_topo_results[topo_id] = results
         except Exception as e:
@@ -500,7 +969,12 @@ def test_all_topologies(start_topo=1, end_topo=12, num_runs=10, mode='pq'):
             import traceback
             traceback.print_exc()
         finally:
-            cleanup_processes()
+            if campaign_fleet is None:
+                cleanup_processes()
+
+    if campaign_fleet is not None:
+        campaign_fleet.stop()
+        cleanup_processes()
 
     # 生成总体报告
     generate_overall_report(all_topo_results, mode=mode)
@@ -542,6 +1016,196 @@ def generate_overall_report(all_results, mode='pq'):
               f"平均耗时 {summary['avg_duration']:.2f}秒")
 
 
+# ==================== 并发负载测试 ====================
+def latency_percentiles(values_ms):
+    """延迟分布统计（最近秩百分位）"""
+    if not values_ms:
+        return {}
+    ordered = sorted(values_ms)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        'mean_ms': round(sum(ordered) / len(ordered), 2),
+        'p50_ms': round(rank(50), 2),
+        'p95_ms': round(rank(95), 2),
+        'p99_ms': round(rank(99), 2),
+        'max_ms': round(ordered[-1], 2)
+    }
+
+
+def run_client_once(config, mode='pq', timeout=120, netns=None):
+    """
+    运行一次客户端（负载测试的工作单元，不写日志文件）
+
+    Returns:
+        (是否成功, 服务耗时秒, 失败原因, 实测电路建立毫秒)
+    """
+    target_url = config['test_configuration']['target_url']
+    client_cmd = netns_exec_prefix(netns) + ['./client', '--mode', mode, '-u', target_url]
+    start = time.monotonic()
+    try:
+        result = subprocess.run(client_cmd, capture_output=True, text=True,
+                                timeout=timeout, cwd=PQ_NTOR_DIR)
+    except subprocess.TimeoutExpired:
+        return False, time.monotonic() - start, 'timeout', None
+    elapsed = time.monotonic() - start
+
+    circuit_ms = compute_phase_timings(
+        parse_client_events(result.stdout.splitlines()))['circuit_build_time_ms']
+    if result.returncode != 0:
+        return False, elapsed, f"exit {result.returncode}", circuit_ms
+    if 'Test completed successfully!' not in result.stdout:
+        return False, elapsed, 'incomplete', circuit_ms
+    return True, elapsed, None, circuit_ms
+
+
+def run_load_level(config, concurrency, num_circuits, mode='pq', rate=None,
+                   netns=None, seed=None):
+    """
+    以给定并发度发起一批电路建立
+
+    rate为None时为闭环负载：concurrency个客户端首尾相接地运行；
+    指定rate时为开环负载：按泊松过程（rate个/秒）到达，最多concurrency个并发，
+    超出的到达排队等待，延迟从计划到达时刻算起（包含排队时间）。
+
+    Args:
+        config: 拓扑配置
+        concurrency: 最大并发客户端数
+        num_circuits: 本级别发起的电路数
+        mode: NTOR模式
+        rate: 开环到达率（电路/秒），None表示闭环
+        netns: 网络命名空间
+        seed: 到达间隔随机种子
+
+    Returns:
+        本级别的吞吐量、延迟分布和失败统计
+    """
+    timeout = config['test_configuration']['timeout_seconds']
+    rng = random.Random(seed)
+    outcomes = []  # (是否成功, 总延迟秒, 服务耗时秒, 失败原因, 电路建立毫秒)
+
+    def job(arrival=None):
+        # 闭环时从客户端启动算起；开环时从计划到达时刻算起
+        if arrival is None:
+            arrival = time.monotonic()
+        ok, service, error, circuit_ms = run_client_once(config, mode, timeout, netns)
+        outcomes.append((ok, time.monotonic() - arrival, service, error, circuit_ms))
+
+    wall_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        next_arrival = wall_start
+        for _ in range(num_circuits):
+            if rate is not None:
+                delay = next_arrival - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(job, next_arrival)
+                next_arrival += rng.expovariate(rate)
+            else:
+                executor.submit(job)
+    wall = time.monotonic() - wall_start
+
+    successes = [o for o in outcomes if o[0]]
+    errors = {}
+    for o in outcomes:
+        if not o[0]:
+            errors[o[3]] = errors.get(o[3], 0) + 1
+
+    return {
+        'concurrency': concurrency,
+        'arrival_rate': rate,
+        'circuits': len(outcomes),
+        'success_count': len(successes),
+        'failure_count': len(outcomes) - len(successes),
+        'failure_rate': round((len(outcomes) - len(successes)) / len(outcomes) * 100, 2)
+                        if outcomes else 0,
+        'errors': errors,
+        'wall_time_s': round(wall, 3),
+        'circuits_per_s': round(len(successes) / wall, 3) if wall > 0 else 0,
+        'latency': latency_percentiles([o[1] * 1000 for o in successes]),
+        'service_time': latency_percentiles([o[2] * 1000 for o in successes]),
+        'circuit_build_time': latency_percentiles([o[4] for o in successes if o[4] is not None])
+    }
+
+
+def find_saturation(levels, min_gain=0.05):
+    """吞吐量增益首次低于min_gain时的并发度（未饱和返回None）"""
+    for prev, cur in zip(levels, levels[1:]):
+        if prev['circuits_per_s'] > 0 and \
+                cur['circuits_per_s'] < prev['circuits_per_s'] * (1 + min_gain):
+            return prev['concurrency']
+    return None
+
+
+def test_topology_load(topo_id, concurrency_levels, num_circuits=50, mode='pq',
+                       rate=None, seed=None):
+    """
+    对单个拓扑做并发负载扫描（共享同一组常驻Guard/Middle/Exit）
+
+    Args:
+        concurrency_levels: 依次测试的并发度列表
+        num_circuits: 每个并发度发起的电路数
+        rate: 开环到达率（电路/秒），None表示闭环
+    """
+    print("\n" + "=" * 70)
+    print(f"📈 负载测试 拓扑 {topo_id:02d} - {mode.upper()} NTOR "
+          f"({'开环 %.1f 电路/秒' % rate if rate else '闭环'})")
+    print("=" * 70)
+
+    config = load_topology_config(topo_id)
+    if config is None:
+        return None
+
+    if not configure_network(config):
+        print("❌ 网络配置失败")
+        return None
+
+    fleet = WarmFleet(f"topo{topo_id:02d}_load")
+    levels = []
+    try:
+        for concurrency in concurrency_levels:
+            restarts_before = fleet.restarts
+            if not fleet.ensure(config):
+                print(f"❌ 并发 {concurrency}: 常驻节点不可用")
+                break
+
+            level = run_load_level(config, concurrency, num_circuits, mode=mode,
+                                   rate=rate, seed=seed)
+            level['fleet_restarts'] = fleet.restarts - restarts_before
+            levels.append(level)
+
+            latency = level['latency']
+            print(f"  并发 {concurrency:3d}: {level['circuits_per_s']:7.2f} 电路/秒, "
+                  f"p50 {latency.get('p50_ms', float('nan')):8.1f}ms, "
+                  f"p95 {latency.get('p95_ms', float('nan')):8.1f}ms, "
+                  f"失败率 {level['failure_rate']:.1f}%")
+    finally:
+        fleet.stop()
+        cleanup_processes()
+
+    saturation = find_saturation(levels)
+    if saturation is not None:
+        print(f"  ⚠️  吞吐量在并发 {saturation} 后不再增长（中继事件循环饱和）")
+
+    result_file = RESULTS_DIR / f"topo{topo_id:02d}_{mode}_load.json"
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'topology_id': topo_id,
+            'topology_name': config['topology_name'],
+            'mode': mode,
+            'arrival_rate': rate,
+            'circuits_per_level': num_circuits,
+            'network_config': config['network_simulation']['aggregate_params'],
+            'levels': levels,
+            'saturation_concurrency': saturation
+        }, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ 负载测试完成! 结果已保存到: {result_file}")
+    return levels
+
+
 # ==================== 命令行接口 ====================
 def main():
     parser = argparse.ArgumentParser(
@@ -561,6 +1225,22 @@ def main():
                         help='快速测试模式 (每个拓扑仅运行3次)')
     parser.add_argument('--mode', type=str, choices=['pq', 'classic'], default='pq',
                         help='NTOR模式: pq (PQ-NTOR) 或 classic (Classic NTOR, 默认: pq)')
+    parser.add_argument('--parallel', type=int, default=0, metavar='N',
+                        help='并行测试N个拓扑，每个拓扑使用独立网络命名空间 '
+                             '(需要sudo；目标服务器需监听所有接口，默认: 0 顺序执行)')
+    parser.add_argument('--warm-fleet', type=str, nargs='?', const='topology',
+                        choices=['topology', 'campaign'], default=None,
+                        help='复用常驻Directory/Relay进程，仅重启崩溃的节点: '
+                             'topology 每个拓扑启动一次 (默认), campaign 整个测试启动一次 '
+                             '(并行模式下按拓扑复用)')
+    parser.add_argument('--load', type=str, metavar='LEVELS',
+                        help='并发负载测试：逗号分隔的并发客户端数，如 1,2,4,8,16')
+    parser.add_argument('--load-circuits', type=int, default=50, metavar='N',
+                        help='负载测试中每个并发度发起的电路数 (默认: 50)')
+    parser.add_argument('--rate', type=float, metavar='R',
+                        help='负载测试开环到达率（电路/秒，泊松到达）；不指定时为闭环')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='开环到达间隔的随机种子')
 
     args = parser.parse_args()
 
@@ -580,15 +1260,25 @@ def main():
     num_runs = 3 if args.quick else args.runs
 
     try:
-        if args.topo:
+        if args.load:
+            # 并发负载测试
+            levels = [int(x) for x in args.load.split(',') if x.strip()]
+            topo_ids = [args.topo] if args.topo else range(args.start, args.end + 1)
+            for topo_id in topo_ids:
+                test_topology_load(topo_id, levels, num_circuits=args.load_circuits,
+                                   mode=args.mode, rate=args.rate, seed=args.seed)
+        elif args.topo:
             # 测试单个拓扑
             if not (1 <= args.topo <= 12):
                 print("❌ 拓扑ID必须在1-12之间")
                 sys.exit(1)
-            test_single_topology(args.topo, num_runs, mode=args.mode)
+            fleet = WarmFleet(f"topo{args.topo:02d}") if args.warm_fleet else None
+            test_single_topology(args.topo, num_runs, mode=args.mode, fleet=fleet)
+            cleanup_processes()
         else:
             # 测试多个拓扑
-            test_all_topologies(args.start, args.end, num_runs, mode=args.mode)
+            test_all_topologies(args.start, args.end, num_runs, mode=args.mode,
+                                parallel=args.parallel, warm_fleet=args.warm_fleet)
 
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断测试")
@@ -17,7 +17,7 @@ SAGIN_EXP_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(SAGIN_EXP_DIR))
 
 try:
-    from satellite_orbit import SatelliteOrbit
+    from satellite_orbit import SatelliteOrbit, DEFAULT_CACHE_DIR
 except ImportError as e:
     print(f"❌ 无法导入satellite_orbit模块: {e}")
     print(f"   请确保文件存在: {SAGIN_EXP_DIR}/satellite_orbit.py")
@@ -37,8 +37,8 @@ class SatelliteLinkCalculator:
         """
         print("🛰️  初始化卫星轨道计算器...")
 
-        # 初始化SatelliteOrbit
-        self.orbit = SatelliteOrbit()
+        # 初始化SatelliteOrbit（轻量模式，窗口按需计算并缓存到磁盘）
+        self.orbit = SatelliteOrbit(lazy=True, cache_dir=DEFAULT_CACHE_DIR)
 
         self.use_static_snapshot = use_static_snapshot
         self.snapshot_time = snapshot_time
@@ -244,8 +244,9 @@ class SatelliteLinkCalculator:
                 print("   ⚠️  未找到通信窗口，使用默认时间段")
                 return self._generate_default_time_slots(num_slots)
 
-            start_time = best_window['start']
-            end_time = best_window['end']
+            # 区域窗口使用 start_time/end_time，过顶窗口使用 start/end
+            start_time = best_window.get('start_time', best_window.get('start'))
+            end_time = best_window.get('end_time', best_window.get('end'))
         else:
             # 使用默认时间段
             return self._generate_default_time_slots(num_slots)
@@ -8,7 +8,7 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
-from satellite_orbit import SatelliteOrbit
+from satellite_orbit import SatelliteOrbit, DEFAULT_CACHE_DIR
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
@@ -20,7 +20,7 @@ class PQNTORSatelliteTest:
 
     def __init__(self):
         """初始化测试环境"""
-        self.orbit = SatelliteOrbit()
+        self.orbit = SatelliteOrbit(lazy=True, cache_dir=DEFAULT_CACHE_DIR)
         self.ground_station_pos = [0, 0, 0]  # 地面站位置 (原点)
         self.base_handshake_us = 49  # 真实C程序测量的握手时间(微秒)
 
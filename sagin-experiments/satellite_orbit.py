@@ -1,11 +1,56 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
 import numpy as np
 from datetime import datetime, timedelta
 from skyfield.api import load, wgs84, EarthSatellite, utc
 from skyfield.elementslib import osculating_elements_of
+from skyfield.framelib import itrs
+from skyfield.nutationlib import iau2000b_radians
 import matplotlib.pyplot as plt
 
+# 通信窗口磁盘缓存的默认目录
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'sagin_orbit'
+
+# 地球自转角速度(rad/s)
+EARTH_ROTATION_RAD_S = 7.2921150e-5
+
+
+def _encode_window_value(value):
+    """JSON序列化窗口中的datetime"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化类型: {type(value)}")
+
+
+def _decode_window_value(obj):
+    """JSON反序列化窗口中的datetime"""
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
 class SatelliteOrbit:
-    def __init__(self):
+    def __init__(self, lazy=False, cache_dir=None):
+        """
+        参数:
+            lazy: 轻量模式，只建立Skyfield对象；通信窗口、最佳窗口和绘图在首次访问时计算并缓存，且不打印分析过程
+            cache_dir: 通信窗口磁盘缓存目录（按TLE+观测点+时间范围索引），None表示不使用磁盘缓存
+        """
+        self.verbose = not lazy
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+
+        # 延迟计算的结果
+        self._communication_windows = None
+        self._best_window = None
+        self._center_windows = None
+        self._communication_windows_by_region = None
+        self._full_analysis_done = False
+
         # 地球参数
         self.earth_radius = 6378.137  # 地球半径(km)
         self.earth_mu = 3.986004418e5  # 地球引力常数(km³/s²)
@@ -38,15 +83,80 @@ class SatelliteOrbit:
         # 1. 首先设置Skyfield对象
         self._setup_skyfield()
         
+        # 轻量模式：其余分析在首次访问时进行
+        if lazy:
+            return
+        
         # 2. 计算通信窗口，并选择最佳窗口
         self.best_window = self.select_best_overhead_window()
         
         # 3. 修改：不移动观测区域，保持(0,0)为原点
         # self.set_observation_region()  # 注释掉或删除此行
         
+        self.run_full_analysis()
+
+    @property
+    def communication_windows(self):
+        """24小时通信窗口（首次访问时计算）"""
+        if self._communication_windows is None:
+            self._communication_windows = self.calculate_communication_windows()
+        return self._communication_windows
+
+    @property
+    def best_window(self):
+        """最佳过顶窗口（首次访问时计算）"""
+        if self._best_window is None:
+            self._best_window = self.select_best_overhead_window()
+        return self._best_window
+
+    @best_window.setter
+    def best_window(self, window):
+        self._best_window = window
+
+    @property
+    def center_windows(self):
+        """区域中心点的通信窗口（首次访问时计算）"""
+        if self._center_windows is None:
+            self._center_windows = self.analyze_center_visibility(min_elevation=10.0)
+        return self._center_windows
+
+    @property
+    def communication_windows_by_region(self):
+        """激活小区的通信窗口（首次访问时计算，时间范围与run_full_analysis一致）"""
+        if self._communication_windows_by_region is None:
+            center_windows = self.center_windows
+            best_center_window = max(center_windows, key=lambda w: w['duration']) if center_windows else None
+            self._analyze_active_region(best_center_window)
+        return self._communication_windows_by_region
+
+    @communication_windows_by_region.setter
+    def communication_windows_by_region(self, windows):
+        self._communication_windows_by_region = windows
+
+    def _analyze_active_region(self, best_center_window):
+        """
+        分析激活小区的通信窗口
+        参数:
+            best_center_window: 最佳中心点窗口，使用其前后各1分钟；None表示使用整个时间范围
+        """
+        if best_center_window is None:
+            return self.analyze_region_visibility(min_elevation=10.0, active_cells_only=True)
+        return self.analyze_region_visibility(
+            min_elevation=10.0,
+            active_cells_only=True,
+            start_time=best_center_window['start_time'] - timedelta(minutes=1),
+            end_time=best_center_window['end_time'] + timedelta(minutes=1)
+        )
+
+    def run_full_analysis(self):
+        """完整分析：中心点窗口、仰角分布图、激活小区窗口和窗口内仰角曲线（只执行一次）"""
+        if self._full_analysis_done:
+            return
+        self._full_analysis_done = True
+        
         # 4. 先分析区域中心点的通信窗口
         print("\n首先分析区域中心点的通信窗口...")
-        center_windows = self.analyze_center_visibility(min_elevation=10.0)
+        center_windows = self.center_windows
         
         # 5. 分析整个区域的通信窗口
         if len(center_windows) > 0:
@@ -58,22 +168,28 @@ class SatelliteOrbit:
             
             # 使用中心窗口的时间范围分析激活小区
             print("\n使用中心窗口时间范围分析激活小区...")
-            active_windows = self.analyze_region_visibility(
-                min_elevation=10.0, 
-                active_cells_only=True,
-                start_time=best_center_window['start_time'] - timedelta(minutes=1),
-                end_time=best_center_window['end_time'] + timedelta(minutes=1)
-            )
+            active_windows = self._analyze_active_region(best_center_window)
             
             # 分析窗口内的仰角变化
             self.analyze_elevation_during_window(best_center_window)
         else:
             # 如果中心点没有窗口，尝试分析更大范围的时间
             print("\n中心点没有找到通信窗口，尝试整个时间范围...")
-            self.analyze_region_visibility(min_elevation=10.0, active_cells_only=True)
+            self._analyze_active_region(None)
     
     def _setup_skyfield(self):
         """设置Skyfield对象，用于通信窗口计算"""
+        self.line1 = f'1 57795U 23135D   25067.76655111  .00000709  00000-0  38421-3 0  9996'
+        self.line2 = f'2 57795  49.9742 310.5414 0014096  75.8315 284.4162 14.22760140 78354'
+        
+        # 加载时间尺度和创建卫星、观测点
+        self.ts = load.timescale()
+        self.satellite = EarthSatellite(self.line1, self.line2, name='Simulation', ts=self.ts)
+        self.observer = wgs84.latlon(self.region_center_lat, self.region_center_lon)
+        
+        if not self.verbose:
+            return
+        
         # 计算轨道周期(分钟)和平均运动(每天圈数)
         period_seconds = 2 * np.pi * np.sqrt(self.a**3 / self.earth_mu)
         period_minutes = period_seconds / 60
@@ -82,18 +198,10 @@ class SatelliteOrbit:
         print(f"轨道信息: 半长轴={self.a}km, 高度≈{self.a-self.earth_radius:.1f}km")
         print(f"轨道周期: {period_minutes:.2f}分钟, 平均运动: {mean_motion:.4f}圈/天")
         
-        self.line1 = f'1 57795U 23135D   25067.76655111  .00000709  00000-0  38421-3 0  9996'
-        self.line2 = f'2 57795  49.9742 310.5414 0014096  75.8315 284.4162 14.22760140 78354'
-        
         print("使用以下TLE数据:")
         print(self.line1)
         print(self.line2)
         
-        # 加载时间尺度和创建卫星、观测点
-        self.ts = load.timescale()
-        self.satellite = EarthSatellite(self.line1, self.line2, name='Simulation', ts=self.ts)
-        self.observer = wgs84.latlon(self.region_center_lat, self.region_center_lon)
-        
         # 验证TLE是否对应预期轨道
         t = self.ts.from_datetime(self.epoch)
         geocentric = self.satellite.at(t)
@@ -103,6 +211,42 @@ class SatelliteOrbit:
         print(f"偏心率: {elements.eccentricity:.6f}")
         print(f"轨道倾角: {elements.inclination.degrees:.2f} 度")
         print(f"观测点: 纬度={self.region_center_lat:.4f}, 经度={self.region_center_lon:.4f}")
+
+    def _cache_key(self, kind, start_time, end_time, params):
+        """磁盘缓存键：TLE + 观测点 + 时间范围 + 分析参数"""
+        payload = json.dumps({
+            'kind': kind,
+            'tle': [self.line1, self.line2],
+            'observer': [round(self.observer.latitude.degrees, 9), round(self.observer.longitude.degrees, 9)],
+            'start': start_time.isoformat(),
+            'end': end_time.isoformat(),
+            'params': params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def _cached_windows(self, kind, start_time, end_time, params, compute):
+        """从磁盘缓存读取通信窗口，未命中时调用compute计算并写入缓存"""
+        if self.cache_dir is None:
+            return compute()
+        
+        path = self.cache_dir / f"{kind}_{self._cache_key(kind, start_time, end_time, params)}.json"
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f, object_hook=_decode_window_value)
+            except (OSError, ValueError):
+                pass  # 缓存损坏则重新计算
+        
+        windows = compute()
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(windows, f, default=_encode_window_value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  写入轨道缓存失败: {e}")
+        return windows
     
     # def calculate_position(self, time):
     #     """计算指定时间的卫星位置(通过Skyfield)"""
@@ -122,13 +266,20 @@ class SatelliteOrbit:
     
     def calculate_communication_windows(self, duration_hours=24, step_seconds=60):
         """计算卫星与目标区域的通信窗口(通过Skyfield)"""
-        windows = []
-        
         # 设置时间范围
         start_time = self.epoch
         end_time = start_time + timedelta(hours=duration_hours)
         
-        print(f"计算从 {start_time} 到 {end_time} 的通信窗口...")
+        return self._cached_windows(
+            'comm', start_time, end_time, {'altitude_degrees': 5.0},
+            lambda: self._find_communication_windows(start_time, end_time))
+
+    def _find_communication_windows(self, start_time, end_time):
+        """使用Skyfield的升降事件计算通信窗口"""
+        windows = []
+        
+        if self.verbose:
+            print(f"计算从 {start_time} 到 {end_time} 的通信窗口...")
         
         # 使用Skyfield的find_events方法找出升降事件
         t0 = self.ts.from_datetime(start_time)
@@ -142,7 +293,8 @@ class SatelliteOrbit:
             for time, event in zip(times, events):
                 event_name = ['升起', '最高点', '落下'][event]
                 dt = time.utc_datetime()
-                print(f"{dt} - {event_name}")
+                if self.verbose:
+                    print(f"{dt} - {event_name}")
                 
                 if event == 0:  # 升起
                     current_window['start'] = dt
@@ -152,7 +304,8 @@ class SatelliteOrbit:
                     if current_window['start'] is not None:
                         current_window['end'] = dt
                         duration = (current_window['end'] - current_window['start']).total_seconds()
-                        print(f"通信窗口: {current_window['start']} 到 {current_window['end']}, 持续时间: {duration:.2f} 秒")
+                        if self.verbose:
+                            print(f"通信窗口: {current_window['start']} 到 {current_window['end']}, 持续时间: {duration:.2f} 秒")
                         windows.append(current_window.copy())
                         current_window = {'start': None, 'end': None, 'max_elevation_time': None}
         
@@ -182,7 +335,7 @@ class SatelliteOrbit:
 
     def select_best_overhead_window(self):
         """选择最佳过顶窗口（高度角最大的窗口）"""
-        windows = self.calculate_communication_windows()
+        windows = self.communication_windows
         
         # 找出每个窗口的最大高度角
         max_elevations = []
@@ -203,7 +356,7 @@ class SatelliteOrbit:
     def set_observation_region(self):
         """设置观测区域为卫星最佳过顶点下方的区域"""
         # 找到高度角最大的窗口和时刻
-        windows = self.calculate_communication_windows()
+        windows = self.communication_windows
         max_elevation = -1
         best_window = None
         best_time = None
@@ -249,51 +402,130 @@ class SatelliteOrbit:
         # 关键修改: 更新observer以使用新的区域中心
         # self.observer = wgs84.latlon(self.region_center_lat, self.region_center_lon)
 
-    def analyze_region_visibility(self, min_elevation=10.0, active_cells_only=False, start_time=None, end_time=None):
+    def _time_grid(self, start_time, offsets):
+        """start_time + offsets（秒）的Skyfield Time数组"""
+        t = self.ts.utc(start_time.year, start_time.month, start_time.day,
+                        start_time.hour, start_time.minute,
+                        start_time.second + start_time.microsecond / 1e6 + offsets)
+        # 长时间网格下IAU2000A章动是主要开销，改用IAU2000B（精度约1毫角秒，对仰角无影响）
+        t._nutation_angles_radians = iau2000b_radians(t)
+        return t
+
+    def _interpolation_step(self, max_error_m):
         """
-        分析整个区域（所有或激活小区）与卫星的通信窗口
+        三次Hermite插值满足误差上限的最大采样步长（秒）
+        插值误差 <= h^4/384 * max|x|，近圆轨道 |x| ≈ r·ω^4（ω取轨道角速度与地球自转之和）
+        """
+        mean_motion = self.satellite.model.no_kozai / 60.0  # rad/min -> rad/s
+        radius_km = (self.earth_mu / mean_motion**2) ** (1 / 3)
+        omega = mean_motion + EARTH_ROTATION_RAD_S
+        h = (384 * (max_error_m / 1000) / (radius_km * omega**4)) ** 0.25
+        # 留出余量覆盖偏心率和摄动
+        return float(min(h * 0.5, 600.0))
+
+    def get_satellite_positions_for_env(self, start_time, num_steps, step_seconds, max_error_m=1.0):
+        """
+        批量获取等间隔时间网格上的卫星ENU位置
         参数:
-            min_elevation: 最小仰角要求（度）
-            active_cells_only: 是否只分析激活的小区
-            start_time: 自定义分析开始时间
-            end_time: 自定义分析结束时间
+            start_time: 网格起始时间
+            num_steps: 采样点数量
+            step_seconds: 采样步长（秒）
+            max_error_m: 插值位置误差上限（米）；步长小于对应的外推步长时，
+                         只在粗网格上外推位置和速度，再用三次Hermite插值；None表示逐点外推
+        返回:
+            (num_steps, 3) 数组，单位米，与get_satellite_position_for_env逐行一致（插值时误差不超过max_error_m）
         """
-        print(f"\n===== 分析区域的卫星通信窗口 =====")
-        print(f"最小仰角要求: {min_elevation}°")
-        
-        # 获取Envir.py中定义的小区中心坐标
-        cell_centers_enu = []
-        # 从Envir.py中复制小区布局信息
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=utc)
+
+        ratio = 1
+        if max_error_m is not None:
+            ratio = int(self._interpolation_step(max_error_m) // step_seconds)
+        if ratio <= 1:
+            # 构造一个Skyfield Time数组，一次性完成整个时间范围的轨道外推
+            t = self._time_grid(start_time, np.arange(num_steps) * float(step_seconds))
+            topocentric = (self.satellite - self.observer).at(t)
+            alt, az, distance = topocentric.altaz()
+
+            alt_rad = alt.radians
+            az_rad = az.radians
+            dist_m = distance.km * 1000
+            e = dist_m * np.sin(az_rad) * np.cos(alt_rad)
+            n = dist_m * np.cos(az_rad) * np.cos(alt_rad)
+            u = dist_m * np.sin(alt_rad)
+            return np.column_stack((e, n, u))
+
+        # 粗网格取输出步长的整数倍，使粗网格点与输出网格点重合
+        h = ratio * float(step_seconds)
+        num_samples = (num_steps - 1) // ratio + 2
+        t = self._time_grid(start_time, np.arange(num_samples) * h)
+        pos, vel = self.satellite.at(t).frame_xyz_and_velocity(itrs)
+
+        # 地固系 -> 观测点ENU（观测点在地固系中静止，ENU旋转矩阵为常量）
+        lat = self.observer.latitude.radians
+        lon = self.observer.longitude.radians
+        rotation = np.array([
+            [-np.sin(lon), np.cos(lon), 0.0],
+            [-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)],
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)],
+        ])
+        p = (pos.km.T - self.observer.itrs_xyz.km) @ rotation.T * 1000
+        v = vel.km_per_s.T @ rotation.T * (1000 * h)
+
+        # 三次Hermite插值
+        j = np.arange(num_steps)
+        i = j // ratio
+        s = ((j % ratio) / ratio)[:, None]
+        s2 = s * s
+        s3 = s2 * s
+        return ((2 * s3 - 3 * s2 + 1) * p[i] + (s3 - 2 * s2 + s) * v[i]
+                + (-2 * s3 + 3 * s2) * p[i + 1] + (s3 - s2) * v[i + 1])
+
+    def _get_cell_centers_enu(self, active_cells_only=False):
+        """按Envir.py中的小区布局生成小区中心ENU坐标（米）"""
         R = 15000  # 波束半径15km
         distance = 1.7 * R
-        
-        # 按Envir.py中的小区布局生成坐标
-        # 第1行 (顶部3个)
-        cell_centers_enu.append((-distance, distance*1.8))
-        cell_centers_enu.append((0, distance*1.8))
-        cell_centers_enu.append((distance, distance*1.8))
-        
-        # 第2行 (中上4个)
-        cell_centers_enu.append((-distance*1.5, distance*0.9))
-        cell_centers_enu.append((-distance/2, distance*0.9))
-        cell_centers_enu.append((distance/2, distance*0.9))
-        cell_centers_enu.append((distance*1.5, distance*0.9))
-        
-        # 第3行 (中下3个)
-        cell_centers_enu.append((-distance, 0))
-        cell_centers_enu.append((0, 0))  # 中心点
-        cell_centers_enu.append((distance, 0))
-        
-        # 第4行 (底部2个)
-        cell_centers_enu.append((-distance/2, -distance*0.9))
-        cell_centers_enu.append((distance/2, -distance*0.9))
-        
+
+        cell_centers_enu = [
+            # 第1行 (顶部3个)
+            (-distance, distance*1.8), (0, distance*1.8), (distance, distance*1.8),
+            # 第2行 (中上4个)
+            (-distance*1.5, distance*0.9), (-distance/2, distance*0.9),
+            (distance/2, distance*0.9), (distance*1.5, distance*0.9),
+            # 第3行 (中下3个)
+            (-distance, 0), (0, 0), (distance, 0),
+            # 第4行 (底部2个)
+            (-distance/2, -distance*0.9), (distance/2, -distance*0.9),
+        ]
+
         # 只保留激活的小区中心
         if active_cells_only:
             # 假设激活的小区为1, 6, 11 (对应索引0, 5, 10)
             active_indices = [0, 5, 10]
             cell_centers_enu = [cell_centers_enu[i] for i in active_indices]
-            print(f"仅分析 {len(cell_centers_enu)} 个激活小区中心 (索引 {active_indices})")
+            if self.verbose:
+                print(f"仅分析 {len(cell_centers_enu)} 个激活小区中心 (索引 {active_indices})")
+
+        return cell_centers_enu
+
+    def analyze_region_visibility(self, min_elevation=10.0, active_cells_only=False, start_time=None, end_time=None,
+                                  step_seconds=30, batched=True):
+        """
+        分析整个区域（所有或激活小区）与卫星的通信窗口
+        参数:
+            min_elevation: 最小仰角要求（度）
+            active_cells_only: 是否只分析激活的小区
+            start_time: 自定义分析开始时间
+            end_time: 自定义分析结束时间
+            step_seconds: 采样步长（秒）
+            batched: 是否使用批量模式（一次外推整个时间网格，NumPy广播计算仰角矩阵）
+        """
+        if self.verbose:
+            print(f"\n===== 分析区域的卫星通信窗口 =====")
+            print(f"最小仰角要求: {min_elevation}°")
+        
+        # 获取Envir.py中定义的小区中心坐标
+        cell_centers_enu = self._get_cell_centers_enu(active_cells_only)
         
         # 设置时间范围
         if start_time is None:
@@ -301,10 +533,97 @@ class SatelliteOrbit:
         if end_time is None:
             end_time = self.epoch + timedelta(hours=24)
         
-        print(f"分析时间范围: {start_time} 到 {end_time}")
+        if self.verbose:
+            print(f"分析时间范围: {start_time} 到 {end_time}")
+
+        if batched:
+            analyze = self._analyze_region_visibility_batched
+        else:
+            analyze = self._analyze_region_visibility_loop
+        communication_windows = self._cached_windows(
+            'region', start_time, end_time,
+            {'min_elevation': min_elevation, 'active_cells_only': active_cells_only, 'step_seconds': step_seconds},
+            lambda: analyze(cell_centers_enu, min_elevation, start_time, end_time, step_seconds))
+
+        # 打印通信窗口总结
+        if self.verbose:
+            if not communication_windows:
+                print("在分析时间段内没有找到满足仰角要求的通信窗口")
+            else:
+                print("\n===== 通信窗口总结 =====")
+                print(f"找到 {len(communication_windows)} 个通信窗口:")
+            
+                for i, window in enumerate(communication_windows):
+                    print(f"\n窗口 {i+1}:")
+                    print(f"开始时间: {window['start_time']}")
+                    print(f"结束时间: {window['end_time']}")
+                    print(f"持续时间: {window['duration']:.1f} 秒 ({window['duration']/60:.1f} 分钟)")
+                    print(f"开始位置: [{window['start_position'][0]:.2f}, {window['start_position'][1]:.2f}, {window['start_position'][2]:.2f}] m")
+                    print(f"结束位置: [{window['end_position'][0]:.2f}, {window['end_position'][1]:.2f}, {window['end_position'][2]:.2f}] m")
+                
+                    # 显示该窗口是否适合当前仿真
+                    suitable = 600 <= window['duration'] <= 1800  # 10-30分钟
+                    print(f"适合仿真: {'是' if suitable else '否'}")
         
+        # 保存通信窗口，供其他方法使用
+        self.communication_windows_by_region = communication_windows
+        return communication_windows
+
+    def _analyze_region_visibility_batched(self, cell_centers_enu, min_elevation, start_time, end_time, step_seconds):
+        """批量模式：一次外推整个时间网格，计算 (时间步 × 小区) 仰角矩阵"""
+        # 与逐步循环一致：采样 start_time + k*step (<= end_time)，
+        # 额外多算一个点用于记录持续到分析结束的窗口的结束位置
+        num_steps = int((end_time - start_time).total_seconds() // step_seconds) + 1
+        positions = self.get_satellite_positions_for_env(start_time, num_steps + 1, step_seconds)
+        sat_pos = positions[:num_steps]
+
+        # 仰角矩阵 (num_steps, num_cells)
+        cells = np.asarray(cell_centers_enu, dtype=float)
+        dx = sat_pos[:, 0:1] - cells[None, :, 0]
+        dy = sat_pos[:, 1:2] - cells[None, :, 1]
+        horizontal_distance = np.hypot(dx, dy)
+        elevation = np.degrees(np.arctan2(sat_pos[:, 2:3], horizontal_distance))
+        min_cell_elevation = elevation.min(axis=1)
+
+        # 通信状态变化检测：+1 为通信开始，-1 为通信结束
+        is_communicating = min_cell_elevation >= min_elevation
+        edges = np.diff(np.concatenate(([0], is_communicating.astype(np.int8), [0])))
+        start_indices = np.flatnonzero(edges == 1)
+        end_indices = np.flatnonzero(edges == -1)
+
+        if self.verbose:
+            print(f"\n批量分析 {num_steps} 个时刻 × {len(cells)} 个小区...\n")
+
+        communication_windows = []
+        for start_idx, end_idx in zip(start_indices, end_indices):
+            communication_start = start_time + timedelta(seconds=int(start_idx) * step_seconds)
+            communication_end = start_time + timedelta(seconds=int(end_idx) * step_seconds)
+            duration = (communication_end - communication_start).total_seconds()
+            start_pos = positions[start_idx]
+            end_pos = positions[end_idx]
+
+            if self.verbose:
+                print(f"通信开始: {communication_start}, 最小仰角: {min_cell_elevation[start_idx]:.2f}°")
+                if end_idx == num_steps:
+                    print(f"通信持续到分析结束: {communication_end}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
+                else:
+                    print(f"通信结束: {communication_end}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
+                print(f"卫星位置: [{end_pos[0]:.2f}, {end_pos[1]:.2f}, {end_pos[2]:.2f}] m\n")
+
+            communication_windows.append({
+                'start_time': communication_start,
+                'end_time': communication_end,
+                'duration': duration,
+                'start_position': start_pos.tolist(),
+                'end_position': end_pos.tolist()
+            })
+
+        return communication_windows
+
+    def _analyze_region_visibility_loop(self, cell_centers_enu, min_elevation, start_time, end_time, step_seconds):
+        """逐步模式：每个时刻单独调用Skyfield（保留用于结果对比）"""
         # 以较小的步长采样卫星位置
-        time_step = timedelta(seconds=30)  # 增大步长提高速度
+        time_step = timedelta(seconds=step_seconds)
         current_time = start_time
         
         # 用于存储通信窗口的变量
@@ -312,7 +631,8 @@ class SatelliteOrbit:
         was_communicating = False
         communication_windows = []
         
-        print("\n开始分析每个时刻的通信状态...\n")
+        if self.verbose:
+            print("\n开始分析每个时刻的通信状态...\n")
         
         while current_time <= end_time:
             # 获取卫星位置
@@ -342,13 +662,15 @@ class SatelliteOrbit:
             if is_communicating and not was_communicating:
                 # 通信开始
                 communication_start = current_time
-                print(f"通信开始: {current_time}, 最小仰角: {min_cell_elevation:.2f}°")
-                print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m")
+                if self.verbose:
+                    print(f"通信开始: {current_time}, 最小仰角: {min_cell_elevation:.2f}°")
+                    print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m")
             elif not is_communicating and was_communicating:
                 # 通信结束
                 duration = (current_time - communication_start).total_seconds()
-                print(f"通信结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
-                print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m\n")
+                if self.verbose:
+                    print(f"通信结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
+                    print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m\n")
                 
                 # 记录此通信窗口
                 window = {
@@ -379,30 +701,10 @@ class SatelliteOrbit:
             }
             communication_windows.append(window)
             
-            print(f"通信持续到分析结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
-            print(f"卫星位置: [{window['end_position'][0]:.2f}, {window['end_position'][1]:.2f}, {window['end_position'][2]:.2f}] m\n")
-        
-        # 打印通信窗口总结
-        if not communication_windows:
-            print("在分析时间段内没有找到满足仰角要求的通信窗口")
-        else:
-            print("\n===== 通信窗口总结 =====")
-            print(f"找到 {len(communication_windows)} 个通信窗口:")
-            
-            for i, window in enumerate(communication_windows):
-                print(f"\n窗口 {i+1}:")
-                print(f"开始时间: {window['start_time']}")
-                print(f"结束时间: {window['end_time']}")
-                print(f"持续时间: {window['duration']:.1f} 秒 ({window['duration']/60:.1f} 分钟)")
-                print(f"开始位置: [{window['start_position'][0]:.2f}, {window['start_position'][1]:.2f}, {window['start_position'][2]:.2f}] m")
-                print(f"结束位置: [{window['end_position'][0]:.2f}, {window['end_position'][1]:.2f}, {window['end_position'][2]:.2f}] m")
-                
-                # 显示该窗口是否适合当前仿真
-                suitable = 600 <= window['duration'] <= 1800  # 10-30分钟
-                print(f"适合仿真: {'是' if suitable else '否'}")
+            if self.verbose:
+                print(f"通信持续到分析结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
+                print(f"卫星位置: [{window['end_position'][0]:.2f}, {window['end_position'][1]:.2f}, {window['end_position'][2]:.2f}] m\n")
         
-        # 保存通信窗口，供其他方法使用
-        self.communication_windows_by_region = communication_windows
         return communication_windows
 
     # 
@@ -479,12 +781,20 @@ class SatelliteOrbit:
 
     def analyze_center_visibility(self, min_elevation=10.0):
         """分析区域中心点的卫星通信窗口"""
-        print(f"\n===== 分析区域中心点(0,0)的卫星通信窗口 =====")
-        print(f"最小仰角要求: {min_elevation}°")
+        if self.verbose:
+            print(f"\n===== 分析区域中心点(0,0)的卫星通信窗口 =====")
+            print(f"最小仰角要求: {min_elevation}°")
         
         # 设置时间范围，更宽泛以确保捕获完整通信窗口
         start_time = self.epoch - timedelta(hours=24)
         end_time = self.epoch + timedelta(hours=24)
+        
+        return self._cached_windows(
+            'center', start_time, end_time, {'min_elevation': min_elevation, 'step_seconds': 30},
+            lambda: self._analyze_center_visibility_loop(min_elevation, start_time, end_time))
+
+    def _analyze_center_visibility_loop(self, min_elevation, start_time, end_time):
+        """逐步计算区域中心点的通信窗口"""
         time_step = timedelta(seconds=30)  # 增大步长提高速度
         current_time = start_time
         
@@ -513,12 +823,14 @@ class SatelliteOrbit:
             # 记录通信窗口
             if is_communicating and not was_communicating:
                 communication_start = current_time
-                print(f"中心点通信开始: {current_time}, 仰角: {elevation_angle:.2f}°")
-                print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m")
+                if self.verbose:
+                    print(f"中心点通信开始: {current_time}, 仰角: {elevation_angle:.2f}°")
+                    print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m")
             elif not is_communicating and was_communicating:
                 duration = (current_time - communication_start).total_seconds()
-                print(f"中心点通信结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
-                print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m\n")
+                if self.verbose:
+                    print(f"中心点通信结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
+                    print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m\n")
                 communication_windows.append({
                     'start_time': communication_start,
                     'end_time': current_time,
@@ -534,8 +846,9 @@ class SatelliteOrbit:
         # 处理最后一个窗口
         if was_communicating:
             duration = (current_time - communication_start).total_seconds()
-            print(f"中心点通信持续到分析结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
-            print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m\n")
+            if self.verbose:
+                print(f"中心点通信持续到分析结束: {current_time}, 持续: {duration:.1f}秒 ({duration/60:.1f}分钟)")
+                print(f"卫星位置: [{satellite_pos[0]:.2f}, {satellite_pos[1]:.2f}, {satellite_pos[2]:.2f}] m\n")
             communication_windows.append({
                 'start_time': communication_start,
                 'end_time': current_time,
@@ -545,23 +858,24 @@ class SatelliteOrbit:
             })
         
         # 打印结果摘要
-        if communication_windows:
-            print(f"\n找到 {len(communication_windows)} 个中心点通信窗口")
-            for i, window in enumerate(communication_windows):
-                print(f"窗口 {i+1}: 开始于 {window['start_time']}, 持续 {window['duration']:.1f} 秒 ({window['duration']/60:.1f} 分钟)")
+        if self.verbose:
+            if communication_windows:
+                print(f"\n找到 {len(communication_windows)} 个中心点通信窗口")
+                for i, window in enumerate(communication_windows):
+                    print(f"窗口 {i+1}: 开始于 {window['start_time']}, 持续 {window['duration']:.1f} 秒 ({window['duration']/60:.1f} 分钟)")
                 
-                # 如果窗口持续时间适合仿真，标记出来
-                if 600 <= window['duration'] <= 1800:  # 10-30分钟
-                    print(f"  ** 适合仿真的窗口 **")
-                    print(f"  开始位置: [{window['start_position'][0]:.2f}, {window['start_position'][1]:.2f}, {window['start_position'][2]:.2f}] m")
-                    print(f"  结束位置: [{window['end_position'][0]:.2f}, {window['end_position'][1]:.2f}, {window['end_position'][2]:.2f}] m")
-        else:
-            print("中心点没有找到满足仰角要求的通信窗口")
+                    # 如果窗口持续时间适合仿真，标记出来
+                    if 600 <= window['duration'] <= 1800:  # 10-30分钟
+                        print(f"  ** 适合仿真的窗口 **")
+                        print(f"  开始位置: [{window['start_position'][0]:.2f}, {window['start_position'][1]:.2f}, {window['start_position'][2]:.2f}] m")
+                        print(f"  结束位置: [{window['end_position'][0]:.2f}, {window['end_position'][1]:.2f}, {window['end_position'][2]:.2f}] m")
+            else:
+                print("中心点没有找到满足仰角要求的通信窗口")
             
-            # 如果没有找到窗口，显示最大仰角时刻
-            if center_elevations:
-                max_elevation_time, max_elevation = max(center_elevations, key=lambda x: x[1])
-                print(f"中心点最大仰角: {max_elevation:.2f}° 发生在 {max_elevation_time}")
+                # 如果没有找到窗口，显示最大仰角时刻
+                if center_elevations:
+                    max_elevation_time, max_elevation = max(center_elevations, key=lambda x: x[1])
+                    print(f"中心点最大仰角: {max_elevation:.2f}° 发生在 {max_elevation_time}")
         
         return communication_windows
 
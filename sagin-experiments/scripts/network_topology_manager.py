@@ -6,11 +6,16 @@ Uses tc netem for delay/jitter and iptables for link enable/disable
 """
 
 import json
+import math
 import subprocess
+import threading
 import time
 import logging
-from typing import Dict, List, Set, Tuple
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import numpy as np
 from datetime import datetime
 import os
 import sys
@@ -23,6 +28,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
 @dataclass
 class LinkState:
     """Represents the state of a network link"""
@@ -36,26 +48,194 @@ class LinkState:
     loss_percent: float = 0.0
 
 
+@dataclass
+class NetemLeaf:
+    """Per-destination HTB class + netem leaf applied inside a container"""
+    minor: int
+    delay_ms: float
+    jitter_ms: float
+    bandwidth_mbps: int
+
+
+@dataclass
+class ContainerRules:
+    """Compiled rule payloads for one container"""
+    container: str
+    tc_script: str
+    iptables_payload: str
+    leaves: Dict[str, NetemLeaf] = field(default_factory=dict)
+    dropped: Set[str] = field(default_factory=set)
+    # First payload for a container: replace the root qdisc / hook the chain into OUTPUT
+    reset_root_dev: str = ''
+    ensure_jump_chain: str = ''
+
+    def is_empty(self) -> bool:
+        return not self.tc_script and not self.iptables_payload
+
+    def to_shell_script(self) -> str:
+        """Wrap both payloads into one shell script (applied with a single docker exec)"""
+        lines = ['rc=0']
+        if self.iptables_payload:
+            lines += ["iptables-restore --noflush <<'SAGIN_IPT' || rc=1",
+                      self.iptables_payload.rstrip('\n'),
+                      'SAGIN_IPT']
+        if self.ensure_jump_chain:
+            # Idempotent: a restarted manager must not insert a second jump
+            chain = self.ensure_jump_chain
+            lines.append(f'iptables -C OUTPUT -j {chain} 2>/dev/null || '
+                         f'iptables -I OUTPUT 1 -j {chain} || rc=1')
+        if self.reset_root_dev:
+            # Outside the batch: a fresh veth has a noqueue root and the delete fails
+            lines.append(f'tc qdisc del dev {self.reset_root_dev} root 2>/dev/null || true')
+        if self.tc_script:
+            lines += ["tc -force -batch - <<'SAGIN_TC' || rc=1",
+                      self.tc_script.rstrip('\n'),
+                      'SAGIN_TC']
+        lines.append('exit $rc')
+        return '\n'.join(lines) + '\n'
+
+
+class ContainerRuleCompiler:
+    """
+    Compiles topology diffs for one container into a tc batch script and an
+    iptables-restore payload.
+
+    tc layout on eth0:
+        root 1: htb (unclassified traffic is not shaped)
+        class 1:<minor> htb rate <bw>     one per destination
+        filter u32 dst <ip> -> 1:<minor>
+        qdisc <minor>: netem delay ...    leaf under each class
+
+    Only leaves whose parameters changed are replaced; other destinations keep
+    their rules. DROP rules live in a dedicated SAGIN_OUT chain which is
+    rewritten atomically by iptables-restore.
+    """
+
+    IPTABLES_CHAIN = 'SAGIN_OUT'
+    FIRST_MINOR = 0x10
+
+    def __init__(self, container: str, device: str = 'eth0'):
+        self.container = container
+        self.device = device
+        self.initialized = False
+        # Applied state (updated by commit() after a successful exec)
+        self.leaves: Dict[str, NetemLeaf] = {}
+        self.dropped: Set[str] = set()
+
+    def reset(self):
+        """Forget applied state (after the container rules were flushed)"""
+        self.initialized = False
+        self.leaves = {}
+        self.dropped = set()
+
+    def _allocate_minor(self, leaves: Dict[str, NetemLeaf]) -> int:
+        used = {leaf.minor for leaf in leaves.values()}
+        minor = self.FIRST_MINOR
+        while minor in used:
+            minor += 1
+        return minor
+
+    def _netem_args(self, leaf: NetemLeaf) -> str:
+        args = f'netem delay {leaf.delay_ms}ms'
+        if leaf.jitter_ms > 0:
+            args += f' {leaf.jitter_ms}ms'
+        return args
+
+    def compile(self, drop_ips: Set[str], allow_ips: Set[str],
+                leaf_params: Dict[str, Tuple[float, float, int]]) -> ContainerRules:
+        """
+        Compile a diff into rule payloads
+
+        Args:
+            drop_ips: Destinations whose links were disabled
+            allow_ips: Destinations whose links were enabled
+            leaf_params: {dest_ip: (delay_ms, jitter_ms, bandwidth_mbps)} for enabled/updated links
+
+        Returns:
+            ContainerRules with the payloads and the resulting state
+        """
+        dev = self.device
+        tc_lines = []
+        leaves = dict(self.leaves)
+
+        if not self.initialized:
+            tc_lines.append(f'qdisc add dev {dev} root handle 1: htb default 0')
+
+        for dest_ip, (delay_ms, jitter_ms, bandwidth_mbps) in sorted(leaf_params.items()):
+            old = leaves.get(dest_ip)
+            if old is None:
+                leaf = NetemLeaf(self._allocate_minor(leaves), delay_ms, jitter_ms, bandwidth_mbps)
+                classid = f'1:{leaf.minor:x}'
+                tc_lines.append(f'class add dev {dev} parent 1: classid {classid} htb rate {bandwidth_mbps}mbit')
+                tc_lines.append(f'filter add dev {dev} protocol ip parent 1:0 prio 1 u32 '
+                                f'match ip dst {dest_ip} flowid {classid}')
+                tc_lines.append(f'qdisc add dev {dev} parent {classid} handle {leaf.minor:x}: '
+                                f'{self._netem_args(leaf)}')
+            else:
+                leaf = NetemLeaf(old.minor, delay_ms, jitter_ms, bandwidth_mbps)
+                classid = f'1:{leaf.minor:x}'
+                if leaf.bandwidth_mbps != old.bandwidth_mbps:
+                    tc_lines.append(f'class change dev {dev} parent 1: classid {classid} htb rate {bandwidth_mbps}mbit')
+                if (leaf.delay_ms, leaf.jitter_ms) != (old.delay_ms, old.jitter_ms):
+                    tc_lines.append(f'qdisc change dev {dev} parent {classid} handle {leaf.minor:x}: '
+                                    f'{self._netem_args(leaf)}')
+            leaves[dest_ip] = leaf
+
+        dropped = (self.dropped | drop_ips) - allow_ips
+        ipt_lines = []
+        if dropped != self.dropped or not self.initialized:
+            # Declaring the chain with --noflush creates or flushes it
+            ipt_lines.append('*filter')
+            ipt_lines.append(f':{self.IPTABLES_CHAIN} - [0:0]')
+            for dest_ip in sorted(dropped):
+                ipt_lines.append(f'-A {self.IPTABLES_CHAIN} -d {dest_ip} -j DROP')
+            ipt_lines.append('COMMIT')
+
+        # Without any change after initialization there is nothing to send
+        if self.initialized and len(tc_lines) == 0 and not ipt_lines:
+            return ContainerRules(self.container, '', '', leaves, dropped)
+
+        return ContainerRules(
+            container=self.container,
+            tc_script='\n'.join(tc_lines) + '\n' if tc_lines else '',
+            iptables_payload='\n'.join(ipt_lines) + '\n' if ipt_lines else '',
+            leaves=leaves,
+            dropped=dropped,
+            reset_root_dev='' if self.initialized else dev,
+            ensure_jump_chain='' if self.initialized else self.IPTABLES_CHAIN
+        )
+
+    def commit(self, rules: ContainerRules):
+        """Record compiled rules as applied"""
+        self.initialized = True
+        self.leaves = rules.leaves
+        self.dropped = rules.dropped
+
+
 class NetworkTopologyManager:
     """
     Manages Docker container network topology based on SAGIN orbit simulation
     """
 
-    def __init__(self, config_file: str, dry_run: bool = False):
+    def __init__(self, config_file: str, dry_run: bool = False, batched: bool = True,
+                 max_workers: int = 8):
         """
         Initialize the network topology manager
 
         Args:
             config_file: Path to SAGIN topology configuration JSON
             dry_run: If True, only log commands without executing
+            batched: If True, compile each update into one tc/iptables payload per
+                     container applied with a single docker exec
+            max_workers: Number of containers reconfigured in parallel
+                         (1 applies everything sequentially)
         """
         self.config_file = config_file
         self.dry_run = dry_run
+        self.batched = batched
+        self.max_workers = max(1, max_workers)
         self.config = self._load_config()
 
-        # Current network state
-        self.current_links: Dict[Tuple[str, str], LinkState] = {}
-
         # Node to container mapping
         self.node_containers: Dict[str, str] = {}
 
@@ -65,12 +245,69 @@ class NetworkTopologyManager:
         # Statistics
         self.update_count = 0
         self.link_changes = 0
+        self.link_latencies_ms = deque(maxlen=10000)
+        self.link_failures = 0
+        self.failed_links = deque(maxlen=100)
+        self.last_apply_ms = 0.0
+        self._stats_lock = threading.Lock()
 
         # Initialize node mappings
         self._initialize_node_mappings()
 
+        # Interned node indices and index-based link-state table (current network state)
+        self.node_names: List[str] = list(self.node_containers.keys())
+        self.node_index: Dict[str, int] = {name: i for i, name in enumerate(self.node_names)}
+        self._reset_link_table()
+
+        # Per-container rule compilers (batched mode)
+        self.rule_compilers: Dict[str, ContainerRuleCompiler] = {
+            container: ContainerRuleCompiler(container)
+            for container in self.node_containers.values()
+        }
+
         logger.info(f"Network Topology Manager initialized (dry_run={dry_run})")
-        logger.info(f"Managing {len(self.node_ips)} nodes across {len(self.current_links)} potential links")
+        logger.info(f"Managing {len(self.node_ips)} nodes across {int(self.link_known.sum())} potential links")
+
+    def _reset_link_table(self):
+        """Clear the link-state table (N x N arrays indexed by source/destination node)"""
+        n = len(self.node_names)
+        self.link_known = np.zeros((n, n), dtype=bool)
+        self.link_enabled = np.zeros((n, n), dtype=bool)
+        self.link_delay_ms = np.zeros((n, n))
+        self.link_distance_km = np.zeros((n, n))
+        self.link_bandwidth_mbps = np.full((n, n), 100, dtype=np.int64)
+
+    def _link_state_at(self, i: int, j: int) -> LinkState:
+        """Build a LinkState view of one table entry"""
+        return LinkState(
+            source=self.node_names[i],
+            destination=self.node_names[j],
+            enabled=bool(self.link_enabled[i, j]),
+            delay_ms=float(self.link_delay_ms[i, j]),
+            distance_km=float(self.link_distance_km[i, j]),
+            bandwidth_mbps=int(self.link_bandwidth_mbps[i, j])
+        )
+
+    @property
+    def current_links(self) -> Dict[Tuple[str, str], LinkState]:
+        """Dict view of the link-state table"""
+        rows, cols = np.nonzero(self.link_known)
+        return {
+            (self.node_names[i], self.node_names[j]): self._link_state_at(i, j)
+            for i, j in zip(rows.tolist(), cols.tolist())
+        }
+
+    @current_links.setter
+    def current_links(self, states: Dict[Tuple[str, str], LinkState]):
+        self._reset_link_table()
+        for (source, destination), state in states.items():
+            i = self.node_index[source]
+            j = self.node_index[destination]
+            self.link_known[i, j] = True
+            self.link_enabled[i, j] = state.enabled
+            self.link_delay_ms[i, j] = state.delay_ms
+            self.link_distance_km[i, j] = state.distance_km
+            self.link_bandwidth_mbps[i, j] = state.bandwidth_mbps
 
     def _load_config(self) -> dict:
         """Load SAGIN topology configuration"""
@@ -105,30 +342,36 @@ class NetworkTopologyManager:
 
         logger.info(f"Initialized mappings for nodes: {list(self.node_containers.keys())}")
 
-    def _run_command(self, command: List[str], container: str = None) -> bool:
+    def _run_command(self, command: List[str], container: str = None,
+                     input_text: Optional[str] = None) -> bool:
         """
         Execute a shell command (in container if specified)
 
         Args:
             command: Command to execute
             container: Container name (if running command in container)
+            input_text: Data passed to the command's stdin
 
         Returns:
             True if successful, False otherwise
         """
         if container:
             # Run command inside Docker container
-            full_command = ['docker', 'exec', container] + command
+            exec_flags = ['-i'] if input_text is not None else []
+            full_command = ['docker', 'exec'] + exec_flags + [container] + command
         else:
             full_command = command
 
         if self.dry_run:
             logger.info(f"[DRY RUN] Would execute: {' '.join(full_command)}")
+            if input_text is not None:
+                logger.info(f"[DRY RUN] stdin:\n{input_text}")
             return True
 
         try:
             result = subprocess.run(
                 full_command,
+                input=input_text,
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -282,29 +525,91 @@ class NetworkTopologyManager:
 
         logger.info(f"=== Topology Update #{self.update_count} at {timestamp} ===")
 
-        # Extract link visibility information
-        links = topology.get('links', {})
+        if 'link_index' in topology and 'node_names' in topology:
+            # Structured arrays: diff with vector comparisons
+            changes = self._apply_indexed_update(topology['node_names'], topology['link_index'])
+        else:
+            changes = self._apply_dict_update(topology.get('links', {}))
 
+        logger.info(f"Applied {len(changes['enabled'])} link enables, "
+                   f"{len(changes['disabled'])} link disables, "
+                   f"{len(changes['updated'])} link updates")
+
+    def _apply_indexed_update(self, node_names: List[str], link_index: dict) -> dict:
+        """
+        Apply an update given as (src_index, dst_index) arrays into node_names
+
+        Returns:
+            Dictionary with 'enabled', 'disabled', 'updated' link lists
+        """
+        # Map topology node indices to interned manager indices
+        to_manager = np.array([self.node_index.get(name, -1) for name in node_names], dtype=np.int64)
+        src = to_manager[np.asarray(link_index['src_index'], dtype=np.int64)]
+        dst = to_manager[np.asarray(link_index['dst_index'], dtype=np.int64)]
+
+        mapped = (src >= 0) & (dst >= 0)
+        if not mapped.all():
+            unknown = {node_names[i] for i, m in enumerate(to_manager) if m < 0}
+            logger.warning(f"Ignoring links of unmanaged nodes: {sorted(unknown)}")
+        src = src[mapped]
+        dst = dst[mapped]
+
+        n = len(self.node_names)
+        new_known = np.zeros((n, n), dtype=bool)
+        new_enabled = np.zeros((n, n), dtype=bool)
+        new_delay = np.zeros((n, n))
+        new_distance = np.zeros((n, n))
+        new_known[src, dst] = True
+        new_enabled[src, dst] = np.asarray(link_index['visible'], dtype=bool)[mapped]
+        new_delay[src, dst] = np.asarray(link_index['delay_ms'], dtype=float)[mapped]
+        new_distance[src, dst] = np.asarray(link_index['distance_km'], dtype=float)[mapped]
+
+        # Same rules as _calculate_topology_changes
+        was_enabled = self.link_known & self.link_enabled
+        is_enabled = new_known & new_enabled
+        enabled = is_enabled & ~was_enabled
+        disabled = was_enabled & ~is_enabled
+        updated = is_enabled & was_enabled & (np.abs(new_delay - self.link_delay_ms) > 5.0)
+
+        # Update the table (removed links keep their last delay/distance for the disable
+        # operation), then build LinkStates for the changed entries only
+        removed = disabled & ~new_known
+        self.link_known = new_known
+        self.link_enabled = new_enabled
+        self.link_delay_ms = np.where(removed, self.link_delay_ms, new_delay)
+        self.link_distance_km = np.where(removed, self.link_distance_km, new_distance)
+
+        changes = {
+            'enabled': [self._link_state_at(i, j) for i, j in zip(*np.nonzero(enabled))],
+            'disabled': [self._link_state_at(i, j) for i, j in zip(*np.nonzero(disabled))],
+            'updated': [self._link_state_at(i, j) for i, j in zip(*np.nonzero(updated))]
+        }
+
+        self._apply_changes(changes)
+        return changes
+
+    def _apply_dict_update(self, links: dict) -> dict:
+        """Apply an update given as the "NodeA-NodeB" link dict"""
         new_link_states: Dict[Tuple[str, str], LinkState] = {}
 
-        # Process each link
         # Get all node names for parsing
-        all_node_names = list(self.node_containers.keys())
+        all_node_names = self.node_names
 
         for link_key, link_info in links.items():
-            # Parse link key "NodeA-NodeB"
-            # Node names may contain hyphens (e.g., "GS-Beijing")
-            # Find which node name the link starts with
-            source = None
-            destination = None
-
-            for node_name in all_node_names:
-                if link_key.startswith(node_name + '-'):
-                    source = node_name
-                    destination = link_key[len(node_name) + 1:]  # Skip the hyphen
-                    break
-
-            if not source or destination not in all_node_names:
+            source = link_info.get('node1')
+            destination = link_info.get('node2')
+
+            if source is None or destination is None:
+                # Parse link key "NodeA-NodeB"
+                # Node names may contain hyphens (e.g., "GS-Beijing")
+                # Find which node name the link starts with
+                for node_name in all_node_names:
+                    if link_key.startswith(node_name + '-'):
+                        source = node_name
+                        destination = link_key[len(node_name) + 1:]  # Skip the hyphen
+                        break
+
+            if source not in self.node_index or destination not in self.node_index:
                 logger.warning(f"Could not parse link: {link_key}")
                 continue
 
@@ -329,9 +634,7 @@ class NetworkTopologyManager:
         # Update current state
         self.current_links = new_link_states
 
-        logger.info(f"Applied {len(changes['enabled'])} link enables, "
-                   f"{len(changes['disabled'])} link disables, "
-                   f"{len(changes['updated'])} link updates")
+        return changes
 
     def _calculate_topology_changes(self, new_states: Dict[Tuple[str, str], LinkState]) -> dict:
         """
@@ -346,9 +649,11 @@ class NetworkTopologyManager:
             'updated': []    # Links with delay changes
         }
 
+        current_links = self.current_links
+
         # Check for new/enabled links
         for link_key, new_state in new_states.items():
-            old_state = self.current_links.get(link_key)
+            old_state = current_links.get(link_key)
 
             if old_state is None:
                 # New link
@@ -368,48 +673,188 @@ class NetworkTopologyManager:
                         changes['updated'].append(new_state)
 
         # Check for removed links
-        for link_key, old_state in self.current_links.items():
+        for link_key, old_state in current_links.items():
             if link_key not in new_states and old_state.enabled:
                 changes['disabled'].append(old_state)
 
         return changes
 
     def _apply_changes(self, changes: dict):
-        """Apply the calculated topology changes"""
+        """
+        Apply the calculated topology changes
+
+        Work is grouped per source container: operations for one container run
+        in order (disables, enables, updates), different containers run in parallel.
+        """
+        if self.batched:
+            jobs = self._build_batched_jobs(changes)
+        else:
+            jobs = self._build_link_jobs(changes)
+
+        start = time.monotonic()
+        self._run_container_jobs(jobs)
+        self.last_apply_ms = (time.monotonic() - start) * 1000
+
+        self.link_changes += len(changes['disabled']) + len(changes['enabled'])
+
+    def _build_link_jobs(self, changes: dict) -> Dict[str, List[Tuple[List[LinkState], Callable[[], bool]]]]:
+        """Per-link operations grouped by source container, keeping the original order"""
+        jobs: Dict[str, List[Tuple[List[LinkState], Callable[[], bool]]]] = {}
+
+        def add(link: LinkState, operation: Callable[[], bool]):
+            container = self.node_containers.get(link.source)
+            jobs.setdefault(container, []).append(([link], operation))
+
         # Disable links first
         for link in changes['disabled']:
-            self.disable_link(link.source, link.destination)
-            self.link_changes += 1
+            add(link, lambda link=link: self.disable_link(link.source, link.destination))
 
         # Enable and configure new links
         for link in changes['enabled']:
-            self.enable_link(link.source, link.destination)
-            self.update_link_delay(
-                link.source,
-                link.destination,
-                link.delay_ms,
-                bandwidth_mbps=link.bandwidth_mbps
-            )
-            self.link_changes += 1
+            def enable(link=link):
+                self.enable_link(link.source, link.destination)
+                return self.update_link_delay(
+                    link.source,
+                    link.destination,
+                    link.delay_ms,
+                    bandwidth_mbps=link.bandwidth_mbps
+                )
+            add(link, enable)
 
         # Update existing links
         for link in changes['updated']:
-            self.update_link_delay(
+            add(link, lambda link=link: self.update_link_delay(
                 link.source,
                 link.destination,
                 link.delay_ms,
                 bandwidth_mbps=link.bandwidth_mbps
+            ))
+
+        return jobs
+
+    def _build_batched_jobs(self, changes: dict) -> Dict[str, List[Tuple[List[LinkState], Callable[[], bool]]]]:
+        """One compiled payload per container, covering all its changed links"""
+        links_by_container: Dict[str, List[LinkState]] = {}
+        for kind in ('disabled', 'enabled', 'updated'):
+            for link in changes[kind]:
+                container = self.node_containers.get(link.source)
+                links_by_container.setdefault(container, []).append(link)
+
+        jobs = {}
+        for container, rules in self._compile_changes(changes).items():
+            jobs[container] = [(links_by_container.get(container, []),
+                                lambda rules=rules: self._apply_container_rules(rules))]
+        return jobs
+
+    def _run_container_jobs(self, jobs: Dict[str, List[Tuple[List[LinkState], Callable[[], bool]]]]):
+        """Run each container's operations sequentially, containers concurrently"""
+        if not jobs:
+            return
+
+        def run(operations):
+            for links, operation in operations:
+                start = time.monotonic()
+                try:
+                    success = operation()
+                except Exception as e:
+                    logger.error(f"Link operation error: {e}")
+                    success = False
+                self._record_link_result(links, (time.monotonic() - start) * 1000, success)
+
+        workers = min(self.max_workers, len(jobs))
+        if workers == 1:
+            for operations in jobs.values():
+                run(operations)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Leaving the with-block waits for all containers to finish
+            for operations in jobs.values():
+                executor.submit(run, operations)
+
+    def _record_link_result(self, links: List[LinkState], latency_ms: float, success: bool):
+        """Record per-link apply latency and failures"""
+        with self._stats_lock:
+            for link in links:
+                self.link_latencies_ms.append(latency_ms)
+                if not success:
+                    self.link_failures += 1
+                    self.failed_links.append(f"{link.source}->{link.destination}")
+
+    def _compile_changes(self, changes: dict) -> Dict[str, ContainerRules]:
+        """Group changes by source container and compile one payload per container"""
+        drop_ips: Dict[str, Set[str]] = {}
+        allow_ips: Dict[str, Set[str]] = {}
+        leaf_params: Dict[str, Dict[str, Tuple[float, float, int]]] = {}
+
+        for kind in ('disabled', 'enabled', 'updated'):
+            for link in changes[kind]:
+                container = self.node_containers.get(link.source)
+                dest_ip = self.node_ips.get(link.destination)
+
+                if not container or not dest_ip:
+                    logger.warning(f"Cannot apply {kind} link {link.source}->{link.destination}: missing mapping")
+                    continue
+
+                if kind == 'disabled':
+                    drop_ips.setdefault(container, set()).add(dest_ip)
+                    continue
+
+                if kind == 'enabled':
+                    allow_ips.setdefault(container, set()).add(dest_ip)
+                leaf_params.setdefault(container, {})[dest_ip] = (
+                    link.delay_ms, link.jitter_ms, link.bandwidth_mbps)
+
+        compiled = {}
+        for container in set(drop_ips) | set(allow_ips) | set(leaf_params):
+            rules = self.rule_compilers[container].compile(
+                drop_ips.get(container, set()),
+                allow_ips.get(container, set()),
+                leaf_params.get(container, {})
             )
+            if not rules.is_empty():
+                compiled[container] = rules
+
+        return compiled
+
+    def _apply_container_rules(self, rules: ContainerRules) -> bool:
+        """Apply compiled rules to one container with a single docker exec"""
+        success = self._run_command(['sh', '-s'], rules.container, input_text=rules.to_shell_script())
+        if success:
+            self.rule_compilers[rules.container].commit(rules)
+        else:
+            logger.warning(f"Failed to apply rules in {rules.container}; keeping previous rule state")
+        return success
 
     def get_statistics(self) -> dict:
         """Get manager statistics"""
-        active_links = sum(1 for link in self.current_links.values() if link.enabled)
+        active_links = int(np.count_nonzero(self.link_known & self.link_enabled))
+
+        with self._stats_lock:
+            latencies = list(self.link_latencies_ms)
+            link_failures = self.link_failures
+            failed_links = list(self.failed_links)
+
+        if latencies:
+            latency_stats = {
+                'count': len(latencies),
+                'mean_ms': sum(latencies) / len(latencies),
+                'p50_ms': _percentile(latencies, 50),
+                'p95_ms': _percentile(latencies, 95),
+                'max_ms': max(latencies)
+            }
+        else:
+            latency_stats = {'count': 0}
 
         return {
             'update_count': self.update_count,
             'link_changes': self.link_changes,
             'active_links': active_links,
-            'total_links': len(self.current_links)
+            'total_links': int(np.count_nonzero(self.link_known)),
+            'last_apply_ms': self.last_apply_ms,
+            'link_latency': latency_stats,
+            'link_failures': link_failures,
+            'recent_failed_links': failed_links
         }
 
     def reset_all_links(self):
@@ -422,8 +867,11 @@ class NetworkTopologyManager:
 
             # Flush iptables OUTPUT chain
             self._run_command(['iptables', '-F', 'OUTPUT'], container)
+            self._run_command(['iptables', '-F', ContainerRuleCompiler.IPTABLES_CHAIN], container)
+
+            self.rule_compilers[container].reset()
 
-        self.current_links.clear()
+        self._reset_link_table()
         logger.info("All links reset")
 
 
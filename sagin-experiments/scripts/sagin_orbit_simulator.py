@@ -8,9 +8,178 @@ SAGIN Orbit Simulator
 import json
 import time
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from skyfield.api import load, EarthSatellite, wgs84
 from skyfield import almanac
+from skyfield.framelib import itrs
+from skyfield.nutationlib import iau2000b_radians
+
+
+# WGS84椭球参数
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+# 地球自转角速度 (rad/s)
+EARTH_ROTATION_RAD_S = 7.2921150e-5
+
+
+def ecef_to_geodetic(xyz_km):
+    """
+    地固坐标系(ITRS)坐标转换为WGS84大地坐标（向量化）
+
+    Args:
+        xyz_km: (..., 3) 数组，单位km
+
+    Returns:
+        tuple: (纬度deg, 经度deg, 高度km)，形状与输入前缀维度一致
+    """
+    x = xyz_km[..., 0]
+    y = xyz_km[..., 1]
+    z = xyz_km[..., 2]
+
+    lon = np.arctan2(y, x)
+    p = np.hypot(x, y)
+
+    # 迭代求解纬度（LEO/MEO高度下3次迭代即达亚毫米精度）
+    lat = np.arctan2(z, p * (1 - WGS84_E2))
+    for _ in range(4):
+        sin_lat = np.sin(lat)
+        n = WGS84_A_KM / np.sqrt(1 - WGS84_E2 * sin_lat**2)
+        alt = p / np.cos(lat) - n
+        lat = np.arctan2(z, p * (1 - WGS84_E2 * n / (n + alt)))
+
+    sin_lat = np.sin(lat)
+    n = WGS84_A_KM / np.sqrt(1 - WGS84_E2 * sin_lat**2)
+    alt = p / np.cos(lat) - n
+
+    return np.degrees(lat), np.degrees(lon), alt
+
+
+def _utc_iso(time_utc):
+    """与Skyfield Time.utc_iso()一致的时间戳格式（四舍五入到秒）"""
+    rounded = time_utc.astimezone(timezone.utc) + timedelta(microseconds=500000)
+    return rounded.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class EphemerisTable:
+    """
+    卫星星历表
+
+    在给定时间范围内对每颗卫星只做一次SGP4外推，把地固系位置/速度存为
+    紧凑的NumPy数组；查询时用三次Hermite插值（位置+速度）代替SGP4。
+
+    采样步长由误差上限推导：三次Hermite插值误差 <= h^4/384 * max|x''''|，
+    近圆轨道 |x''''| ≈ r·ω^4（ω取轨道角速度与地球自转之和），
+    据此选取满足 max_error_m 的最大步长。采样时使用IAU2000B章动模型，
+    由此带来的差异为厘米级，不计入误差上限。
+    """
+
+    def __init__(self, ts, satellites, start_utc, horizon_sec=86400, max_error_m=1.0):
+        """
+        Args:
+            ts: Skyfield时间尺度
+            satellites: {卫星名称: EarthSatellite}
+            start_utc: 星历起始时间（带时区的datetime）
+            horizon_sec: 星历覆盖时长（秒）
+            max_error_m: 插值位置误差上限（米）
+        """
+        if start_utc.tzinfo is None:
+            start_utc = start_utc.replace(tzinfo=timezone.utc)
+
+        self.names = list(satellites.keys())
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.start_utc = start_utc
+        self.horizon_sec = float(horizon_sec)
+        self.max_error_m = float(max_error_m)
+        self.step_sec = self._step_for_error(satellites.values(), self.max_error_m)
+
+        num_samples = int(np.ceil(self.horizon_sec / self.step_sec)) + 1
+        offsets = np.arange(num_samples) * self.step_sec
+
+        t = ts.utc(start_utc.year, start_utc.month, start_utc.day,
+                   start_utc.hour, start_utc.minute,
+                   start_utc.second + start_utc.microsecond / 1e6 + offsets)
+        t._nutation_angles_radians = iau2000b_radians(t)
+
+        # (卫星, 采样点, 3)
+        self.position_km = np.empty((len(self.names), num_samples, 3))
+        self.velocity_km_s = np.empty((len(self.names), num_samples, 3))
+        self.speed_km_s = np.empty((len(self.names), num_samples))
+
+        for i, sat in enumerate(satellites.values()):
+            geocentric = sat.at(t)
+            pos, vel = geocentric.frame_xyz_and_velocity(itrs)
+            self.position_km[i] = pos.km.T
+            self.velocity_km_s[i] = vel.km_per_s.T
+            # 与get_satellite_position一致：速度取惯性系速度大小
+            self.speed_km_s[i] = np.linalg.norm(geocentric.velocity.km_per_s, axis=0)
+
+    @staticmethod
+    def _step_for_error(satellites, max_error_m):
+        """根据误差上限计算所有卫星共用的采样步长（秒）"""
+        step = np.inf
+        for sat in satellites:
+            mean_motion = sat.model.no_kozai / 60.0  # rad/min -> rad/s
+            radius_km = (398600.4418 / mean_motion**2) ** (1 / 3)
+            omega = mean_motion + EARTH_ROTATION_RAD_S
+            h = (384 * (max_error_m / 1000) / (radius_km * omega**4)) ** 0.25
+            step = min(step, h)
+        # 留出余量覆盖偏心率和摄动
+        return float(min(step * 0.5, 600.0))
+
+    def covers(self, time_utc):
+        """检查时间是否在星历覆盖范围内"""
+        offset = (time_utc - self.start_utc).total_seconds()
+        return 0.0 <= offset <= self.horizon_sec
+
+    def interpolate(self, time_utc, indices=None):
+        """
+        插值计算卫星在指定时刻的地固系位置和速度大小
+
+        Args:
+            time_utc: UTC时间（须在覆盖范围内）
+            indices: 卫星索引（None表示全部）
+
+        Returns:
+            tuple: ((k, 3) 地固系位置km, (k,) 速度大小km/s)
+        """
+        offset = (time_utc - self.start_utc).total_seconds()
+        x = offset / self.step_sec
+        i = min(max(int(x), 0), self.position_km.shape[1] - 2)
+        s = x - i
+
+        if indices is None:
+            indices = slice(None)
+
+        p0 = self.position_km[indices, i]
+        p1 = self.position_km[indices, i + 1]
+        v0 = self.velocity_km_s[indices, i]
+        v1 = self.velocity_km_s[indices, i + 1]
+
+        # 三次Hermite基函数
+        s2 = s * s
+        s3 = s2 * s
+        h00 = 2 * s3 - 3 * s2 + 1
+        h10 = s3 - 2 * s2 + s
+        h01 = -2 * s3 + 3 * s2
+        h11 = s3 - s2
+        h = self.step_sec
+        position = h00 * p0 + h10 * h * v0 + h01 * p1 + h11 * h * v1
+
+        speed = (1 - s) * self.speed_km_s[indices, i] + s * self.speed_km_s[indices, i + 1]
+        return position, speed
+
+    def subpoints(self, time_utc, indices=None):
+        """
+        插值计算卫星星下点
+
+        Returns:
+            tuple: (纬度deg, 经度deg, 高度km, 速度km/s) 数组
+        """
+        position, speed = self.interpolate(time_utc, indices)
+        lat, lon, alt = ecef_to_geodetic(position)
+        return lat, lon, alt, speed
 
 
 class SAGINOrbitSimulator:
@@ -42,6 +211,9 @@ class SAGINOrbitSimulator:
         self.aircraft_state = {}
         self.init_aircraft_state()
 
+        # 卫星星历表（调用build_ephemeris后启用）
+        self.ephemeris = None
+
         print(f"[Simulator] 初始化完成:")
         print(f"  - 卫星: {len(self.satellites)} 颗")
         print(f"  - 飞机: {len(self.aircraft)} 架")
@@ -105,6 +277,30 @@ class SAGINOrbitSimulator:
                 'progress': 0.0  # 0.0 = 起点, 1.0 = 终点
             }
 
+    def build_ephemeris(self, start_utc=None, horizon_sec=86400, max_error_m=1.0):
+        """
+        预计算卫星星历表，之后的卫星位置查询改用插值
+
+        Args:
+            start_utc: 星历起始时间（None表示当前时间）
+            horizon_sec: 星历覆盖时长（秒）
+            max_error_m: 插值位置误差上限（米）
+
+        Returns:
+            EphemerisTable: 星历表
+        """
+        if start_utc is None:
+            start_utc = datetime.now(timezone.utc)
+
+        satellites = {name: data['object'] for name, data in self.satellites.items()}
+        self.ephemeris = EphemerisTable(self.ts, satellites, start_utc,
+                                        horizon_sec=horizon_sec, max_error_m=max_error_m)
+
+        print(f"[Simulator] 星历表已生成: {len(satellites)} 颗卫星, "
+              f"{self.ephemeris.position_km.shape[1]} 个采样点, "
+              f"步长 {self.ephemeris.step_sec:.1f} 秒, 误差上限 {max_error_m} m")
+        return self.ephemeris
+
     def get_satellite_position(self, sat_name, time_utc=None):
         """
         获取卫星位置
@@ -116,6 +312,12 @@ class SAGINOrbitSimulator:
         Returns:
             dict: 位置信息
         """
+        if self.ephemeris is not None:
+            if time_utc is None:
+                time_utc = datetime.now(timezone.utc)
+            if self.ephemeris.covers(time_utc):
+                return self._get_satellite_position_from_ephemeris(sat_name, time_utc)
+
         if time_utc is None:
             t = self.ts.now()
         else:
@@ -139,6 +341,21 @@ class SAGINOrbitSimulator:
             'timestamp': t.utc_iso()
         }
 
+    def _get_satellite_position_from_ephemeris(self, sat_name, time_utc):
+        """从星历表插值获取卫星位置"""
+        index = self.ephemeris.index[sat_name]
+        lat, lon, alt, speed = self.ephemeris.subpoints(time_utc, index)
+
+        return {
+            'node_name': sat_name,
+            'node_type': 'satellite',
+            'latitude': float(lat),
+            'longitude': float(lon),
+            'altitude_km': float(alt),
+            'velocity_km_s': float(speed),
+            'timestamp': _utc_iso(time_utc)
+        }
+
     def get_aircraft_position(self, aircraft_name, time_utc=None):
         """
         获取飞机位置（简化的大圆航线插值）
@@ -364,27 +581,36 @@ class SAGINOrbitSimulator:
         else:
             return 'unknown_link'
 
-    def get_network_topology(self, time_utc=None):
+    def get_node_positions(self, time_utc):
         """
-        获取完整网络拓扑
+        一次性获取所有节点位置（每个节点只计算一次）
 
         Args:
             time_utc: UTC时间
 
         Returns:
-            dict: 网络拓扑信息
+            dict: {节点名称: 位置信息}，顺序为卫星、飞机、地面站
         """
-        if time_utc is None:
-            t = self.ts.now()
-            time_utc = t.utc_datetime()
-        else:
-            t = self.ts.from_datetime(time_utc)
-
-        # 获取所有节点位置
         positions = {}
 
-        for sat_name in self.satellites:
-            positions[sat_name] = self.get_satellite_position(sat_name, time_utc)
+        if self.ephemeris is not None and self.ephemeris.covers(time_utc):
+            # 星历表一次插值得到所有卫星位置
+            lat, lon, alt, speed = self.ephemeris.subpoints(time_utc)
+            timestamp = _utc_iso(time_utc)
+            for sat_name in self.satellites:
+                i = self.ephemeris.index[sat_name]
+                positions[sat_name] = {
+                    'node_name': sat_name,
+                    'node_type': 'satellite',
+                    'latitude': float(lat[i]),
+                    'longitude': float(lon[i]),
+                    'altitude_km': float(alt[i]),
+                    'velocity_km_s': float(speed[i]),
+                    'timestamp': timestamp
+                }
+        else:
+            for sat_name in self.satellites:
+                positions[sat_name] = self.get_satellite_position(sat_name, time_utc)
 
         for aircraft_name in self.aircraft:
             positions[aircraft_name] = self.get_aircraft_position(aircraft_name, time_utc)
@@ -392,25 +618,195 @@ class SAGINOrbitSimulator:
         for gs_name in self.ground_stations:
             positions[gs_name] = self.get_ground_station_position(gs_name)
 
-        # 计算所有可能的链路
+        return positions
+
+    def compute_link_matrices(self, positions):
+        """
+        向量化计算所有节点对的链路参数（与check_visibility的计算方式一致）
+
+        Args:
+            positions: {节点名称: 位置信息}
+
+        Returns:
+            dict: N×N 对称矩阵
+                distance_km, delay_ms, elevation_deg (不涉及地面站的链路为NaN),
+                visible (bool), link_type (链路类型名称的对象数组)
+        """
+        node_types = [pos['node_type'] for pos in positions.values()]
+        lat = np.radians([pos['latitude'] for pos in positions.values()])
+        lon = np.radians([pos['longitude'] for pos in positions.values()])
+        alt = np.array([pos['altitude_km'] for pos in positions.values()], dtype=float)
+
+        # Haversine公式（地球半径6371km）
+        R = 6371
+        dlat = lat[None, :] - lat[:, None]
+        dlon = lon[None, :] - lon[:, None]
+        a = np.sin(dlat/2)**2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon/2)**2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+        horizontal_distance = R * c
+
+        # 考虑高度差
+        alt_diff = alt[None, :] - alt[:, None]
+        distance_km = np.sqrt(horizontal_distance**2 + alt_diff**2)
+
+        # 链路类型与约束
+        type_names = sorted(set(node_types))
+        type_codes = np.array([type_names.index(t) for t in node_types])
+        link_type_table = np.empty((len(type_names), len(type_names)), dtype=object)
+        max_distance_table = np.empty(link_type_table.shape)
+        min_elevation_table = np.empty(link_type_table.shape)
+        for i, type1 in enumerate(type_names):
+            for j, type2 in enumerate(type_names):
+                link_type = self.get_link_type(type1, type2)
+                constraints = self.link_constraints.get(link_type, {})
+                link_type_table[i, j] = link_type
+                max_distance_table[i, j] = constraints.get('max_distance_km', 10000)
+                min_elevation_table[i, j] = constraints.get('min_elevation_deg', 10)
+
+        link_type = link_type_table[type_codes[:, None], type_codes[None, :]]
+        max_distance = max_distance_table[type_codes[:, None], type_codes[None, :]]
+        min_elevation = min_elevation_table[type_codes[:, None], type_codes[None, :]]
+
+        # 仰角（涉及地面站的链路）：以行节点为node1，若node1为地面站则取node2的高度，否则取node1的高度
+        is_gs = np.array([t == 'ground_station' for t in node_types])
+        involves_gs = is_gs[:, None] | is_gs[None, :]
+        other_alt = np.where(is_gs[:, None], alt[None, :], alt[:, None])
+        elevation_deg = np.where(involves_gs, np.degrees(np.arctan2(other_alt, distance_km)), np.nan)
+
+        # 以上三角(node1在前)为准镜像成对称矩阵
+        upper = np.triu(np.ones(distance_km.shape, dtype=bool), k=1)
+        elevation_deg = np.where(upper, elevation_deg, elevation_deg.T)
+
+        distance_ok = distance_km <= max_distance
+        elevation_ok = ~involves_gs | (elevation_deg >= min_elevation)
+        visible = distance_ok & elevation_ok
+        np.fill_diagonal(visible, False)
+
+        # 计算传播延迟（光速）
+        propagation_speed = self.network_params.get('propagation_speed_km_s', 300000)
+        delay_ms = (distance_km / propagation_speed) * 1000
+
+        return {
+            'distance_km': distance_km,
+            'delay_ms': delay_ms,
+            'elevation_deg': elevation_deg,
+            'visible': visible,
+            'link_type': link_type
+        }
+
+    def get_network_topology(self, time_utc=None, include_links=True):
+        """
+        获取完整网络拓扑
+
+        Args:
+            time_utc: UTC时间
+            include_links: 是否生成逐链路的字典视图（大规模星座只需矩阵时可关闭）
+
+        Returns:
+            dict: 网络拓扑信息
+                node_names: 节点顺序（矩阵的行/列顺序）
+                link_matrices: compute_link_matrices的结果
+                link_index: 结构化链路数组（上三角顺序，与links一致）
+                    src_index/dst_index: node_names中的索引
+                    visible/delay_ms/distance_km: 对应链路参数
+                links: {"node1-node2": 可见性信息}，与check_visibility格式一致
+        """
+        if time_utc is None:
+            time_utc = datetime.now(timezone.utc)
+        timestamp = _utc_iso(time_utc)
+
+        # 获取所有节点位置（每个节点只计算一次）
+        positions = self.get_node_positions(time_utc)
         all_nodes = list(positions.keys())
-        links = {}
 
-        for i, node1 in enumerate(all_nodes):
-            for node2 in all_nodes[i+1:]:
-                link_name = f"{node1}-{node2}"
-                vis = self.check_visibility(node1, node2, time_utc)
-                links[link_name] = vis
+        # 向量化计算所有节点对
+        matrices = self.compute_link_matrices(positions)
+        rows, cols = np.triu_indices(len(all_nodes), k=1)
+        visible_link_count = int(np.count_nonzero(matrices['visible'][rows, cols]))
+
+        links = {}
+        if include_links:
+            distance = matrices['distance_km'][rows, cols].tolist()
+            delay = matrices['delay_ms'][rows, cols].tolist()
+            elevation = matrices['elevation_deg'][rows, cols].tolist()
+            visible = matrices['visible'][rows, cols].tolist()
+            link_type = matrices['link_type'][rows, cols].tolist()
+
+            for k, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+                node1 = all_nodes[i]
+                node2 = all_nodes[j]
+                links[f"{node1}-{node2}"] = {
+                    'node1': node1,
+                    'node2': node2,
+                    'visible': visible[k],
+                    'distance_km': distance[k],
+                    'delay_ms': delay[k],
+                    'elevation_deg': None if np.isnan(elevation[k]) else elevation[k],
+                    'link_type': link_type[k],
+                    'timestamp': timestamp
+                }
+
+        link_index = {
+            'src_index': rows,
+            'dst_index': cols,
+            'visible': matrices['visible'][rows, cols],
+            'delay_ms': matrices['delay_ms'][rows, cols],
+            'distance_km': matrices['distance_km'][rows, cols]
+        }
 
         return {
-            'timestamp': t.utc_iso(),
+            'timestamp': timestamp,
             'positions': positions,
             'links': links,
+            'node_names': all_nodes,
+            'link_matrices': matrices,
+            'link_index': link_index,
             'node_count': len(positions),
-            'visible_link_count': sum(1 for link in links.values() if link['visible'])
+            'visible_link_count': visible_link_count
         }
 
-    def run_realtime_simulation(self, update_callback, interval_sec=10, duration_min=None):
+    def iter_topology_replay(self, start_utc, end_utc, step_sec=10, speedup=None,
+                             include_links=True, max_error_m=1.0):
+        """
+        仿真时钟回放：在[start_utc, end_utc]上按虚拟时间步进，逐步生成拓扑快照
+
+        Args:
+            start_utc: 回放起始时间
+            end_utc: 回放结束时间
+            step_sec: 虚拟时间步长（秒）
+            speedup: 加速倍数（None表示尽可能快）
+            include_links: 快照是否包含逐链路字典视图
+            max_error_m: 星历插值误差上限（米）
+
+        Yields:
+            dict: 网络拓扑（同get_network_topology）
+        """
+        horizon_sec = (end_utc - start_utc).total_seconds()
+        num_steps = int(horizon_sec // step_sec) + 1
+
+        # 预先批量生成整个回放区间的星历（已有星历未覆盖区间或误差上限不满足时重建）
+        if (self.ephemeris is None or not self.ephemeris.covers(start_utc)
+                or not self.ephemeris.covers(end_utc)
+                or self.ephemeris.max_error_m > max_error_m):
+            self.build_ephemeris(start_utc, horizon_sec=horizon_sec, max_error_m=max_error_m)
+
+        # 飞机从回放起点重新开始，保证回放结果可复现
+        self.init_aircraft_state()
+
+        step_times = [start_utc + timedelta(seconds=i * step_sec) for i in range(num_steps)]
+        wall_start = time.monotonic()
+
+        for i, time_utc in enumerate(step_times):
+            if speedup is not None:
+                # 按加速倍数对齐墙钟时间
+                wait = (i * step_sec) / speedup - (time.monotonic() - wall_start)
+                if wait > 0:
+                    time.sleep(wait)
+
+            yield self.get_network_topology(time_utc, include_links=include_links)
+
+    def run_realtime_simulation(self, update_callback, interval_sec=10, duration_min=None,
+                                start_utc=None, speedup=None):
         """
         实时仿真模式
 
@@ -418,7 +814,16 @@ class SAGINOrbitSimulator:
             update_callback: 回调函数，接收网络拓扑更新
             interval_sec: 更新间隔（秒）
             duration_min: 仿真时长（分钟，None表示无限）
+            start_utc: 仿真时钟起始时间（None表示按墙钟实时运行；
+                       指定时按虚拟时间回放，须同时指定duration_min）
+            speedup: 回放加速倍数（None表示尽可能快，仅在指定start_utc时有效）
         """
+        if start_utc is not None:
+            if duration_min is None:
+                raise ValueError("回放模式需要指定duration_min")
+            return self._run_replay_simulation(update_callback, interval_sec, duration_min,
+                                               start_utc, speedup)
+
         print(f"[Simulator] 启动实时仿真")
         print(f"  - 更新间隔: {interval_sec} 秒")
         print(f"  - 仿真时长: {duration_min if duration_min else '无限'} 分钟")
@@ -455,6 +860,28 @@ class SAGINOrbitSimulator:
 
         print(f"[Simulator] 仿真结束，总迭代: {iteration} 次")
 
+    def _run_replay_simulation(self, update_callback, interval_sec, duration_min, start_utc, speedup):
+        """仿真时钟回放模式"""
+        end_utc = start_utc + timedelta(minutes=duration_min)
+
+        print(f"[Simulator] 启动回放仿真")
+        print(f"  - 时间范围: {start_utc} 到 {end_utc}")
+        print(f"  - 虚拟步长: {interval_sec} 秒")
+        print(f"  - 加速倍数: {speedup if speedup else '尽可能快'}")
+
+        wall_start = time.time()
+        iteration = 0
+
+        try:
+            for topology in self.iter_topology_replay(start_utc, end_utc, interval_sec, speedup):
+                iteration += 1
+                update_callback(topology)
+        except KeyboardInterrupt:
+            print(f"\n[Simulator] 用户中断仿真")
+
+        elapsed = time.time() - wall_start
+        print(f"[Simulator] 回放结束，总迭代: {iteration} 次，耗时 {elapsed:.2f} 秒")
+
 
 def print_topology_summary(topology):
     """打印拓扑摘要（示例回调函数）"""
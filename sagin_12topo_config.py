@@ -6,6 +6,7 @@ SAGIN 12拓扑TC配置生成器
 
 import json
 import math
+import argparse
 
 # 速率计算结果 (从test_*_noma.py获取)
 SAGIN_RATES = {
@@ -28,6 +29,34 @@ SAGIN_RATES = {
     "d2d_noma_strong": {"rate_mbps": 29.51, "sinr_db": 44.41, "distance_m": 30},
 }
 
+def load_optimized_rates(path):
+    """
+    用 scripts/noma_optimizer.py 输出的优化速率覆盖 SAGIN_RATES 中的对应条目
+    distance_m 始终保留拓扑定义的值（TC 延迟由它计算）；自由配对的假设分析结果不予采用
+
+    Args:
+        path: SAGIN_RATES 格式的 JSON 文件（如 {"sat_noma_weak": {...}}）
+
+    Returns:
+        list: 被覆盖的条目名
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        optimized = json.load(f)
+
+    updated = []
+    for key, params in optimized.items():
+        if key not in SAGIN_RATES:
+            print(f"⚠️  忽略未知速率条目: {key}")
+            continue
+        if params.get("pairing", "fixed") != "fixed":
+            print(f"⚠️  忽略自由配对条目: {key} (配对用户与拓扑节点不一致)")
+            continue
+        params = {k: v for k, v in params.items() if k != "distance_m"}
+        # 原地更新，使 TOPOLOGIES 中引用同一字典的 params 一并生效
+        SAGIN_RATES[key].update(params)
+        updated.append(key)
+    return updated
+
 def calculate_delay_ms(distance_m):
     """根据距离计算传播延迟 (ms)"""
     speed_of_light = 3e8  # m/s
@@ -263,8 +292,19 @@ def print_summary(configs):
     print("="*80)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SAGIN 12拓扑TC配置生成器")
+    parser.add_argument("--rates", type=str, default=None,
+                        help="优化后的速率文件 (scripts/noma_optimizer.py 输出)")
+    parser.add_argument("--output", type=str, default="sagin_12topo_tc_configs.json",
+                        help="TC配置输出文件")
+    args = parser.parse_args()
+
     print("生成SAGIN 12拓扑TC配置...\n")
 
+    if args.rates:
+        updated = load_optimized_rates(args.rates)
+        print(f"使用优化速率: {args.rates} ({len(updated)} 项: {', '.join(updated)})\n")
+
     # 生成所有配置
     configs = generate_all_configs()
 
@@ -272,6 +312,6 @@ if __name__ == "__main__":
     print_summary(configs)
 
     # 保存到文件
-    save_configs(configs)
+    save_configs(configs, args.output)
 
     print(f"\n下一步: 使用deploy_sagin_tc.py部署配置到所有节点")
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+覆盖/速率热力图生成工具
+将 60km×60km 区域栅格化（默认 1000×1000），对每个像素、每个卫星位置计算
+仰角、波束增益、OMA/NOMA SINR 与速率，结果写入内存映射的 .npy 数组
+
+按行分块计算以限制内存，分块在多进程间并行，每个进程直接写入映射文件的对应切片。
+
+输出 (out_dir/):
+    elevation_deg.npy   (S, H, W) float32  像素处卫星仰角
+    gain_db.npy         (S, H, W) float32  有效信道增益（含路损与波束方向图）
+    sinr_oma_db.npy / rate_oma_mbps.npy    OMA
+    sinr_noma_db.npy / rate_noma_mbps.npy  NOMA（像素用户与固定伙伴用户配对，按增益决定强/弱）
+    meta.json                              网格范围、卫星位置与链路参数
+
+用法:
+    python3 coverage_heatmap.py                              # 默认卫星位置，1000×1000
+    python3 coverage_heatmap.py --grid 2000 --workers 8 --plot
+    python3 coverage_heatmap.py --sat-pos 0,0,800000 --sat-pos=-118056,14085,813292
+    python3 coverage_heatmap.py --orbit-steps 10 --orbit-step-seconds 60   # 最佳过顶窗口内采样
+    python3 -c "import numpy as np; m = np.load('coverage/rate_oma_mbps.npy', mmap_mode='r'); print(m.shape)"
+"""
+
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from unified_rate_calc import sat_effective_gain_batch, oma_from_gain, noma_from_gains
+
+# ==================== 配置参数 ====================
+SCRIPT_DIR = Path(__file__).parent.absolute()
+OUTPUT_DIR = SCRIPT_DIR / "coverage"
+
+REGION_WIDTH_M = 60000.0
+REGION_HEIGHT_M = 60000.0
+DEFAULT_GRID = 1000
+DEFAULT_CHUNK_PIXELS = 1 << 18      # 每块约 26 万像素，单块峰值内存约几十 MB
+
+# 与 calculate_all_scenarios 中的卫星场景一致
+DEFAULT_SAT_POS = (-118056.04, 14085.41, 813291.98)
+DEFAULT_P_SAT = 20.0
+DEFAULT_B_SAT = 20e6
+DEFAULT_ALPHA = 0.7
+DEFAULT_NOMA_PARTNER = (0.0, 5000.0, 0.0)   # user_center
+
+LAYERS = ('elevation_deg', 'gain_db', 'sinr_oma_db', 'rate_oma_mbps',
+          'sinr_noma_db', 'rate_noma_mbps')
+
+
+def grid_axes(width, height, res_x, res_y):
+    """
+    像素中心坐标（米），区域以原点（波束中心）为中心
+
+    Returns:
+        (xs, ys): 长度 res_x / res_y 的一维数组
+    """
+    xs = (np.arange(res_x) + 0.5) * (width / res_x) - width / 2
+    ys = (np.arange(res_y) + 0.5) * (height / res_y) - height / 2
+    return xs, ys
+
+
+def compute_block(sat_pos, xs, ys, P_tx_W, B_Hz, alpha_power, partner_pos):
+    """
+    计算一块像素（ys × xs）的全部图层
+
+    Returns:
+        dict: 图层名 -> (len(ys), len(xs)) float32 数组
+    """
+    sat_pos = np.asarray(sat_pos, dtype=float)
+    X, Y = np.meshgrid(xs, ys)
+    users = np.stack((X, Y, np.zeros_like(X)), axis=-1)
+
+    horizontal = np.hypot(sat_pos[0] - X, sat_pos[1] - Y)
+    elevation = np.degrees(np.arctan2(sat_pos[2], horizontal))
+
+    gain = sat_effective_gain_batch(sat_pos, users)
+    _, sinr_oma = oma_from_gain(gain, P_tx_W, B_Hz)
+
+    # NOMA：像素用户与伙伴用户配对，增益较小者为弱用户
+    partner_gain = sat_effective_gain_batch(sat_pos, np.asarray(partner_pos, dtype=float))
+    pixel_is_weak = gain <= partner_gain
+    _, (sinr_weak, sinr_strong) = noma_from_gains(
+        np.minimum(gain, partner_gain), np.maximum(gain, partner_gain),
+        P_tx_W, B_Hz, alpha_power)
+    sinr_noma = np.where(pixel_is_weak, sinr_weak, sinr_strong)
+
+    with np.errstate(divide='ignore'):
+        layers = {
+            'elevation_deg': elevation,
+            'gain_db': 10 * np.log10(gain),
+            'sinr_oma_db': 10 * np.log10(sinr_oma),
+            'rate_oma_mbps': B_Hz * np.log2(1 + sinr_oma) / 1e6,
+            'sinr_noma_db': 10 * np.log10(sinr_noma),
+            'rate_noma_mbps': B_Hz * np.log2(1 + sinr_noma) / 1e6,
+        }
+    return {name: value.astype(np.float32) for name, value in layers.items()}
+
+
+def _run_block(task):
+    """工作进程：计算一个 (卫星位置, 行区间) 块并写入内存映射文件"""
+    out_dir, sat_index, sat_pos, row_start, row_end, params = task
+    xs, ys = grid_axes(params['width'], params['height'], params['res_x'], params['res_y'])
+    layers = compute_block(sat_pos, xs, ys[row_start:row_end], params['P_tx_W'],
+                           params['B_Hz'], params['alpha_power'], params['partner_pos'])
+    for name, block in layers.items():
+        mm = np.load(Path(out_dir) / f"{name}.npy", mmap_mode='r+')
+        mm[sat_index, row_start:row_end] = block
+        mm.flush()
+        del mm
+    return sat_index, row_end - row_start
+
+
+def generate_heatmaps(out_dir, sat_positions, res_x=DEFAULT_GRID, res_y=DEFAULT_GRID,
+                      width=REGION_WIDTH_M, height=REGION_HEIGHT_M,
+                      P_tx_W=DEFAULT_P_SAT, B_Hz=DEFAULT_B_SAT, alpha_power=DEFAULT_ALPHA,
+                      partner_pos=DEFAULT_NOMA_PARTNER, chunk_pixels=DEFAULT_CHUNK_PIXELS,
+                      workers=None):
+    """
+    生成全部图层的内存映射数组
+
+    Args:
+        out_dir: 输出目录
+        sat_positions: 卫星 ENU 位置列表（米），每个位置对应输出的第 0 维
+        res_x / res_y: 东/北方向像素数
+        chunk_pixels: 每块最多像素数（按整行切分）
+        workers: 并行进程数（None 为 CPU 核数，1 为在本进程内串行）
+
+    Returns:
+        dict: meta 信息（同时写入 meta.json）
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sat_positions = [tuple(float(v) for v in pos) for pos in sat_positions]
+    shape = (len(sat_positions), res_y, res_x)
+
+    for name in LAYERS:
+        mm = np.lib.format.open_memmap(out_dir / f"{name}.npy", mode='w+',
+                                       dtype=np.float32, shape=shape)
+        del mm
+
+    params = {
+        'width': width, 'height': height, 'res_x': res_x, 'res_y': res_y,
+        'P_tx_W': P_tx_W, 'B_Hz': B_Hz, 'alpha_power': alpha_power,
+        'partner_pos': tuple(float(v) for v in partner_pos),
+    }
+    rows_per_chunk = max(1, chunk_pixels // res_x)
+    tasks = [(str(out_dir), s, pos, r, min(r + rows_per_chunk, res_y), params)
+             for s, pos in enumerate(sat_positions)
+             for r in range(0, res_y, rows_per_chunk)]
+
+    if workers == 1:
+        for task in tasks:
+            _run_block(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(_run_block, tasks):
+                pass
+
+    meta = {
+        'shape': list(shape),
+        'layers': list(LAYERS),
+        'x_range_m': [-width / 2, width / 2],
+        'y_range_m': [-height / 2, height / 2],
+        'sat_positions_m': [list(pos) for pos in sat_positions],
+        'P_tx_W': P_tx_W,
+        'B_Hz': B_Hz,
+        'alpha_power': alpha_power,
+        'noma_partner_m': list(params['partner_pos']),
+        'chunks': len(tasks),
+        'generated': datetime.now().isoformat(),
+    }
+    with open(out_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    return meta
+
+
+def load_heatmaps(out_dir=OUTPUT_DIR):
+    """以只读内存映射方式加载全部图层，返回 (layers, meta)"""
+    out_dir = Path(out_dir)
+    with open(out_dir / 'meta.json', 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    layers = {name: np.load(out_dir / f"{name}.npy", mmap_mode='r') for name in meta['layers']}
+    return layers, meta
+
+
+def orbit_sat_positions(num_steps, step_seconds):
+    """在最佳过顶窗口的最高点附近按时间采样卫星 ENU 位置（需要 skyfield）"""
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sagin-experiments'))
+    from satellite_orbit import SatelliteOrbit
+
+    orbit = SatelliteOrbit(lazy=True)
+    center = orbit.best_window['max_elevation_time']
+    start = center - timedelta(seconds=step_seconds * (num_steps // 2))
+    return orbit.get_satellite_positions_for_env(start, num_steps, step_seconds)
+
+
+def plot_heatmaps(out_dir, layer='rate_oma_mbps'):
+    """每个卫星位置输出一张 PNG（大网格由 matplotlib 自行降采样显示）"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    layers, meta = load_heatmaps(out_dir)
+    data = layers[layer]
+    extent = [v / 1000 for v in meta['x_range_m'] + meta['y_range_m']]
+    paths = []
+    for s in range(data.shape[0]):
+        fig, ax = plt.subplots(figsize=(7, 6))
+        im = ax.imshow(data[s], origin='lower', extent=extent, cmap='viridis')
+        fig.colorbar(im, ax=ax, label=layer)
+        ax.set_xlabel('East (km)')
+        ax.set_ylabel('North (km)')
+        ax.set_title(f"{layer} @ sat {s}")
+        path = Path(out_dir) / f"{layer}_sat{s}.png"
+        fig.savefig(path, dpi=150, bbox_inches='tight')
+        plt.close(fig)
+        paths.append(path)
+    return paths
+
+
+def _parse_vec3(text):
+    values = [float(v) for v in text.split(',')]
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError(f"需要 x,y,z 三个分量: {text}")
+    return tuple(values)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='生成区域覆盖/速率热力图（内存映射数组）')
+    parser.add_argument('--out', type=str, default=str(OUTPUT_DIR),
+                        help='输出目录')
+    parser.add_argument('--grid', type=int, default=DEFAULT_GRID,
+                        help='每边像素数 (默认: 1000)')
+    parser.add_argument('--sat-pos', type=_parse_vec3, action='append', default=None,
+                        help='卫星ENU位置 x,y,z (米)，可重复；负分量写成 --sat-pos=-1,2,3')
+    parser.add_argument('--orbit-steps', type=int, default=0,
+                        help='从轨道最佳过顶窗口采样的卫星位置数 (覆盖 --sat-pos)')
+    parser.add_argument('--orbit-step-seconds', type=float, default=60.0,
+                        help='轨道采样步长 (秒)')
+    parser.add_argument('--power', type=float, default=DEFAULT_P_SAT,
+                        help='卫星发射功率 (W)')
+    parser.add_argument('--bandwidth', type=float, default=DEFAULT_B_SAT,
+                        help='带宽 (Hz)')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                        help='NOMA 弱用户功率分配系数')
+    parser.add_argument('--noma-partner', type=_parse_vec3, default=DEFAULT_NOMA_PARTNER,
+                        help='NOMA 伙伴用户位置 x,y,z (米)')
+    parser.add_argument('--chunk-pixels', type=int, default=DEFAULT_CHUNK_PIXELS,
+                        help='每块最多像素数（控制单进程内存）')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行进程数 (默认: CPU核数)')
+    parser.add_argument('--plot', action='store_true',
+                        help='为每个卫星位置输出 OMA 速率 PNG')
+
+    args = parser.parse_args()
+
+    if args.orbit_steps > 0:
+        sat_positions = orbit_sat_positions(args.orbit_steps, args.orbit_step_seconds)
+    else:
+        sat_positions = args.sat_pos or [DEFAULT_SAT_POS]
+
+    start = datetime.now()
+    meta = generate_heatmaps(args.out, sat_positions, res_x=args.grid, res_y=args.grid,
+                             P_tx_W=args.power, B_Hz=args.bandwidth, alpha_power=args.alpha,
+                             partner_pos=args.noma_partner, chunk_pixels=args.chunk_pixels,
+                             workers=args.workers)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    layers, _ = load_heatmaps(args.out)
+    print(f"📂 热力图: {args.out}  形状 {tuple(meta['shape'])}, {meta['chunks']} 块")
+    for s, pos in enumerate(meta['sat_positions_m']):
+        rate = layers['rate_oma_mbps'][s]
+        elev = layers['elevation_deg'][s]
+        print(f"   卫星 {s} ({pos[0]:.0f}, {pos[1]:.0f}, {pos[2]:.0f}) m: "
+              f"仰角 {elev.min():.1f}°~{elev.max():.1f}°, "
+              f"OMA速率 {rate.min():.2f}~{rate.max():.2f} Mbps (中位 {np.median(rate):.2f})")
+
+    if args.plot:
+        for path in plot_heatmaps(args.out):
+            print(f"   🖼  {path}")
+
+    print(f"✅ 完成，耗时 {elapsed:.2f}秒")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+NOMA 功率分配优化工具
+为卫星/无人机/D2D 三类链路搜索 (功率分配系数 alpha, 发射功率 P)，
+替代 calculate_all_scenarios 中固定的 alpha_power=0.7
+
+流程:
+    1. 确定配对：默认固定为拓扑实际的弱/强节点（前两个候选用户）；
+       --pairing free 时对候选用户两两配对（假设分析），按信道增益确定弱/强用户
+    2. (配对 × alpha × P) 网格一次向量化评估，选出最优格点
+    3. 在最优格点的相邻区间内对 alpha、P 交替做有界标量搜索（scipy minimize_scalar）
+    4. 各 (链路, 目标) 任务在进程池中并行，结果按输入哈希缓存到磁盘
+
+优化目标:
+    sum_rate           两用户速率之和
+    max_min            较小用户速率（公平性）
+    energy_efficiency  和速率 / 发射功率 (Mbps/W)
+所有目标都要求两用户速率不低于 --min-rate。
+
+输出的 noma_optimized_rates.json 与 sagin_12topo_config.SAGIN_RATES 同格式（不含 distance_m，
+几何位置以拓扑定义为准），可通过 `python3 sagin_12topo_config.py --rates scripts/noma_optimized_rates.json`
+生成TC配置。自由配对的结果写入单独的 noma_free_pairing_rates.json，仅供对比，不能用于TC配置。
+
+用法:
+    python3 noma_optimizer.py                          # 三类链路，max_min
+    python3 noma_optimizer.py --objective sum_rate --objective max_min --min-rate 2
+    python3 noma_optimizer.py --links uav d2d --workers 4 --no-cache
+    python3 noma_optimizer.py --pairing free           # 自由配对假设分析
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+from scipy.optimize import minimize_scalar
+
+from unified_rate_calc import (noma_from_gains, sat_effective_gain_batch,
+                               uav_to_user_gain_batch, d2d_channel_gain_batch)
+
+# ==================== 配置参数 ====================
+SCRIPT_DIR = Path(__file__).parent.absolute()
+OUTPUT_FILE = SCRIPT_DIR / "noma_optimized_rates.json"
+FREE_PAIRING_OUTPUT_FILE = SCRIPT_DIR / "noma_free_pairing_rates.json"
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'sagin_noma'
+
+# 模型或搜索流程变化时递增，使旧缓存失效
+OPTIMIZER_VERSION = 2
+
+OBJECTIVES = ('sum_rate', 'max_min', 'energy_efficiency')
+PAIRINGS = ('fixed', 'free')    # fixed: 拓扑实际的弱/强节点; free: 候选用户两两配对
+ALPHA_RANGE = (0.5, 0.99)       # alpha >= 0.5 保证弱用户功率占优，SIC 顺序成立
+DEFAULT_ALPHA_STEPS = 50
+DEFAULT_POWER_STEPS = 32
+DEFAULT_MIN_RATE_MBPS = 1.0
+REFINE_ROUNDS = 2
+
+# 发射端位置、功率范围与候选用户；前两个候选用户即 calculate_all_scenarios 中的固定配对
+SCENARIOS = {
+    'sat': {
+        'tx_pos': (-118056.04, 14085.41, 813291.98),
+        'P_range_W': (5.0, 20.0),
+        'B_Hz': 20e6,
+        'users': {
+            'center': (0.0, 5000.0, 0.0),
+            'edge': (0.0, 15000.0, 0.0),
+            'beam_center': (0.0, 0.0, 0.0),
+            'east_10km': (10000.0, 0.0, 0.0),
+            'south_20km': (0.0, -20000.0, 0.0),
+        },
+    },
+    'uav': {
+        'tx_pos': (0.0, 0.0, 1000.0),
+        'P_range_W': (0.5, 3.16),
+        'B_Hz': 2e6,
+        'users': {
+            'near': (0.0, 0.0, 0.0),
+            'far': (2500.0, 500.0, 0.0),
+            'mid_1km': (1000.0, 0.0, 0.0),
+            'north_1.5km': (500.0, 1500.0, 0.0),
+            'far_4km': (4000.0, 0.0, 0.0),
+        },
+    },
+    'd2d': {
+        'tx_pos': (0.0, 0.0, 0.0),
+        'P_range_W': (0.05, 0.2),
+        'B_Hz': 2e6,
+        'users': {
+            'strong': (30.0, 0.0, 0.0),
+            'weak': (100.0, 0.0, 0.0),
+            'mid_50m': (50.0, 0.0, 0.0),
+            'diag_80m': (70.0, 40.0, 0.0),
+            'far_150m': (150.0, 0.0, 0.0),
+        },
+    },
+}
+
+
+def link_gains(link_type, tx_pos, user_pos):
+    """按链路类型计算发射端到各用户的信道增益（向量化）"""
+    if link_type == 'sat':
+        return sat_effective_gain_batch(tx_pos, user_pos)
+    if link_type == 'uav':
+        return uav_to_user_gain_batch(tx_pos, user_pos)
+    if link_type == 'd2d':
+        return d2d_channel_gain_batch(tx_pos, user_pos)
+    raise ValueError(f"未知链路类型: {link_type}")
+
+
+def objective_value(rate_weak, rate_strong, P_tx_W, objective):
+    """目标函数值（越大越好，参数可广播）"""
+    if objective == 'sum_rate':
+        return rate_weak + rate_strong
+    if objective == 'max_min':
+        return np.minimum(rate_weak, rate_strong)
+    if objective == 'energy_efficiency':
+        return (rate_weak + rate_strong) / P_tx_W
+    raise ValueError(f"未知优化目标: {objective}")
+
+
+def score_grid(gain_weak, gain_strong, alphas, powers, B_Hz, objective, min_rate_mbps):
+    """
+    向量化评估 (配对 × alpha × P) 网格
+
+    Args:
+        gain_weak / gain_strong: (n_pairs,) 弱/强用户增益
+        alphas / powers: 一维网格
+
+    Returns:
+        (n_pairs, len(alphas), len(powers)) 目标值，不满足最低速率的格点为 -inf
+    """
+    gw = np.asarray(gain_weak)[:, None, None]
+    gs = np.asarray(gain_strong)[:, None, None]
+    (rate_w, rate_s), _ = noma_from_gains(gw, gs, powers[None, None, :], B_Hz,
+                                          alphas[None, :, None])
+    score = objective_value(rate_w, rate_s, powers[None, None, :], objective)
+    feasible = (rate_w >= min_rate_mbps) & (rate_s >= min_rate_mbps)
+    return np.where(feasible, score, -np.inf)
+
+
+def _point_score(gain_weak, gain_strong, alpha, P_tx_W, B_Hz, objective, min_rate_mbps):
+    """单点目标值（供标量搜索使用）"""
+    (rate_w, rate_s), _ = noma_from_gains(gain_weak, gain_strong, P_tx_W, B_Hz, alpha)
+    if rate_w < min_rate_mbps or rate_s < min_rate_mbps:
+        return -np.inf
+    return float(objective_value(rate_w, rate_s, P_tx_W, objective))
+
+
+def _refine_axis(f, grid, index, current):
+    """在 grid[index] 两侧相邻格点区间内做有界标量搜索，未改进时保留当前值"""
+    lo = grid[max(index - 1, 0)]
+    hi = grid[min(index + 1, len(grid) - 1)]
+    if hi <= lo:
+        return current
+
+    def loss(x):
+        value = f(x)
+        return -value if np.isfinite(value) else 1e30
+
+    res = minimize_scalar(loss, bounds=(lo, hi), method='bounded', options={'xatol': 1e-6})
+    return float(res.x) if res.success and f(res.x) > f(current) else current
+
+
+def optimize_link(link_type, scenario, objective, min_rate_mbps=DEFAULT_MIN_RATE_MBPS,
+                  alpha_steps=DEFAULT_ALPHA_STEPS, power_steps=DEFAULT_POWER_STEPS, pairing='fixed'):
+    """
+    对一类链路求解最优 (alpha, P)；pairing='free' 时同时搜索用户配对
+
+    Returns:
+        dict: 最优解与对应速率/SINR；无可行解时 feasible=False
+    """
+    tx_pos = np.asarray(scenario['tx_pos'], dtype=float)
+    names = list(scenario['users'])
+    users = np.asarray([scenario['users'][n] for n in names], dtype=float)
+    gains = link_gains(link_type, tx_pos, users)
+    B_Hz = scenario['B_Hz']
+
+    # 固定配对只用前两个候选用户（拓扑实际节点），自由配对用所有两两组合；
+    # 增益小者为弱用户（增益相同的配对无法做 SIC，跳过）
+    candidates = [(0, 1)] if pairing == 'fixed' else combinations(range(len(names)), 2)
+    pairs = [(i, j) if gains[i] < gains[j] else (j, i)
+             for i, j in candidates if gains[i] != gains[j]]
+    weak_idx = np.array([p[0] for p in pairs])
+    strong_idx = np.array([p[1] for p in pairs])
+
+    alphas = np.linspace(*ALPHA_RANGE, alpha_steps)
+    powers = np.linspace(*scenario['P_range_W'], power_steps)
+    scores = score_grid(gains[weak_idx], gains[strong_idx], alphas, powers, B_Hz,
+                        objective, min_rate_mbps)
+
+    base = {'link_type': link_type, 'objective': objective, 'pairing': pairing,
+            'min_rate_mbps': min_rate_mbps, 'grid_points': int(scores.size)}
+    if not np.isfinite(scores).any():
+        return {**base, 'feasible': False}
+
+    k, ia, ip = np.unravel_index(np.argmax(scores), scores.shape)
+    gw, gs = gains[weak_idx[k]], gains[strong_idx[k]]
+    alpha, power = float(alphas[ia]), float(powers[ip])
+    grid_best = float(scores[k, ia, ip])
+
+    # 网格最优点附近交替细化 alpha 和 P
+    for _ in range(REFINE_ROUNDS):
+        alpha = _refine_axis(lambda a: _point_score(gw, gs, a, power, B_Hz, objective, min_rate_mbps),
+                             alphas, ia, alpha)
+        power = _refine_axis(lambda p: _point_score(gw, gs, alpha, p, B_Hz, objective, min_rate_mbps),
+                             powers, ip, power)
+
+    (rate_w, rate_s), (sinr_w, sinr_s) = noma_from_gains(gw, gs, power, B_Hz, alpha)
+    weak_name, strong_name = names[weak_idx[k]], names[strong_idx[k]]
+    return {
+        **base,
+        'feasible': True,
+        'weak_user': weak_name,
+        'strong_user': strong_name,
+        'alpha_power': alpha,
+        'P_tx_W': power,
+        'B_Hz': B_Hz,
+        'objective_value': _point_score(gw, gs, alpha, power, B_Hz, objective, min_rate_mbps),
+        'grid_objective_value': grid_best,
+        'weak': {
+            'rate_mbps': float(rate_w),
+            'sinr_db': float(10 * np.log10(sinr_w)),
+            'distance_m': float(np.linalg.norm(users[weak_idx[k]] - tx_pos)),
+        },
+        'strong': {
+            'rate_mbps': float(rate_s),
+            'sinr_db': float(10 * np.log10(sinr_s)),
+            'distance_m': float(np.linalg.norm(users[strong_idx[k]] - tx_pos)),
+        },
+    }
+
+
+def job_key(job):
+    """缓存键：任务全部输入 + 优化器版本"""
+    payload = json.dumps({'version': OPTIMIZER_VERSION, **job}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _run_job(job):
+    """工作进程入口"""
+    return optimize_link(job['link_type'], job['scenario'], job['objective'],
+                         job['min_rate_mbps'], job['alpha_steps'], job['power_steps'], job['pairing'])
+
+
+def run_sweep(jobs, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    并行执行优化任务，命中缓存的任务不再计算
+
+    Args:
+        jobs: 任务字典列表（link_type, scenario, objective, min_rate_mbps, alpha_steps, power_steps, pairing）
+        cache_dir: 缓存目录，None 表示不使用缓存
+
+    Returns:
+        (results, cache_hits): 与 jobs 顺序一致的结果列表和缓存命中数
+    """
+    keys = [job_key(job) for job in jobs]
+    results = [None] * len(jobs)
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        for i, key in enumerate(keys):
+            path = cache_dir / f"{key}.json"
+            if path.exists():
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        results[i] = json.load(f)
+                except (OSError, ValueError):
+                    pass  # 缓存损坏则重新计算
+
+    pending = [i for i, r in enumerate(results) if r is None]
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, result in zip(pending, executor.map(_run_job, [jobs[i] for i in pending])):
+                results[i] = result
+                if cache_dir is None:
+                    continue
+                try:
+                    cache_dir.mkdir(parents=True, exist_ok=True)
+                    path = cache_dir / f"{keys[i]}.json"
+                    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(result, f)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    print(f"⚠️  写入优化缓存失败: {e}")
+
+    return results, len(jobs) - len(pending)
+
+
+def to_sagin_rates(results, objective):
+    """
+    把指定目标的结果转换为 SAGIN_RATES 的 NOMA 条目（{link}_noma_weak / {link}_noma_strong）
+    不输出 distance_m：TC 延迟由拓扑定义的节点距离决定，不能被配对用户的几何位置覆盖
+    """
+    rates = {}
+    for result in results:
+        if result['objective'] != objective or not result['feasible']:
+            continue
+        for role in ('weak', 'strong'):
+            # 与 SAGIN_RATES 相同的精度，tc 的 rate 参数直接使用 rate_mbps
+            rates[f"{result['link_type']}_noma_{role}"] = {
+                'rate_mbps': round(result[role]['rate_mbps'], 2),
+                'sinr_db': round(result[role]['sinr_db'], 2),
+                'user': result[f'{role}_user'],
+                'alpha_power': round(result['alpha_power'], 4),
+                'P_tx_W': round(result['P_tx_W'], 4),
+                'objective': objective,
+                'pairing': result['pairing'],
+            }
+    return rates
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='NOMA 功率分配/用户配对优化')
+    parser.add_argument('--links', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='参与优化的链路类型')
+    parser.add_argument('--objective', action='append', choices=OBJECTIVES, default=None,
+                        help='优化目标，可重复；第一个目标的结果写入速率文件 (默认: max_min)')
+    parser.add_argument('--min-rate', type=float, default=DEFAULT_MIN_RATE_MBPS,
+                        help='每个用户的最低速率 (Mbps)')
+    parser.add_argument('--alpha-steps', type=int, default=DEFAULT_ALPHA_STEPS,
+                        help='alpha 网格点数')
+    parser.add_argument('--power-steps', type=int, default=DEFAULT_POWER_STEPS,
+                        help='发射功率网格点数')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行进程数 (默认: CPU核数)')
+    parser.add_argument('--cache-dir', type=str, default=str(DEFAULT_CACHE_DIR),
+                        help='结果缓存目录')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='不读写缓存')
+    parser.add_argument('--pairing', choices=PAIRINGS, default='fixed',
+                        help='fixed: 固定为拓扑实际的弱/强节点; free: 自由配对假设分析（写入单独文件）')
+    parser.add_argument('--output', type=str, default=None,
+                        help=f'SAGIN_RATES 格式的速率输出文件 (默认: fixed 为 {OUTPUT_FILE.name}, '
+                             f'free 为 {FREE_PAIRING_OUTPUT_FILE.name})')
+
+    args = parser.parse_args()
+    objectives = args.objective or ['max_min']
+    output = args.output or str(OUTPUT_FILE if args.pairing == 'fixed' else FREE_PAIRING_OUTPUT_FILE)
+
+    jobs = [{'link_type': link, 'scenario': SCENARIOS[link], 'objective': objective,
+             'min_rate_mbps': args.min_rate, 'alpha_steps': args.alpha_steps,
+             'power_steps': args.power_steps, 'pairing': args.pairing}
+            for objective in objectives for link in args.links]
+
+    start = datetime.now()
+    results, hits = run_sweep(jobs, workers=args.workers,
+                              cache_dir=None if args.no_cache else Path(args.cache_dir))
+    elapsed = (datetime.now() - start).total_seconds()
+
+    print("=" * 90)
+    print(f"NOMA 功率分配优化结果（配对: {args.pairing}）")
+    print("=" * 90)
+    print(f"{'链路':<6} {'目标':<18} {'弱/强用户':<24} {'alpha':>6} {'P(W)':>7} "
+          f"{'弱(Mbps)':>9} {'强(Mbps)':>9}")
+    print("-" * 90)
+    for r in results:
+        if not r['feasible']:
+            print(f"{r['link_type']:<6} {r['objective']:<18} 无可行解 (最低速率 {r['min_rate_mbps']} Mbps)")
+            continue
+        pair = f"{r['weak_user']}/{r['strong_user']}"
+        print(f"{r['link_type']:<6} {r['objective']:<18} {pair:<24} {r['alpha_power']:>6.3f} "
+              f"{r['P_tx_W']:>7.3f} {r['weak']['rate_mbps']:>9.2f} {r['strong']['rate_mbps']:>9.2f}")
+    print("=" * 90)
+
+    rates = to_sagin_rates(results, objectives[0])
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(rates, f, indent=2, ensure_ascii=False)
+    print(f"📂 速率文件 ({objectives[0]}): {output}")
+    if args.pairing == 'free':
+        print("⚠️  自由配对结果仅供对比，配对用户与拓扑节点不一致，sagin_12topo_config.py --rates 会拒绝该文件")
+    print(f"✅ {len(jobs)} 个任务（缓存命中 {hits}），耗时 {elapsed:.2f}秒")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
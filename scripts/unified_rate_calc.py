@@ -8,11 +8,14 @@ import numpy as np
 import math
 import sys
 import os
-from scipy.special import jv
+from scipy.special import jv, j0, j1
 
 # 添加路径以导入计算模块
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'last_experiment'))
 
+from link_cache import LINK_CACHE
+from beam_lut import active_beam_lut
+
 # ============================================================================
 # 卫星链路计算 (from test_satellite_noma.py)
 # ============================================================================
@@ -44,6 +47,10 @@ def beam_pattern_single_beam(user_pos_3d, sat_pos_3d):
     uk_n = BEAM_UK_N_COEFF * math.sin(phi_rad) / sin_B
     if abs(uk_n) < 1e-9:
         return 1.0
+    # 启用查找表时（SAGIN_BEAM_LUT / enable_beam_lut）插值代替 Bessel 计算
+    lut = active_beam_lut()
+    if lut is not None:
+        return lut.pattern_scalar(uk_n)
     term1 = jv(1, uk_n) / (2 * uk_n)
     term2 = 36 * jv(3, uk_n) / (uk_n ** 3)
     return float(np.clip((term1 + term2) ** 2, 1e-10, 1.0))
@@ -81,6 +88,86 @@ def sat_noma(sat_pos, weak_pos, strong_pos, P_tx_W, B_Hz, alpha_power,
     rate_strong = B_Hz * np.log2(1 + sinr_strong) / 1e6
     return (rate_weak, rate_strong), (sinr_weak, sinr_strong), (gain_weak, gain_strong)
 
+# ---- 批量版本：设备位置为 (..., 3) 数组，返回逐设备数组 ----
+# P_tx_W / B_Hz / alpha_power 可为数组，按 numpy 广播规则与设备维度组合，
+# 例如 P[:, None] 与 N 个设备得到 (len(P), N) 的功率扫描结果
+
+def _rate_mbps(B_Hz, sinr):
+    return B_Hz * np.log2(1 + sinr) / 1e6
+
+def _bessel_j1_j3(x):
+    """
+    J1(x), J3(x)：x >= 1 时由 j0/j1 递推 J3 = (8/x^2 - 1)J1 - (4/x)J0，
+    比 jv 快一个数量级；x < 1 时递推有相消误差，仍用 jv
+    """
+    x = np.asarray(x, dtype=float)
+    J1 = j1(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        J3 = np.asarray((8 / x ** 2 - 1) * J1 - 4 / x * j0(x))
+    small = x < 1
+    if np.any(small):
+        J3[small] = jv(3, x[small])
+    return J1, J3
+
+def beam_pattern_batch(user_pos, sat_pos):
+    """beam_pattern_single_beam 的向量化版本（波束中心为原点）"""
+    user_pos = np.asarray(user_pos, dtype=float)
+    sat_pos = np.asarray(sat_pos, dtype=float)
+    vec_sat_to_beam = -sat_pos
+    vec_sat_to_user = user_pos - sat_pos
+    norm_beam = np.linalg.norm(vec_sat_to_beam, axis=-1)
+    norm_user = np.linalg.norm(vec_sat_to_user, axis=-1)
+    degenerate = (norm_beam == 0) | (norm_user == 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_phi = np.clip(np.sum(vec_sat_to_beam * vec_sat_to_user, axis=-1)
+                          / (norm_beam * norm_user), -1.0, 1.0)
+    phi_rad = np.arccos(np.where(degenerate, 1.0, cos_phi))
+    uk_n = BEAM_UK_N_COEFF * np.sin(phi_rad) / math.sin(math.radians(BEAM_ANGLE_B_DEG))
+    on_axis = (phi_rad < 1e-9) | (np.abs(uk_n) < 1e-9)
+
+    uk = np.where(on_axis, 1.0, uk_n)
+    lut = active_beam_lut()
+    if lut is not None:
+        pattern = lut.pattern(uk)
+    else:
+        J1, J3 = _bessel_j1_j3(uk)
+        pattern = np.clip((J1 / (2 * uk) + 36 * J3 / uk ** 3) ** 2, 1e-10, 1.0)
+    return np.where(degenerate, 0.0, np.where(on_axis, 1.0, pattern))
+
+def sat_effective_gain_batch(sat_pos, dev_pos, is_uav=False):
+    """sat_effective_gain 的向量化版本（is_uav 可为逐设备布尔数组）"""
+    dev_pos = np.asarray(dev_pos, dtype=float)
+    distance = np.maximum(np.linalg.norm(dev_pos - sat_pos, axis=-1), 1e-9)
+    path_loss_inv = (C / (4 * math.pi * distance * FREQ)) ** 2
+    G_rx = np.where(is_uav, G_UAV_RX_LINEAR, G_USER_RX_LINEAR)
+    return path_loss_inv * G_SAT_TX_LINEAR * G_rx * beam_pattern_batch(dev_pos, sat_pos)
+
+def oma_from_gain(gain, P_tx_W, B_Hz):
+    """由信道增益计算 OMA 速率（所有链路类型通用，参数可广播）"""
+    sinr = np.asarray(P_tx_W) * gain / (NOISE_DENSITY_W_PER_HZ * np.asarray(B_Hz))
+    return _rate_mbps(B_Hz, sinr), sinr
+
+def noma_from_gains(gain_weak, gain_strong, P_tx_W, B_Hz, alpha_power):
+    """由弱/强用户增益计算两用户 NOMA 速率（强用户SIC后无干扰，参数可广播）"""
+    P_tx_W, B_Hz, alpha_power = np.asarray(P_tx_W), np.asarray(B_Hz), np.asarray(alpha_power)
+    noise_W = NOISE_DENSITY_W_PER_HZ * B_Hz
+    sinr_weak = alpha_power * P_tx_W * gain_weak / ((1 - alpha_power) * P_tx_W * gain_weak + noise_W)
+    sinr_strong = (1 - alpha_power) * P_tx_W * gain_strong / noise_W
+    return (_rate_mbps(B_Hz, sinr_weak), _rate_mbps(B_Hz, sinr_strong)), (sinr_weak, sinr_strong)
+
+def sat_oma_batch(sat_pos, dev_pos, P_tx_W, B_Hz, is_uav=False):
+    gain = sat_effective_gain_batch(sat_pos, dev_pos, is_uav)
+    rate_mbps, sinr = oma_from_gain(gain, P_tx_W, B_Hz)
+    return rate_mbps, sinr, gain
+
+def sat_noma_batch(sat_pos, weak_pos, strong_pos, P_tx_W, B_Hz, alpha_power,
+                   weak_is_uav=False, strong_is_uav=False):
+    gain_weak = sat_effective_gain_batch(sat_pos, weak_pos, weak_is_uav)
+    gain_strong = sat_effective_gain_batch(sat_pos, strong_pos, strong_is_uav)
+    rates, sinrs = noma_from_gains(gain_weak, gain_strong, P_tx_W, B_Hz, alpha_power)
+    return rates, sinrs, (gain_weak, gain_strong)
+
 # ============================================================================
 # UAV 链路计算 (from test_uav_noma.py)
 # ============================================================================
@@ -125,6 +212,31 @@ def uav_noma_rate(uav_pos, weak_user_pos, strong_user_pos, P_uav_W, B_Hz, alpha_
     rate_s = B_Hz * np.log2(1 + sinr_s) / 1e6
     return (rate_w, rate_s), (sinr_w, sinr_s), (gain_w, gain_s)
 
+def uav_to_user_gain_batch(uav_pos, user_pos):
+    """uav_to_user_gain 的向量化版本"""
+    uav_pos = np.asarray(uav_pos, dtype=float)
+    user_pos = np.asarray(user_pos, dtype=float)
+    horiz_dist = np.linalg.norm(uav_pos[..., :2] - user_pos[..., :2], axis=-1)
+    height = np.maximum(uav_pos[..., 2] - user_pos[..., 2], 1e-9)
+    # arctan2 在水平距离为 0 时给出 90°，与标量版本一致
+    theta_deg = np.degrees(np.arctan2(height, horiz_dist))
+    P_los = 1.0 / (1.0 + A_SUB * np.exp(-B_SUB * (theta_deg - A_SUB)))
+    d_slant = np.sqrt(height ** 2 + horiz_dist ** 2)
+    fspl_dB = 20 * np.log10(d_slant) + 20 * np.log10(FREQ_UAV) + 20 * np.log10(4 * np.pi / C)
+    excess_dB = P_los * ETA_LOS_DB + (1 - P_los) * ETA_NLOS_DB
+    return 10 ** (-(fspl_dB + excess_dB) / 10.0)
+
+def uav_oma_rate_batch(uav_pos, user_pos, P_uav_W, B_Hz):
+    gain = uav_to_user_gain_batch(uav_pos, user_pos)
+    rate_mbps, sinr = oma_from_gain(gain, P_uav_W, B_Hz)
+    return rate_mbps, sinr, gain
+
+def uav_noma_rate_batch(uav_pos, weak_user_pos, strong_user_pos, P_uav_W, B_Hz, alpha_power):
+    gain_w = uav_to_user_gain_batch(uav_pos, weak_user_pos)
+    gain_s = uav_to_user_gain_batch(uav_pos, strong_user_pos)
+    rates, sinrs = noma_from_gains(gain_w, gain_s, P_uav_W, B_Hz, alpha_power)
+    return rates, sinrs, (gain_w, gain_s)
+
 # ============================================================================
 # D2D 链路计算 (from test_d2d_noma.py)
 # ============================================================================
@@ -168,10 +280,55 @@ def d2d_noma_rate(tx_pos, weak_rx_pos, strong_rx_pos, P_tx_W, B_Hz, alpha_power)
     rate_s = B_Hz * np.log2(1 + sinr_s) / 1e6
     return (rate_w, rate_s), (sinr_w, sinr_s), (gain_w, gain_s)
 
+def d2d_channel_gain_batch(user_a_pos, user_b_pos):
+    """d2d_channel_gain 的向量化版本（距离为 0 时增益为 0）"""
+    distance = np.linalg.norm(np.asarray(user_a_pos, dtype=float)
+                              - np.asarray(user_b_pos, dtype=float), axis=-1)
+    safe = np.where(distance > 0, distance, 1.0)
+    freq_term_dB = 20 * np.log10(FREQ_D2D) + 20 * np.log10(4 * np.pi / C)
+    fspl_d0_dB = 20 * np.log10(REF_DIST) + freq_term_dB
+    path_loss_dB = np.where(safe > REF_DIST,
+                            fspl_d0_dB + 10 * PATH_LOSS_EXP * np.log10(safe / REF_DIST),
+                            20 * np.log10(safe) + freq_term_dB)
+    return np.where(distance > 0, 10 ** (-path_loss_dB / 10.0), 0.0)
+
+def d2d_oma_rate_batch(user_a_pos, user_b_pos, P_tx_W, B_Hz):
+    gain = d2d_channel_gain_batch(user_a_pos, user_b_pos)
+    rate_mbps, sinr = oma_from_gain(gain, P_tx_W, B_Hz)
+    return rate_mbps, sinr, gain
+
+def d2d_noma_rate_batch(tx_pos, weak_rx_pos, strong_rx_pos, P_tx_W, B_Hz, alpha_power):
+    gain_w = d2d_channel_gain_batch(tx_pos, weak_rx_pos)
+    gain_s = d2d_channel_gain_batch(tx_pos, strong_rx_pos)
+    rates, sinrs = noma_from_gains(gain_w, gain_s, P_tx_W, B_Hz, alpha_power)
+    return rates, sinrs, (gain_w, gain_s)
+
 # ============================================================================
 # 统一计算所有场景
 # ============================================================================
 
+def cached_oma_rate(link_type, tx_pos, rx_pos, P_tx_W, B_Hz, is_uav=False, cache=LINK_CACHE):
+    """
+    经链路缓存的单链路 OMA 计算，多个场景共享的链路只计算一次
+
+    Args:
+        link_type: 'satellite' / 'uav' / 'd2d'
+        is_uav: 卫星链路接收端是否为UAV
+
+    Returns:
+        (rate_mbps, sinr, gain)
+    """
+    if link_type == 'satellite':
+        compute = lambda: sat_oma(tx_pos, rx_pos, P_tx_W, B_Hz, is_uav=is_uav)
+    elif link_type == 'uav':
+        compute = lambda: uav_oma_rate(tx_pos, rx_pos, P_tx_W, B_Hz)
+    elif link_type == 'd2d':
+        compute = lambda: d2d_oma_rate(tx_pos, rx_pos, P_tx_W, B_Hz)
+    else:
+        raise ValueError(f"未知链路类型: {link_type}")
+    return cache.get_or_compute(link_type, tx_pos, rx_pos, P_tx_W, B_Hz, compute,
+                                extra=(is_uav,))
+
 def calculate_all_scenarios():
     """计算所有 12+ 个拓扑的速率"""
 
@@ -185,8 +342,8 @@ def calculate_all_scenarios():
     B_sat = 20e6
 
     # OMA
-    rate_c, sinr_c, gain_c = sat_oma(sat_pos, user_center, P_sat, B_sat)
-    rate_e, sinr_e, gain_e = sat_oma(sat_pos, user_edge, P_sat, B_sat)
+    rate_c, sinr_c, gain_c = cached_oma_rate('satellite', sat_pos, user_center, P_sat, B_sat)
+    rate_e, sinr_e, gain_e = cached_oma_rate('satellite', sat_pos, user_edge, P_sat, B_sat)
 
     results['Z1-UP1-OMA-center'] = {
         'rate_mbps': float(rate_c),
@@ -234,8 +391,8 @@ def calculate_all_scenarios():
     B_uav = 2e6
 
     # OMA
-    rate_n, sinr_n, gain_n = uav_oma_rate(uav_pos, user_near, P_uav, B_uav)
-    rate_f, sinr_f, gain_f = uav_oma_rate(uav_pos, user_far, P_uav, B_uav)
+    rate_n, sinr_n, gain_n = cached_oma_rate('uav', uav_pos, user_near, P_uav, B_uav)
+    rate_f, sinr_f, gain_f = cached_oma_rate('uav', uav_pos, user_far, P_uav, B_uav)
 
     results['Z1-UP2-OMA-near'] = {
         'rate_mbps': float(rate_n),
@@ -282,8 +439,8 @@ def calculate_all_scenarios():
     B_d2d = 2e6
 
     # OMA
-    rate_s, sinr_s, gain_s = d2d_oma_rate(tx_pos, strong_rx, P_d2d, B_d2d)
-    rate_w, sinr_w, gain_w = d2d_oma_rate(tx_pos, weak_rx, P_d2d, B_d2d)
+    rate_s, sinr_s, gain_s = cached_oma_rate('d2d', tx_pos, strong_rx, P_d2d, B_d2d)
+    rate_w, sinr_w, gain_w = cached_oma_rate('d2d', tx_pos, weak_rx, P_d2d, B_d2d)
 
     results['Z2-D2D-OMA-strong'] = {
         'rate_mbps': float(rate_s),
@@ -324,13 +481,13 @@ def calculate_all_scenarios():
 
     # === 场景 7-9: 两跳链路 ===
     # 第一跳: 卫星→无人机
-    rate_hop1, sinr_hop1, gain_hop1 = sat_oma(
-        sat_pos, uav_pos, P_sat, B_sat, is_uav=True
+    rate_hop1, sinr_hop1, gain_hop1 = cached_oma_rate(
+        'satellite', sat_pos, uav_pos, P_sat, B_sat, is_uav=True
     )
 
-    # 第二跳: 无人机→远端用户
-    rate_hop2, sinr_hop2, gain_hop2 = uav_oma_rate(
-        uav_pos, user_far, P_uav, B_uav
+    # 第二跳: 无人机→远端用户（与 Z1-UP2-OMA-far 同一链路，命中缓存）
+    rate_hop2, sinr_hop2, gain_hop2 = cached_oma_rate(
+        'uav', uav_pos, user_far, P_uav, B_uav
     )
 
     # 端到端速率 = min(hop1, hop2)